@@ -1,18 +1,32 @@
 import streamlit as st
 import pandas as pd
-import json
 import os
-import re
-import sqlite3
-from datetime import datetime, date
+import json
+from datetime import date, timedelta
+from processing import URGENT_DAYS, audit_status, mark_view
+from state_store import StateStore, WriteBehindStore
+from tender_store import TenderStore
+from search_index import SearchIndex
+from detail_service import DetailService
+from similarity import SimilarityIndex, similar
+from instrumentation import recorder
+from loader import DATASETS, DB_FILE, JSON_FILE_MAIN, JSON_FILE_OBRAS, open_dataset, similar_path
 
 # --- CONFIGURATION ---
 st.set_page_config(page_title="Monitor Licitaciones IDIEM", layout="wide", page_icon="🏗️")
 
-UTM_VALUE = 69611 
-JSON_FILE_MAIN = "FINAL_PRODUCTION_DATA.json"
-JSON_FILE_OBRAS = "OBRAS_CIVILES_DATA.json"
-DB_FILE = "licitaciones_state.db"
+PAGE_SIZES = [50, 100, 250, 500]  # Rows per grid page (filters/sort/paging run in SQLite)
+PAGE_SIZE = 100
+SEARCH_LIMIT = 20    # Hits offered by the global search
+SIMILAR_LIMIT = 10   # "Licitaciones similares" shown in the Ficha Técnica / ranked for the saved set
+DETAIL_PREFETCH = 10  # Top rows of every grid page (and search hits) resolved ahead for the Ficha Técnica
+CLOSING_DAYS = [3, 7, 14, 30]  # Windows offered by the "Por Cerrar" tab
+PERF_ENABLED = os.environ.get("IDIEM_PERF") == "1"  # Timing spans, SQLite/cache counters + sidebar "Rendimiento" panel
+PERF_PROM_FILE = os.environ.get("IDIEM_PERF_PROM")   # Prometheus text file rewritten after every rerun
+PERF_LOG = os.environ.get("IDIEM_PERF_LOG") == "1"   # One JSON log line ("perf" logger) per rerun
+
+recorder.configure(enabled=PERF_ENABLED, prom_file=PERF_PROM_FILE, log_runs=PERF_LOG)
+recorder.begin_run()
 
 # Custom CSS for Alignment and Styling
 st.markdown("""
@@ -37,240 +51,192 @@ st.markdown("""
 
 if 'selected_code' not in st.session_state:
     st.session_state.selected_code = None
+if 'grid_epoch' not in st.session_state:
+    st.session_state.grid_epoch = 0  # bumped after every handled grid edit
 
 # ==========================================
 # 🗄️ SQLITE DATABASE
 # ==========================================
-def init_db():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS hidden (code TEXT PRIMARY KEY, timestamp DATETIME)')
-    c.execute('CREATE TABLE IF NOT EXISTS saved (code TEXT PRIMARY KEY, timestamp DATETIME, note TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS history (code TEXT PRIMARY KEY, first_seen DATETIME)')
-    conn.commit()
-    return conn
+@recorder.counted("get_store", st.cache_resource)
+def get_store():
+    # Shared by all sessions: reads come from memory, writes are committed in
+    # batches by a background thread (see state_store.py)
+    return WriteBehindStore(StateStore(DB_FILE))
 
-conn = init_db()
+store = get_store()
 
+@recorder.timed()
 def get_db_lists():
-    c = conn.cursor()
-    hidden = {row[0] for row in c.execute('SELECT code FROM hidden').fetchall()}
-    saved = {row[0] for row in c.execute('SELECT code FROM saved').fetchall()}
-    history = {row[0] for row in c.execute('SELECT code FROM history').fetchall()}
-    return hidden, saved, history
+    return store.lists()
 
 def db_toggle_save(code, action):
-    c = conn.cursor()
-    if action:
-        c.execute('INSERT OR REPLACE INTO saved (code, timestamp) VALUES (?, ?)', (code, datetime.now()))
-        c.execute('DELETE FROM hidden WHERE code = ?', (code,))
-        st.toast(f"✅ Guardado: {code}")
-    else:
-        c.execute('DELETE FROM saved WHERE code = ?', (code,))
-        st.toast(f"❌ Removido: {code}")
-    conn.commit()
+    store.toggle_save(code, action)
+    st.toast(f"✅ Guardado: {code}" if action else f"❌ Removido: {code}")
 
 def db_hide_permanent(code):
-    c = conn.cursor()
-    c.execute('DELETE FROM saved WHERE code = ?', (code,))
-    c.execute('INSERT OR REPLACE INTO hidden (code, timestamp) VALUES (?, ?)', (code, datetime.now()))
-    conn.commit()
+    store.hide(code)
     st.toast(f"🗑️ Ocultado: {code}")
 
+@recorder.timed()
 def db_mark_seen(codes):
     if not codes: return
-    c = conn.cursor()
-    now = datetime.now()
-    data = [(c, now) for c in codes]
-    c.executemany('INSERT OR IGNORE INTO history (code, first_seen) VALUES (?, ?)', data)
-    conn.commit()
-
-# ==========================================
-# 🧠 CATEGORIZATION LOGIC
-# ==========================================
-def get_category(text):
-    if not text: return "General"
-    text = text.upper()
-    if re.search(r'\b(AIF|AIT|ATIF|ATOD|AFOS|ATO|ITO)\b', text): return "Inspección Técnica"
-    if re.search(r'\b(PACC|PCC)\b', text): return "Sustentabilidad"
-    if any(x in text for x in ["ASESORÍA INSPECCIÓN", "SUPERVISIÓN CONSTRUCCIÓN"]): return "Inspección Técnica"
-    if any(x in text for x in ["ESTRUCTURAL", "MECÁNICA SUELOS", "GEOLÓGICO", "GEOTÉCNICO", "ENSAYOS", "LABORATORIO"]): return "Ingeniería y Lab"
-    if any(x in text for x in ["TOPOGRÁFICO", "TOPOGRAFÍA", "LEVANTAMIENTO", "AEROFOTOGRAMETRÍA"]): return "Topografía"
-    if any(x in text for x in ["ARQUITECTURA", "DISEÑO ARQUITECTÓNICO"]): return "Arquitectura"
-    if any(x in text for x in ["EFICIENCIA ENERGÉTICA", "CERTIFICACIÓN", "SUSTENTABLE"]): return "Sustentabilidad"
-    if any(x in text for x in ["MODELACIÓN", "BIM", "COORDINACIÓN DIGITAL"]): return "BIM / Modelación"
-    return "Otras Civiles"
+    store.mark_seen(codes)
 
 # ==========================================
 # 🛠️ DATA PROCESSING
 # ==========================================
-def clean_money_string(text):
-    if not text: return 0
-    try:
-        clean = re.sub(r'[^\d]', '', str(text))
-        if clean: return float(clean)
-    except: pass
-    return 0
-
-def estimate_monto(text):
-    if not text: return 0
-    matches = re.findall(r'(\d[\d\.]*)', text)
-    if matches:
-        try:
-            return float(matches[0].replace(".", "")) * UTM_VALUE
-        except: pass
-    return 0
-
-def format_clp(val):
-    if not val or val == 0: return "$ 0"
-    return f"${val:,.0f}".replace(",", ".")
-
-@st.cache_data
+@recorder.counted("get_tender_store", st.cache_resource)
+def get_tender_store():
+    return TenderStore(DB_FILE)
+
+tenders = get_tender_store()
+
+@recorder.counted("get_search_index", st.cache_resource)
+def get_search_index():
+    return SearchIndex(DB_FILE)
+
+search = get_search_index()
+
+@recorder.counted("get_similar_index", st.cache_resource)
+def get_similar_index(filepath):
+    # Hashed TF-IDF vectors of one file, loaded from .frames (similarity.py)
+    return SimilarityIndex(similar_path(filepath))
+
+@recorder.counted("get_dataset", st.cache_resource)
+def get_dataset(filepath):
+    # One parsed copy per file, shared by all sessions and patched on reload;
+    # changes go to the tenders table, the search and similarity indexes (loader.py)
+    name = next(k for k, v in DATASETS.items() if v == filepath)
+    return open_dataset(name, filepath, tenders=tenders, search=search, similar=get_similar_index(filepath))
+
+@recorder.timed()
 def load_data(filepath):
-    # PREVENT KEY ERROR: Ensure basic structure exists even if file is missing/empty
-    expected_cols = [
-        "Codigo", "Nombre", "Organismo", "Estado_Lic", "Categoria", 
-        "Monto_Num", "Monto", "Monto_Tipo", 
-        "Fecha Pub", "FechaPubObj", "Fecha Cierre", "FechaCierreObj", "URL"
-    ]
-    
-    if not os.path.exists(filepath):
-        return pd.DataFrame(columns=expected_cols), {}
-    
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception:
-        return pd.DataFrame(columns=expected_cols), {}
-        
-    if not data:
-        return pd.DataFrame(columns=expected_cols), {}
-    
-    rows = []
-    full_map = {}
-    today = date.today()
-    
-    for item in data:
-        code = item.get("CodigoExterno")
-        name = str(item.get("Nombre", "")).title()
-        org_name = str(item.get("Comprador", {}).get("NombreOrganismo", "")).title()
-        
-        estado_lic = str(item.get("Estado", "Publicada")).title()
-        
-        cat = item.get("Match_Category")
-        if not cat or cat == "Sin Categoría":
-            cat = get_category(name)
-        
-        # Monto Logic
-        monto = 0
-        monto_tipo = "Exacto"
-        if item.get("MontoEstimado") and float(item.get("MontoEstimado") or 0) > 0:
-            monto = float(item.get("MontoEstimado"))
-            monto_tipo = "Exacto"
-        else:
-            ext = item.get("ExtendedMetadata", {}).get("Section_1_Características", {})
-            monto = clean_money_string(ext.get("Presupuesto"))
-            if monto > 0:
-                monto_tipo = "Exacto"
-            else:
-                monto = estimate_monto(ext.get("Tipo de Licitación", ""))
-                if monto > 0: monto_tipo = "Estimado"
+    return get_dataset(filepath).df
 
-        # Dates
-        fechas = item.get("Fechas") or {}
-        
-        raw_pub = fechas.get("FechaPublicacion")
-        f_pub_str = str(raw_pub)[:10] if raw_pub else ""
-        f_pub_obj = None
-        if f_pub_str:
-            try: f_pub_obj = datetime.strptime(f_pub_str, "%Y-%m-%d").date()
-            except: pass
-        
-        raw_cierre = fechas.get("FechaCierre")
-        f_cierre_str = str(raw_cierre)[:10] if raw_cierre else ""
-        f_cierre_obj = None
-        if f_cierre_str:
-            try:
-                f_cierre_obj = datetime.strptime(f_cierre_str, "%Y-%m-%d").date()
-                delta = (f_cierre_obj - today).days
-                if delta < 0:
-                     f_cierre_str = f" {f_cierre_str}" # Expired
-                elif 0 <= delta <= 7:
-                    f_cierre_str = f" {f_cierre_str}" # Warning
-            except: pass
-
-        rows.append({
-            "Codigo": code,
-            "Nombre": name,
-            "Organismo": org_name,
-            "Estado_Lic": estado_lic, # New Column
-            "Categoria": cat,
-            "Monto_Num": monto,
-            "Monto": format_clp(monto),
-            "Monto_Tipo": monto_tipo,
-            "Fecha Pub": f_pub_str,
-            "FechaPubObj": f_pub_obj,
-            "Fecha Cierre": f_cierre_str,
-            "FechaCierreObj": f_cierre_obj,
-            "URL": item.get("URL_Documentos_Portal")
-        })
-        full_map[code] = item
-        
-    return pd.DataFrame(rows), full_map
+@recorder.timed()
+def reload_data():
+    # Only files whose mtime/size changed are re-read, and only changed records re-derived
+    for filepath in (JSON_FILE_MAIN, JSON_FILE_OBRAS):
+        changes = get_dataset(filepath).refresh()
+        if changes:
+            st.toast(f"🔄 {filepath}: +{changes['added']} / ~{changes['changed']} / -{changes['removed']}")
+
+# Load both files (or map their snapshots) before the tabs query the tenders table
+for filepath in (JSON_FILE_MAIN, JSON_FILE_OBRAS):
+    load_data(filepath)
+
+@recorder.counted("get_details", st.cache_resource)
+def get_details():
+    # Ficha Técnica records read on demand, resolved once per file version
+    # (bounded LRU) and prefetched in the background (detail_service.py).
+    # Obras wins over Main, as before
+    return DetailService([get_dataset(JSON_FILE_OBRAS), get_dataset(JSON_FILE_MAIN)])
 
-# Load Data Frames (Main + Obras)
-df_main, map_main = load_data(JSON_FILE_MAIN)
-df_obras, map_obras = load_data(JSON_FILE_OBRAS)
+details = get_details()
 
-full_map = {**map_main, **map_obras}
 hidden_ids, saved_ids, history_ids = get_db_lists()
 
+@recorder.timed()
+def similar_rows(codes, exclude=()):
+    # Grid columns of the tenders most like codes (both files), best first,
+    # with their score; None when there are none
+    indexes = [get_similar_index(filepath) for filepath in (JSON_FILE_MAIN, JSON_FILE_OBRAS)]
+    hits = dict(similar(indexes, codes, k=SIMILAR_LIMIT, exclude=set(exclude) | hidden_ids))
+    if not hits:
+        return None
+    rows, _ = tenders.query(("main", "obras"), codes=list(hits), limit=len(hits))
+    rows["Similitud"] = rows["Codigo"].map(hits)
+    details.prefetch(rows["Codigo"].head(DETAIL_PREFETCH))
+    return rows.sort_values("Similitud", ascending=False, kind="stable")
+
+def render_similar(rows, key):
+    sim_cfg = {
+        "Codigo": st.column_config.TextColumn("ID", width="small"),
+        "Nombre": st.column_config.TextColumn("Nombre Licitación", width="large"),
+        "Fecha Cierre": st.column_config.TextColumn("Cierre", width="small"),
+        "Similitud": st.column_config.ProgressColumn("Similitud", min_value=0.0, max_value=1.0, format="%.2f"),
+    }
+    st.dataframe(rows, column_config=sim_cfg, column_order=["Codigo", "Nombre", "Organismo", "Fecha Cierre", "Similitud"],
+                 hide_index=True, use_container_width=True)
+    names = dict(zip(rows["Codigo"], rows["Nombre"]))
+    st.selectbox("Abrir en Ficha Técnica:", [""] + list(names), key=key, on_change=open_similar, args=(key,),
+                 format_func=lambda x: f"{x} - {str(names.get(x, ''))[:60]}..." if x else "Seleccionar...")
+
+def open_similar(key):
+    # Runs before the rerun: the Ficha Técnica already shows the pick
+    if st.session_state[key]:
+        st.session_state.selected_code = st.session_state[key]
+
 # ==========================================
 # 🔄 DATAFRAME PREP HELPER
 # ==========================================
-def prepare_view(df_in, sort_by="FechaPubObj"):
-    if df_in.empty: return pd.DataFrame()
-    
-    # Check if 'Codigo' exists to prevent crash on empty/malformed inputs
-    if "Codigo" not in df_in.columns:
-        return pd.DataFrame()
-
-    # 1. Filter Hidden
-    df_out = df_in[~df_in["Codigo"].isin(hidden_ids)].copy()
-    
-    # 2. Logic for Visto/Nuevo
-    new_mask = ~df_out["Codigo"].isin(history_ids)
-    df_out["Visto"] = True 
-    df_out.loc[new_mask, "Visto"] = False 
-    
-    # 3. Logic for Saved/Hidden Columns
-    df_out["Guardar"] = df_out["Codigo"].isin(saved_ids)
-    df_out["Ocultar"] = False
-    
-    # 4. Mark New as Seen (Side Effect)
-    if any(new_mask):
-        db_mark_seen(df_out.loc[new_mask, "Codigo"].tolist())
-    
-    return df_out.sort_values(by=[sort_by], ascending=False)
+@recorder.timed()
+def prepare_view(df_in):
+    # Rows already come filtered (hidden included) and sorted from the tender store
+    df_out, new_codes = mark_view(df_in, history_ids, saved_ids)
+    # Mark New as Seen (Side Effect)
+    db_mark_seen(new_codes)
+    return df_out
+
+@recorder.timed()
+def query_page(key, datasets, **filters):
+    # One page of a tab's rows: (prepared page, total, page, pages)
+    size = st.session_state.setdefault(f"{key}_size", PAGE_SIZE)
+    # New filters (or page size) -> back to the first page
+    sig = repr((size, {k: v for k, v in filters.items() if k != "codes"}))
+    if st.session_state.get(f"{key}_sig") != sig:
+        st.session_state[f"{key}_sig"] = sig
+        st.session_state[f"{key}_page"] = 1
+    page = st.session_state.setdefault(f"{key}_page", 1)
+
+    rows, total = tenders.query(datasets, hidden=hidden_ids, limit=size, offset=(page - 1) * size, **filters)
+    pages = max(1, -(-total // size))
+    if page > pages:
+        # Rows hidden/unsaved since the last run emptied this page
+        page = st.session_state[f"{key}_page"] = pages
+        rows, total = tenders.query(datasets, hidden=hidden_ids, limit=size, offset=(page - 1) * size, **filters)
+    details.prefetch(rows["Codigo"].head(DETAIL_PREFETCH))
+    return prepare_view(rows), total, page, pages
+
+def page_controls(key, total, page, pages):
+    size = st.session_state[f"{key}_size"]
+    c_p, c_s, c_info = st.columns([1, 1, 4])
+    with c_p:
+        st.number_input("Página", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    with c_s:
+        st.selectbox("Filas por página", PAGE_SIZES, key=f"{key}_size")
+    with c_info:
+        first = (page - 1) * size + 1 if total else 0
+        st.caption(f"Mostrando {first}–{min(page * size, total)} de {total} registros (página {page} de {pages}).")
+
+def grid_key(key, page):
+    # The editor keeps edits by row position: a new page, or a page redrawn
+    # after a handled edit, gets a fresh editor so no edit is replayed on other rows
+    return f"{key}_{page}_{st.session_state.grid_epoch}"
+
+MONTO_CSS = {
+    "Estimado": 'color: #d97706; font-weight: bold;',  # Orange
+    "Exacto": 'color: #808080; font-weight: bold;',    # Gray
+}
 
+@recorder.timed()
 def apply_text_color(df):
-    def color_monto(row):
-        # Uses Gray for Exact and Orange for Estimated
-        if row['Monto_Tipo'] == 'Estimado': return 'color: #d97706; font-weight: bold;'
-        if row['Monto_Tipo'] == 'Exacto': return 'color: #808080; font-weight: bold;'
-        return ''
-    return df.style.apply(lambda row: [color_monto(row) if col == 'Monto' else '' for col in row.index], axis=1)
+    # Uses Gray for Exact and Orange for Estimated; one lookup for the whole Monto column
+    css = df["Monto_Tipo"].map(MONTO_CSS).fillna("")
+    return df.style.apply(lambda _: css, subset=["Monto"])
 
 def handle_grid_changes(edited, original):
+    # edited/original are the current page only (same rows, same positions)
     if edited["Guardar"].ne(original["Guardar"]).any():
         row = edited[edited["Guardar"] != original["Guardar"]].iloc[0]
         db_toggle_save(row["Codigo"], row["Guardar"])
-        return True
-    if edited["Ocultar"].eq(True).any():
+    elif edited["Ocultar"].eq(True).any():
         row = edited[edited["Ocultar"] == True].iloc[0]
         db_hide_permanent(row["Codigo"])
-        return True
-    return False
+    else:
+        return False
+    st.session_state.grid_epoch += 1
+    return True
 
 # ==========================================
 # 🖥️ MAIN UI
@@ -281,22 +247,29 @@ st.title("Monitor Licitaciones IDIEM")
 with st.sidebar:
     st.title("🎛️ Control")
     if st.button("🔄 Recargar Datos", use_container_width=True):
-        st.cache_data.clear()
+        reload_data()
         st.rerun()
 
 # SEARCH (Global)
-all_search_codes = []
-if not df_main.empty: all_search_codes.extend(df_main["Codigo"].tolist())
-if not df_obras.empty: all_search_codes.extend(df_obras["Codigo"].tolist())
-all_search_codes = sorted(list(set(all_search_codes)))
-
-with st.expander("🔎 Buscar Detalle Global (Todos los Registros)", expanded=False):
-    sel_code = st.selectbox("Escriba ID o Nombre:", [""] + all_search_codes, format_func=lambda x: f"{x} - {full_map.get(x, {}).get('Nombre','')[:60]}..." if x else "Seleccionar...")
-    if sel_code and sel_code != st.session_state.selected_code:
-        st.session_state.selected_code = sel_code
+# Full-text index (search_index.py): accent-insensitive, ranked, last word as prefix
+with st.expander("🔎 Buscar Detalle Global (Todos los Registros)", expanded=False), recorder.span("search"):
+    search_q = st.text_input("Buscar por ID, nombre, organismo, descripción o ítems:", key="search_q", placeholder="ej: geotecnico valparaiso")
+    hits = search.search(search_q, limit=SEARCH_LIMIT)
+    if search_q and not hits:
+        st.caption("Sin resultados.")
+    if hits:
+        hit_names = {code: name for code, name, _ in hits}
+        hit_snippets = {code: snip for code, _, snip in hits}
+        details.prefetch(list(hit_names)[:DETAIL_PREFETCH])
+        sel_code = st.selectbox(f"{len(hits)} mejores resultados:", [""] + list(hit_names), format_func=lambda x: f"{x} - {str(hit_names.get(x, ''))[:60]}..." if x else "Seleccionar...")
+        if sel_code:
+            st.caption(hit_snippets[sel_code])
+        # Only a new pick opens it: other pickers (similar tenders) may have moved on
+        if sel_code and sel_code != st.session_state.get("search_opened"):
+            st.session_state.search_opened = st.session_state.selected_code = sel_code
 
 # TABS
-tab_main, tab_obras, tab_saved, tab_detail, tab_audit = st.tabs(["📥 Disponibles", "🚧 Obras Civiles", "⭐ Guardadas", "📄 Ficha Técnica", "🛠️ Auditoría Data"])
+tab_main, tab_soon, tab_obras, tab_saved, tab_detail, tab_audit = st.tabs(["📥 Disponibles", "⏰ Por Cerrar", "🚧 Obras Civiles", "⭐ Guardadas", "📄 Ficha Técnica", "🛠️ Auditoría Data"])
 
 # COL CONFIGS
 base_cfg = {
@@ -319,20 +292,15 @@ order_main = ["URL", "Guardar",  "Codigo", "Nombre", "Organismo", "Monto", "Fech
 order_obras = ["URL", "Guardar",  "Codigo", "Nombre", "Organismo", "Estado_Lic", "Monto", "Fecha Pub", "Fecha Cierre", "Visto", "Ocultar"]
 
 # --- TAB 1: DISPONIBLES (Has Date Filter) ---
-with tab_main:
+with tab_main, recorder.span("tab.main"):
     # 1. LOCAL FILTERS FOR MAIN
     c1, c2, c3 = st.columns(3)
     
     # Calculate Defaults based on MAIN data
-    if not df_main.empty:
-        valid_dates = df_main["FechaCierreObj"].dropna()
-        min_d = valid_dates.min() if not valid_dates.empty else date.today()
-        max_d = valid_dates.max() if not valid_dates.empty else date.today()
-        all_cats = sorted(df_main["Categoria"].astype(str).unique().tolist())
-        all_orgs = sorted(df_main["Organismo"].astype(str).unique().tolist())
-    else:
-        min_d, max_d = date.today(), date.today()
-        all_cats, all_orgs = [], []
+    opts_m = tenders.filter_options("main")
+    min_d = opts_m["min_date"] or date.today()
+    max_d = opts_m["max_date"] or date.today()
+    all_cats, all_orgs = opts_m["categorias"], opts_m["organismos"]
 
     with c1:
         date_range_m = st.date_input("📅 Fecha Cierre", [min_d, max_d], key="date_main")
@@ -343,39 +311,60 @@ with tab_main:
 
     st.caption("Montos: **Gris** (Exacto), **Naranjo** (Estimado).")
 
-    # 2. APPLY MAIN FILTERS
-    df_m_view = df_main.copy()
-    if not df_m_view.empty:
-        # Strict Date Filter only here
-        if len(date_range_m) == 2:
-            df_m_view = df_m_view[
-                (df_m_view["FechaCierreObj"] >= date_range_m[0]) & 
-                (df_m_view["FechaCierreObj"] <= date_range_m[1])
-            ]
-        if sel_cats_m: df_m_view = df_m_view[df_m_view["Categoria"].isin(sel_cats_m)]
-        if sel_orgs_m: df_m_view = df_m_view[df_m_view["Organismo"].isin(sel_orgs_m)]
+    # 2. APPLY MAIN FILTERS (Strict Date Filter only here)
+    df_m_final, total_m, page_m, pages_m = query_page(
+        "main", "main", date_range=date_range_m if len(date_range_m) == 2 else None,
+        categorias=sel_cats_m, organismos=sel_orgs_m,
+    )
     
-    # 3. RENDER
-    df_m_final = prepare_view(df_m_view)
+    # 3. RENDER (current page only)
     if not df_m_final.empty:
         ed_m = st.data_editor(
             apply_text_color(df_m_final),
             column_config=base_cfg, column_order=order_main,
-            hide_index=True, use_container_width=True, height=600, key="main"
+            hide_index=True, use_container_width=True, height=600, key=grid_key("main", page_m)
         )
+        page_controls("main", total_m, page_m, pages_m)
         if handle_grid_changes(ed_m, df_m_final): st.rerun()
     else:
         st.info("Sin registros con los filtros actuales.")
 
+# --- TAB: POR CERRAR (Main + Obras, soonest first) ---
+with tab_soon, recorder.span("tab.soon"):
+    c_s1, c_s2 = st.columns([1, 3])
+    with c_s1:
+        days_s = st.selectbox("⏰ Cierran en los próximos", CLOSING_DAYS, index=CLOSING_DAYS.index(URGENT_DAYS),
+                              format_func=lambda d: f"{d} días", key="soon_days")
+
+    # Bounds from today on every run (closing-date index range), so the view
+    # never goes stale at midnight
+    today = date.today()
+    df_c_final, total_c, page_c, pages_c = query_page(
+        "soon", ("main", "obras"), date_range=(today, today + timedelta(days=days_s)), order="cierre",
+    )
+    expired = tenders.query(("main", "obras"), hidden=hidden_ids, limit=0,
+                            date_range=(date.min, today - timedelta(days=1)))[1]
+    with c_s2:
+        st.caption(f"Cierre entre hoy y el {today + timedelta(days=days_s):%d-%m-%Y}. "
+                   f"{expired} licitaciones ya vencidas no se muestran aquí.")
+
+    if not df_c_final.empty:
+        ed_c = st.data_editor(
+            apply_text_color(df_c_final),
+            column_config=base_cfg, column_order=order_main,
+            hide_index=True, use_container_width=True, height=600, key=grid_key("soon", page_c)
+        )
+        page_controls("soon", total_c, page_c, pages_c)
+        if handle_grid_changes(ed_c, df_c_final): st.rerun()
+    else:
+        st.info(f"Ninguna licitación cierra en los próximos {days_s} días.")
+
 # --- TAB 2: OBRAS CIVILES (NO Date Filter) ---
-with tab_obras:
+with tab_obras, recorder.span("tab.obras"):
     # 1. LOCAL FILTER (Organismo Only)
     c_o1, c_o2 = st.columns([1, 2])
     
-    if not df_obras.empty:
-        all_orgs_o = sorted(df_obras["Organismo"].astype(str).unique().tolist())
-    else:
-        all_orgs_o = []
+    all_orgs_o = tenders.filter_options("obras")["organismos"]
 
     with c_o1:
         # NO Date Input here -> "Immune to Date Filter"
@@ -384,54 +373,56 @@ with tab_obras:
     st.caption("Filtro: Items 'Obras Civiles'. Muestra todo el historial (incluyendo Adjudicadas y Vencidas).")
     
     # 2. APPLY FILTER
-    df_o_view = df_obras.copy()
-    if not df_o_view.empty:
-        if sel_orgs_o: 
-            df_o_view = df_o_view[df_o_view["Organismo"].isin(sel_orgs_o)]
+    df_o_final, total_o, page_o, pages_o = query_page("obras", "obras", organismos=sel_orgs_o)
     
-    # 3. RENDER
-    df_o_final = prepare_view(df_o_view)
+    # 3. RENDER (current page only)
     if not df_o_final.empty:
         ed_o = st.data_editor(
             apply_text_color(df_o_final),
             column_config=obras_cfg, column_order=order_obras,
-            hide_index=True, use_container_width=True, height=600, key="obras"
+            hide_index=True, use_container_width=True, height=600, key=grid_key("obras", page_o)
         )
+        page_controls("obras", total_o, page_o, pages_o)
         if handle_grid_changes(ed_o, df_o_final): st.rerun()
     else:
         st.info("No se encontraron registros de Obras Civiles.")
 
 # --- TAB 3: SAVED ---
-with tab_saved:
+with tab_saved, recorder.span("tab.saved"):
     st.caption("Mis licitaciones guardadas.")
-    # Combine unique codes
-    df_combined = pd.concat([df_main, df_obras]).drop_duplicates(subset=["Codigo"]) if not df_main.empty or not df_obras.empty else pd.DataFrame()
+    # Both datasets, a code in both shows its Main row
+    df_s_final, total_s, page_s, pages_s = query_page("saved", ("main", "obras"), codes=saved_ids)
     
-    if not df_combined.empty:
-        df_s_filtered = df_combined[df_combined["Codigo"].isin(saved_ids)].copy()
-        df_s_final = prepare_view(df_s_filtered)
-        
-        if not df_s_final.empty:
-            ed_s = st.data_editor(
-                apply_text_color(df_s_final),
-                column_config=base_cfg, column_order=order_main,
-                hide_index=True, use_container_width=True, key="saved"
-            )
-            if handle_grid_changes(ed_s, df_s_final): st.rerun()
-        else:
-            st.info("No hay licitaciones guardadas.")
+    if not df_s_final.empty:
+        ed_s = st.data_editor(
+            apply_text_color(df_s_final),
+            column_config=base_cfg, column_order=order_main,
+            hide_index=True, use_container_width=True, key=grid_key("saved", page_s)
+        )
+        page_controls("saved", total_s, page_s, pages_s)
+        if handle_grid_changes(ed_s, df_s_final): st.rerun()
     else:
-         st.info("No hay datos disponibles.")
+        st.info("No hay licitaciones guardadas.")
+
+    if saved_ids:
+        # Ranked by similarity to the saved set as a whole (similarity.py)
+        with st.expander("🎯 Parecidas a mis guardadas", expanded=False):
+            only_new = st.checkbox("Solo nuevas (no vistas)", value=True, key="sim_saved_new")
+            sim_saved = similar_rows(list(saved_ids), history_ids if only_new else ())
+            if sim_saved is not None:
+                render_similar(sim_saved, "sim_saved_sel")
+            else:
+                st.caption("Sin licitaciones parecidas.")
 
 # --- TAB 4: DETAIL ---
-with tab_detail:
-    if st.session_state.selected_code and st.session_state.selected_code in full_map:
+with tab_detail, recorder.span("tab.detail"):
+    data = details.get(st.session_state.selected_code) if st.session_state.selected_code else None
+    if data:
         code = st.session_state.selected_code
-        data = full_map[code]
         
         status = "Guardado" if code in saved_ids else ("Nuevo" if code not in history_ids else "Visto")
-        st.subheader(data.get("Nombre"))
-        st.caption(f"ID: {code} | Estado UI: {status} | Estado Lic: {data.get('Estado')}")
+        st.subheader(data["nombre"])
+        st.caption(f"ID: {code} | Estado UI: {status} | Estado Lic: {data['estado']}")
         
         c_btn, _ = st.columns([1, 4])
         with c_btn:
@@ -442,113 +433,131 @@ with tab_detail:
 
         st.divider()
         c1, c2 = st.columns(2)
-        sec1 = data.get("ExtendedMetadata", {}).get("Section_1_Características", {})
-        fechas = data.get("Fechas") or {}
 
         with c1:
-             st.markdown(f"**Organismo:** {str(data.get('Comprador', {}).get('NombreOrganismo', '-')).title()}")
-             st.markdown(f"**Tipo:** {sec1.get('Tipo de Licitación', '-')}")
-             st.markdown(f"**Cierre:** :red[{fechas.get('FechaCierre', 'No informado')}]")
+             st.markdown(f"**Organismo:** {data['organismo']}")
+             st.markdown(f"**Tipo:** {data['tipo']}")
+             st.markdown(f"**Cierre:** :red[{data['cierre']}]")
         with c2:
-             st.markdown(f"[🔗 Link MercadoPúblico]({data.get('URL_Documentos_Portal')})")
-             m_est = data.get("MontoEstimado")
-             if m_est and float(m_est) > 0:
-                 st.markdown(f"**Monto (API):** :gray[{format_clp(float(m_est))}]")
+             st.markdown(f"[🔗 Link MercadoPúblico]({data['url']})")
+             # API -> Presupuesto (Base) -> UTM estimate, resolved once per file version
+             if data["monto"]:
+                 label, color, text = data["monto"]
+                 st.markdown(f"**{label}:** :{color}[{text}]")
              else:
-                 p_text = sec1.get('Presupuesto')
-                 p_clean = clean_money_string(p_text)
-                 if p_clean > 0:
-                     st.markdown(f"**Presupuesto (Base):** :gray[{format_clp(p_clean)}]")
-                 else:
-                     est_val = estimate_monto(sec1.get('Tipo de Licitación', ''))
-                     if est_val > 0:
-                         st.markdown(f"**Monto (Estimado):** :orange[{format_clp(est_val)}]")
-                     else:
-                         st.markdown("**Monto:** No informado")
-
-        st.info(data.get("Descripcion", "Sin descripción"))
-        items = data.get('Items', {}).get('Listado', []) or data.get('DetalleArticulos', [])
-        if items:
+                 st.markdown("**Monto:** No informado")
+
+        st.info(data["descripcion"])
+        if data["items"] is not None:
             st.markdown("###### Items")
-            st.dataframe(pd.json_normalize(items), use_container_width=True)
-    else:
-        st.markdown("<br><h3 style='text-align:center; color:#ccc'>👈 Selecciona un ID arriba</h3>", unsafe_allow_html=True)
+            st.dataframe(data["items"], use_container_width=True)
 
-# --- TAB 5: AUDIT (FIXED) ---
-with tab_audit:
-    st.subheader("🕵️ Auditoría de Carga de Datos (Obras Civiles)")
-    st.markdown("Tabla de diagnóstico para ver por qué se filtran las filas.")
-    
-    # 1. READ RAW FILE MANUALLY
-    raw_list = []
-    if os.path.exists(JSON_FILE_OBRAS):
-        try:
-            with open(JSON_FILE_OBRAS, 'r', encoding='utf-8') as f:
-                raw_list = json.load(f)
-        except Exception as e:
-            st.error(f"Error leyendo JSON raw: {e}")
+        sim_rows = similar_rows([code])
+        if sim_rows is not None:
+            st.markdown("###### 🔗 Licitaciones similares")
+            render_similar(sim_rows, f"sim_sel_{code}")
     else:
-        st.error(f"Archivo {JSON_FILE_OBRAS} no encontrado.")
+        st.markdown("<br><h3 style='text-align:center; color:#ccc'>👈 Selecciona un ID arriba</h3>", unsafe_allow_html=True)
 
-    st.metric("Total Registros en JSON Raw", len(raw_list))
+# --- TAB 5: AUDIT ---
+@recorder.timed()
+def audit_view(filepath, date_range=None, categorias=None, organismos=None):
+    # Cached per-file audit (processing.audit_frame) + the per-rerun flags
+    return audit_status(get_dataset(filepath).audit(), hidden_ids, date_range, categorias, organismos)
+
+@recorder.timed()
+def change_timeline(filepath, code):
+    # One row per changed field, oldest first (change_log.py)
+    def text(value):
+        if value is None: return ""
+        out = json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else str(value)
+        return out if len(out) <= 200 else out[:200] + "…"
+    rows = [(ts[:19], field or "🆕 Primera versión", text(before), text(after))
+            for ts, field, before, after in get_dataset(filepath).log.timeline(code)]
+    return pd.DataFrame(rows, columns=["Fecha", "Campo", "Antes", "Después"])
+
+def render_timeline(filepath):
+    st.markdown("###### 🕒 Historial de cambios")
+    if get_dataset(filepath).log is None:
+        st.caption(f"Sin registro de cambios: {filepath} se reescribe completo en cada actualización "
+                   "(importarlo con `python change_log.py import`).")
+        return
+    code = st.text_input("Código de la licitación", value=st.session_state.selected_code or "", key=f"timeline_{filepath}")
+    if code:
+        df_t = change_timeline(filepath, code.strip())
+        if df_t.empty:
+            st.caption("Sin versiones registradas para ese código.")
+        else:
+            st.dataframe(df_t, hide_index=True, use_container_width=True)
+
+def render_audit(filepath, df_audit):
+    if get_dataset(filepath).log is None and not os.path.exists(filepath):
+        st.error(f"Archivo {filepath} no encontrado.")
+        return
+    if df_audit.empty:
+        st.warning(f"Archivo {filepath} vacío o ilegible.")
+        return
+
+    counts = df_audit["RESULTADO"].value_counts()
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Total Registros en JSON Raw", len(df_audit))
+    m2.metric("Con Problemas de Parseo", int((df_audit["Motivo"] != "").sum()))
+    m3.metric("Ocultos en DB", int(counts.get("👻 Oculto en DB", 0)))
+    m4.metric("Visibles", int(counts.get("✅ VISIBLE", 0)))
+
+    st.dataframe(
+        df_audit,
+        column_config={
+            "1. En JSON": st.column_config.CheckboxColumn(width="small"),
+            "2. Parseado (DF)": st.column_config.CheckboxColumn(width="small"),
+            "3. DB Oculto": st.column_config.CheckboxColumn(width="small"),
+            "4. Filtro UI": st.column_config.CheckboxColumn(width="small"),
+            "Motivo": st.column_config.TextColumn(width="medium"),
+            "RESULTADO": st.column_config.TextColumn(width="medium"),
+        },
+        hide_index=True,
+        use_container_width=True,
+        height=600
+    )
+
+with tab_audit, recorder.span("tab.audit"):
+    st.subheader("🕵️ Auditoría de Carga de Datos")
+    st.markdown("Tabla de diagnóstico para ver por qué se filtran las filas (con los filtros actuales de cada pestaña).")
+
+    audit_obras, audit_main = st.tabs([f"🚧 {JSON_FILE_OBRAS}", f"📥 {JSON_FILE_MAIN}"])
+    with audit_obras:
+        render_audit(JSON_FILE_OBRAS, audit_view(JSON_FILE_OBRAS, organismos=sel_orgs_o))
+        render_timeline(JSON_FILE_OBRAS)
+    with audit_main:
+        render_audit(JSON_FILE_MAIN, audit_view(
+            JSON_FILE_MAIN, date_range=date_range_m, categorias=sel_cats_m, organismos=sel_orgs_m))
+        render_timeline(JSON_FILE_MAIN)
 
-    if raw_list:
-        audit_data = []
-        
-        # Get set of IDs currently in the DataFrame (Successful loads)
-        df_ids = set(df_obras["Codigo"].tolist()) if not df_obras.empty else set()
-        
-        for item in raw_list:
-            code = item.get("CodigoExterno", "SIN_CODIGO")
-            name = item.get("Nombre", "")
-            
-            # Step 1: Loaded in DF?
-            is_loaded = code in df_ids
-            
-            # Step 2: Hidden in DB?
-            is_hidden = code in hidden_ids
-            
-            # Step 3: Filtered by UI?
-            # Manually check if the logic in Tab 2 filters it out
-            is_filtered_ui = False
-            if is_loaded:
-                # Get the row from the DF
-                row = df_obras[df_obras["Codigo"] == code].iloc[0]
-                
-                # Check Org Filter - FIXED VARIABLE NAME (sel_orgs_o)
-                if sel_orgs_o and row["Organismo"] not in sel_orgs_o:
-                    is_filtered_ui = True
-                
-                # We specifically removed date filter for Obras, so checking date is not needed here
-
-            # FINAL STATUS
-            if not is_loaded: status = "❌ Error Parseo"
-            elif is_hidden: status = "👻 Oculto en DB"
-            elif is_filtered_ui: status = "🔍 Filtrado UI"
-            else: status = "✅ VISIBLE"
-
-            audit_data.append({
-                "Codigo": code,
-                "Nombre": name,
-                "1. En JSON": True,
-                "2. Parseado (DF)": is_loaded,
-                "3. DB Oculto": is_hidden,
-                "4. Filtro Org": is_filtered_ui,
-                "RESULTADO": status
-            })
-        
-        df_audit = pd.DataFrame(audit_data)
-        
-        st.dataframe(
-            df_audit,
-            column_config={
-                "1. En JSON": st.column_config.CheckboxColumn(width="small"),
-                "2. Parseado (DF)": st.column_config.CheckboxColumn(width="small"),
-                "3. DB Oculto": st.column_config.CheckboxColumn(width="small"),
-                "4. Filtro Org": st.column_config.CheckboxColumn(width="small"),
-                "RESULTADO": st.column_config.TextColumn(width="medium"),
-            },
-            hide_index=True,
-            use_container_width=True,
-            height=600
-        )
+# ==========================================
+# ⏱️ PERFORMANCE PANEL
+# ==========================================
+def perf_table(stats, label):
+    # {name: [calls, seconds]} -> slowest first
+    rows = [(name, n, round(secs * 1000, 1)) for name, (n, secs) in stats.items()]
+    return pd.DataFrame(rows, columns=[label, "Veces", "ms"]).sort_values("ms", ascending=False)
+
+def render_perf(run):
+    sql = run["sqlite"]
+    st.caption(f"Esta ejecución: **{run['seconds'] * 1000:.0f} ms**, "
+               f"{sum(n for n, _ in sql.values())} consultas SQLite ({sum(s for _, s in sql.values()) * 1000:.0f} ms).")
+    st.dataframe(perf_table(run["span"], "Bloque"), hide_index=True, use_container_width=True)
+    st.dataframe(perf_table(sql, "Consulta"), hide_index=True, use_container_width=True)
+
+    caches = recorder.cache_totals()
+    st.dataframe(pd.DataFrame([(name, c["hit"], c["miss"]) for name, c in sorted(caches.items())],
+                              columns=["Caché", "Aciertos", "Fallos"]), hide_index=True, use_container_width=True)
+    recent = sorted(r["seconds"] for r in recorder.runs)
+    st.caption(f"Últimas {len(recent)} ejecuciones: mediana {recent[len(recent) // 2] * 1000:.0f} ms, "
+               f"máx {recent[-1] * 1000:.0f} ms (todas las sesiones).")
+    st.download_button("⬇️ Métricas (Prometheus)", recorder.prometheus(), file_name="idiem_perf.prom",
+                       mime="text/plain", use_container_width=True)
+
+if PERF_ENABLED:
+    perf_run = recorder.end_run()
+    with st.sidebar, st.expander("⏱️ Rendimiento", expanded=False):
+        render_perf(perf_run)
@@ -0,0 +1,32 @@
+import os
+import stat
+
+# ==========================================
+# 💾 ATOMIC WRITES (stdlib only: cheap to import from anywhere)
+# ==========================================
+# A file is written in full next to its target and then renamed over it, so a
+# reader never sees half of it: fd, tmp = temp_beside(path), write to fd,
+# replace_file(tmp, path) (remove tmp if anything fails in between).
+
+def temp_beside(path, prefix=".", suffix=".tmp"):
+    # (fd, name) of a new file in path's folder. Created the way open() creates
+    # a file (0666 minus the umask, applied by the OS), not with mkstemp's
+    # owner-only 0600, which os.replace would carry over to path
+    folder = os.path.dirname(os.path.abspath(path))
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp = os.path.join(folder, f"{prefix}{os.urandom(6).hex()}{suffix}")
+        try:
+            return os.open(tmp, flags, 0o666), tmp
+        except FileExistsError:
+            continue
+
+def replace_file(tmp, path):
+    # os.replace, keeping the mode of the file being replaced
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = None
+    if mode is not None:
+        os.chmod(tmp, mode)
+    os.replace(tmp, path)
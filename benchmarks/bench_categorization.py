@@ -0,0 +1,67 @@
+# Micro-benchmark: records/second of the old if-chain get_category against the
+# compiled CategoryEngine (per text and whole Series).
+#
+#   python benchmarks/bench_categorization.py [n_records]
+import json
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from categorization import get_engine  # noqa: E402
+
+SOURCES = ["FINAL_PRODUCTION_DATA.json", "OBRAS_CIVILES_DATA.json", "OBRAS_CIVILES_READY.json"]
+
+def legacy_get_category(text):
+    # get_category as it was before the rule table
+    if not text: return "General"
+    text = text.upper()
+    if re.search(r'\b(AIF|AIT|ATIF|ATOD|AFOS|ATO|ITO)\b', text): return "Inspección Técnica"
+    if re.search(r'\b(PACC|PCC)\b', text): return "Sustentabilidad"
+    if any(x in text for x in ["ASESORÍA INSPECCIÓN", "SUPERVISIÓN CONSTRUCCIÓN"]): return "Inspección Técnica"
+    if any(x in text for x in ["ESTRUCTURAL", "MECÁNICA SUELOS", "GEOLÓGICO", "GEOTÉCNICO", "ENSAYOS", "LABORATORIO"]): return "Ingeniería y Lab"
+    if any(x in text for x in ["TOPOGRÁFICO", "TOPOGRAFÍA", "LEVANTAMIENTO", "AEROFOTOGRAMETRÍA"]): return "Topografía"
+    if any(x in text for x in ["ARQUITECTURA", "DISEÑO ARQUITECTÓNICO"]): return "Arquitectura"
+    if any(x in text for x in ["EFICIENCIA ENERGÉTICA", "CERTIFICACIÓN", "SUSTENTABLE"]): return "Sustentabilidad"
+    if any(x in text for x in ["MODELACIÓN", "BIM", "COORDINACIÓN DIGITAL"]): return "BIM / Modelación"
+    return "Otras Civiles"
+
+def sample_names(n):
+    # Real tender names, suffixed so every text is distinct (no dedupe advantage)
+    base = []
+    for name in SOURCES:
+        path = os.path.join(ROOT, name)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                base += [str(r.get("Nombre", "")).title() for r in json.load(f)]
+    base = base or ["Estudio Geotécnico"]
+    return [f"{base[i % len(base)]} {i}" for i in range(n)]
+
+def timed(func):
+    start = time.perf_counter()
+    out = func()
+    return out, time.perf_counter() - start
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    names = sample_names(n)
+    engine = get_engine()
+
+    old, t_old = timed(lambda: [legacy_get_category(x) for x in names])
+    one, t_one = timed(lambda: [engine.categorize(x) for x in names])
+    batch, t_batch = timed(lambda: engine.categorize_series(pd.Series(names, dtype=object)))
+
+    assert one == batch.tolist()
+    changed = sum(a != b for a, b in zip(old, one))
+    print(f"records: {n}")
+    for label, secs in [("legacy get_category", t_old), ("engine per text", t_one), ("engine Series", t_batch)]:
+        print(f"{label:<22} {secs:8.3f} s  {n / secs:12,.0f} rec/s")
+    print(f"labels changed by accent folding: {changed}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# A refresh that touches a share of the records, stored as today (the whole
+# JSON rewritten, what ingestion.py does) against the change log
+# (change_log.py: only the changed fields appended), and what the app pays to
+# pick it up: TenderDataset.refresh() re-scanning the file against reading the
+# records appended since its version. Then the history reads the log adds:
+# state of the whole file / one record as of the first version, a timeline.
+# Bytes written are the process' write() calls (Linux: /proc/self/io).
+#
+#   python benchmarks/bench_change_log.py [n_records] [changed_share]
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from change_log import ChangeLog, LogRecords  # noqa: E402
+from processing import TenderDataset, iter_json_array, write_records  # noqa: E402
+from synth_tenders import write_dataset  # noqa: E402
+
+def written():
+    try:
+        with open("/proc/self/io") as f:
+            return int(next(line for line in f if line.startswith("wchar:")).split()[1])
+    except (OSError, StopIteration):
+        return 0
+
+def timed(func):
+    start, before = time.perf_counter(), written()
+    out = func()
+    return time.perf_counter() - start, written() - before, out
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "tenders.json")
+    write_dataset(path, n)
+    records = {}
+    for _, _, item in iter_json_array(path):
+        if item.get("CodigoExterno"): records[item["CodigoExterno"]] = item
+    records = list(records.values())
+    write_records(path, records)
+    dataset = os.path.basename(path)
+
+    log = ChangeLog(os.path.join(folder, "log.db"))
+    t0 = datetime(2026, 1, 1)
+    seconds, _, _ = timed(lambda: log.append(dataset, records, when=t0))
+    # Size once the WAL is checkpointed back into the database file
+    log._conn().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    db_mb = os.path.getsize(log.path) / 2 ** 20
+    print(f"records: {len(records)}, JSON {os.path.getsize(path) / 2 ** 20:.0f} MB, "
+          f"first import into the log {seconds:.1f} s ({db_mb:.0f} MB)\n")
+
+    from_file = TenderDataset(path, lazy=True)
+    from_log = TenderDataset(path, log=LogRecords(log, dataset))
+    print(f"{'load (new process)':<34} {'file':>9} {'log':>9}")
+    load_file = timed(lambda: TenderDataset(path, lazy=True))[0]
+    load_log = timed(lambda: TenderDataset(path, log=LogRecords(log, dataset)))[0]
+    print(f"{'TenderDataset()':<34} {load_file:8.2f}s {load_log:8.2f}s\n")
+
+    # One ingestion: state and closing date moved on a share of the records
+    rng = random.Random(1)
+    changed = rng.sample(records, int(len(records) * share))
+    for item in changed:
+        item["Estado"] = "Cerrada"
+        item.setdefault("Fechas", {})["FechaCierre"] = "2026-02-01T15:00:00"
+    print(f"{'refresh, ' + format(share, '.0%') + ' of records changed':<34} {'file':>9} {'log':>9}")
+    w_file = timed(lambda: write_records(path, records))
+    w_log = timed(lambda: log.append(dataset, changed, when=t0 + timedelta(days=1)))
+    print(f"{'ingestion write (s)':<34} {w_file[0]:8.2f}s {w_log[0]:8.2f}s")
+    print(f"{'ingestion write (MB)':<34} {w_file[1] / 2 ** 20:8.1f}  {w_log[1] / 2 ** 20:8.1f}")
+    r_file = timed(from_file.refresh)
+    r_log = timed(from_log.refresh)
+    print(f"{'app refresh()':<34} {r_file[0]:8.2f}s {r_log[0]:8.2f}s")
+    assert from_file.df.equals(from_log.df)
+
+    print("\nhistory (log only)")
+    code = changed[0]["CodigoExterno"]
+    for label, func in [
+        ("whole file as of the import", lambda: log.as_of(dataset, t0)),
+        ("one record as of the import", lambda: log.as_of(dataset, t0, codes=[code])),
+        ("timeline of one record", lambda: log.timeline(dataset, code)),
+        ("compact (checkpoints)", lambda: log.compact(dataset)),
+    ]:
+        seconds = timed(func)[0]
+        print(f"{label:<34} {seconds * 1000:8.1f}ms")
+
+if __name__ == "__main__":
+    main()
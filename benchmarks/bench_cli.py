@@ -0,0 +1,50 @@
+# Wall time of fresh processes on synthetic files: export.py (headless batch
+# export, same queries as the tabs) against the Streamlit app's first script
+# run (streamlit.testing AppTest, no browser), each on a cold working folder
+# (no tenders table / snapshots yet) and then again with that state on disk.
+# `export.py --help` shows the import cost a cron job pays before any work.
+#
+#   python benchmarks/bench_cli.py [n_records]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loader import JSON_FILE_MAIN, JSON_FILE_OBRAS  # noqa: E402
+from synth_tenders import write_dataset  # noqa: E402
+
+APP_RUN = ("import sys; from streamlit.testing.v1 import AppTest; "
+           "at = AppTest.from_file(sys.argv[1], default_timeout=600); at.run(); "
+           "sys.exit(1 if at.exception else 0)")
+
+def wall(cmd, cwd):
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    python = sys.executable
+    export = [python, os.path.join(ROOT, "export.py")]
+    print(f"records: {n} (Disponibles) + {n // 4} (Obras)\n")
+    print(f"{'process':<40} {'cold':>8} {'warm':>8}")
+    print(f"{'export.py --help':<40} {wall(export + ['--help'], ROOT):7.2f}s {wall(export + ['--help'], ROOT):7.2f}s")
+
+    cases = [
+        ("export.py disponibles -> csv", export + ["out.csv"]),
+        ("export.py por-cerrar -> parquet", export + ["out.parquet", "--tab", "por-cerrar", "--dias", "30"]),
+        ("app.py first run (AppTest)", [python, "-c", APP_RUN, os.path.join(ROOT, "app.py")]),
+    ]
+    for label, cmd in cases:
+        folder = tempfile.mkdtemp()
+        write_dataset(os.path.join(folder, JSON_FILE_MAIN), n, seed=1)
+        write_dataset(os.path.join(folder, JSON_FILE_OBRAS), n // 4, seed=2)
+        print(f"{label:<40} {wall(cmd, folder):7.2f}s {wall(cmd, folder):7.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# The frame-building part of a TenderDataset start-up (what a new process /
+# restart pays per file after the JSON scan, which is the same in every case)
+# by what its snapshot has to offer: nothing (derive every record), the same
+# file version (map it as is), a later version with a share of the records
+# changed (derive only those, reuse the rest by source hash) and a rule-table
+# change (derive_key differs: everything again).
+#
+#   python benchmarks/bench_derived_cache.py [n_records] [changed_share]
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import processing  # noqa: E402
+from processing import TenderDataset, file_signature, read_records, scan_records, write_records  # noqa: E402
+from shared_frame import available  # noqa: E402
+from synth_tenders import write_dataset  # noqa: E402
+
+def timed(func):
+    gc.collect()
+    start = time.perf_counter()
+    out = func()
+    return time.perf_counter() - start, out
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    repeat = 3
+    if not available():
+        raise SystemExit("pyarrow no está instalado")
+    folder = tempfile.mkdtemp()
+    path, snapshot = os.path.join(folder, "tenders.json"), os.path.join(folder, "frames", "tenders.arrow")
+    write_dataset(path, n)
+    scan, ds = timed(lambda: TenderDataset(path, lazy=True, snapshot=snapshot))
+    print(f"records: {n}, first start-up (JSON scan included): {scan:.2f} s\n")
+    print(f"{'snapshot':<28} {'frame':>9} {'derived':>9}   (best of {repeat})")
+
+    def case(label, prepare):
+        # The snapshot is put back in its starting state before each run
+        rows, sig = scan_records(path)[0], file_signature(path)
+        runs = []
+        for _ in range(repeat):
+            prepare()
+            runs.append(timed(lambda: ds._rebuild(rows, sig))[0])
+        print(f"{label:<28} {min(runs) * 1000:7.0f}ms {ds.derived:9,}")
+
+    def no_snapshot():
+        if os.path.exists(snapshot): os.remove(snapshot)
+    kept = os.path.join(folder, "kept.arrow")
+    shutil.copy(snapshot, kept)
+    case("none", no_snapshot)
+    case("same file version", lambda: shutil.copy(kept, snapshot))
+
+    # A later ingestion: some records edited, the snapshot still the old one
+    records = read_records(path)
+    for item in random.Random(1).sample(records, int(len(records) * share)):
+        item["Nombre"] = f"{item.get('Nombre') or ''} (MODIFICADA)"
+    write_records(path, records)
+    ds.refresh()
+    case(f"{share:.0%} of records changed", lambda: shutil.copy(kept, snapshot))
+
+    processing.rules_fingerprint = lambda: "otra tabla"
+    case("category rules changed", lambda: shutil.copy(kept, snapshot))
+    shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
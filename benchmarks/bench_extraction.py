@@ -0,0 +1,119 @@
+# ExtendedMetadata extraction from saved portal pages: one process vs the
+# process pool, then a cached re-run where only edited pages are parsed again.
+# Fixture pages are rendered from the ExtendedMetadata already in the shipped
+# files (plus criterios/garantías/montos), so every parse is checked against
+# the metadata it was rendered from.
+#
+#   python benchmarks/bench_extraction.py [n_pages] [workers]
+import html
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from extraction import SECTIONS, ExtractionCache, extract_pages  # noqa: E402
+
+SOURCES = ["FINAL_PRODUCTION_DATA.json", "OBRAS_CIVILES_DATA.json"]
+# Portal chrome around the sections (menus, scripts...), so pages have a realistic size
+FILLER = "<div class='menu'>" + "<a href='#'>Enlace del portal</a> " * 400 + "</div>\n"
+
+def sample_metadata(rng):
+    base = []
+    for name in SOURCES:
+        with open(os.path.join(ROOT, name), 'r', encoding='utf-8') as f:
+            base += [r["ExtendedMetadata"] for r in json.load(f) if r.get("ExtendedMetadata")]
+    meta = json.loads(json.dumps(rng.choice(base)))
+    meta["Section_6_Criterios"] = [
+        {"Ítem": item, "Observaciones": f"Según bases {rng.randint(1, 9)}", "Ponderación": f"{pond}%"}
+        for item, pond in [("Oferta económica", rng.choice([40, 50, 60])), ("Experiencia", 30), ("Plazo", 10)]
+    ]
+    meta["Section_7_Montos"] = {"Monto Total Estimado": str(rng.randint(10, 5000) * 1000000),
+                                "Duración del contrato": f"{rng.randint(30, 720)} Días"}
+    meta["Section_8_Garantias"] = [
+        {"Tipo de documento": "Boleta de Garantía", "Beneficiario": "Municipalidad",
+         "Monto": f"{rng.randint(1, 10)}%", "Descripción": "Fiel cumplimiento de contrato"},
+    ]
+    return meta
+
+def render_ficha(code, meta):
+    def pairs(d):
+        rows = "".join(f"<tr><td><span>{html.escape(k)}:</span></td><td><span>{html.escape(str(v))}</span></td></tr>"
+                       for k, v in d.items())
+        return f"<table class='ficha'>{rows}</table>"
+
+    parts = [f"<html><head><title>Ficha {code}</title><script>var x = 1;</script></head><body>", FILLER]
+    titles = {1: "Características de la licitación", 6: "Criterios de evaluación",
+              7: "Montos y duración del contrato", 8: "Garantías requeridas"}
+    for number, (key, shape) in SECTIONS.items():
+        parts.append(f"<div class='seccion'><h3>{number}. {titles[number]}</h3>")
+        value = meta.get(key)
+        if shape == "pairs" and value:
+            parts.append(pairs(value))
+        elif shape == "table" and value:
+            head = "".join(f"<th>{html.escape(h)}</th>" for h in value[0])
+            body = "".join("<tr>" + "".join(f"<td>{html.escape(str(v))}</td>" for v in row.values()) + "</tr>"
+                           for row in value)
+            parts.append(f"<table><tr>{head}</tr>{body}</table>")
+        elif shape == "blocks":
+            parts += [pairs(block) for block in value or []]
+        parts.append("</div>")
+    # Portal sections we don't keep come after the last one we do
+    parts.append("<div class='seccion'><h3>9. Requisitos para contratar al proveedor adjudicado</h3>"
+                 "<table><tr><td>Persona natural</td><td>Según bases</td></tr></table></div>")
+    parts.append(FILLER + "</body></html>")
+    return "\n".join(parts)
+
+def normalized(meta):
+    # The parser returns text; whitespace is collapsed like the portal renders it
+    return json.loads(json.dumps(meta, ensure_ascii=False).replace("\\n", " "))
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    rng = random.Random(0)
+    folder = tempfile.mkdtemp()
+    pages_dir = os.path.join(folder, "fichas")
+    os.makedirs(pages_dir)
+
+    expected, pages = {}, {}
+    for i in range(n):
+        code = f"{1000 + i}-{rng.randint(1, 99)}-LE26"
+        meta = sample_metadata(rng)
+        path = os.path.join(pages_dir, f"{code}.html")
+        text = render_ficha(code, meta)
+        if i % 100 == 99:
+            text = "<html><body>Error 500 - página no disponible</body></html>"
+            meta = None
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        expected[code], pages[code] = meta, path
+    size = sum(os.path.getsize(p) for p in pages.values()) / n / 1024
+    print(f"pages: {n}  avg size: {size:.0f} KB  cpus: {os.cpu_count()}")
+
+    t = time.perf_counter()
+    _, _, seq = extract_pages(pages, workers=1)
+    print(f"1 process, no cache:       {time.perf_counter() - t:6.2f} s  parsed={seq['parsed']} failed={seq['failed']}")
+
+    cache = ExtractionCache(os.path.join(folder, "cache.db"))
+    meta, errors, cold = extract_pages(pages, cache, workers=workers)
+    print(f"process pool, cold cache:  {cold['seconds']:6.2f} s  parsed={cold['parsed']} failed={cold['failed']}")
+
+    wrong = [c for c, m in expected.items() if m is not None and meta.get(c) != normalized(m)]
+    missing = [c for c, m in expected.items() if m is None and c not in errors]
+    print(f"round trip mismatches: {len(wrong)}  unreported failures: {len(missing)}")
+
+    # 5% of the pages change, the rest must come from the cache
+    for code in rng.sample([c for c in pages if expected[c]], n // 20):
+        expected[code]["Section_7_Montos"]["Monto Total Estimado"] = "1"
+        with open(pages[code], 'w', encoding='utf-8') as f:
+            f.write(render_ficha(code, expected[code]))
+    _, _, warm = extract_pages(pages, cache, workers=workers)
+    print(f"process pool, warm cache:  {warm['seconds']:6.2f} s  parsed={warm['parsed']} cached={warm['cached']}")
+
+if __name__ == "__main__":
+    main()
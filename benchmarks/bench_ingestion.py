@@ -0,0 +1,66 @@
+# Refresh time of ingestion.py against the local stub API: one-by-one fetch
+# (the old script's pattern) vs the pooled concurrent client, then a second
+# run where only the tenders whose state changed are fetched again. The
+# output file is checked by loading it with processing.TenderDataset.
+#
+#   python benchmarks/bench_ingestion.py [n_tenders] [latency_s] [workers]
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion import MercadoPublicoClient, ingest  # noqa: E402
+from processing import TenderDataset  # noqa: E402
+from stub_mercadopublico import StubAPI, make_tenders  # noqa: E402
+
+def run(api, path, workers, rate, **kw):
+    client = MercadoPublicoClient("stub", base_url=api.url, workers=workers, rate=rate, backoff=0.05)
+    try:
+        return ingest(client, path, client.listing(estado="activas"), **kw)
+    finally:
+        client.close()
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    api = StubAPI(make_tenders(n), latency=latency, fail_rate=0.02).start()
+    folder = tempfile.mkdtemp()
+
+    try:
+        # Sequential baseline on a sample, extrapolated (the full run takes n * latency)
+        sample = min(n, 100)
+        seq_path = os.path.join(folder, "sequential.json")
+        t = time.perf_counter()
+        run(api, seq_path, workers=1, rate=0, select=lambda s, keep=set(list(api.tenders)[:sample]): s["CodigoExterno"] in keep)
+        seq = (time.perf_counter() - t) * n / sample
+        print(f"tenders: {n}  latency: {latency * 1000:.0f} ms  fail rate: 2%")
+        print(f"sequential (1 worker):          ~{seq:7.1f} s  (extrapolated from {sample})")
+
+        path = os.path.join(folder, "out.json")
+        cold = run(api, path, workers=workers, rate=0)
+        print(f"cold, {workers} workers:             {cold['seconds']:7.2f} s  fetched={cold['fetched']} "
+              f"retries={cold['retries']} failed={len(cold['failed'])} connections={len(api.connections)}")
+
+        # 5% of the tenders change state, the rest must be skipped
+        changed = random.Random(1).sample(list(api.tenders), max(1, n // 20))
+        for code in changed:
+            # Publicada (5) <-> Cerrada (6)
+            api.set_state(code, 6 if api.tenders[code].get("CodigoEstado") == 5 else 5)
+        warm = run(api, path, workers=workers, rate=0)
+        print(f"warm, {len(changed)} changed:              {warm['seconds']:7.2f} s  fetched={warm['fetched']} "
+              f"skipped={warm['skipped']}")
+
+        ds = TenderDataset(path)
+        ok = len(ds.df) == n and ds.df["Codigo"].notna().all() and ds.df["URL"].notna().all()
+        print(f"TenderDataset rows: {len(ds.df)}  schema ok: {bool(ok)}")
+    finally:
+        api.stop()
+
+if __name__ == "__main__":
+    main()
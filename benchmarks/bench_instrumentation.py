@@ -0,0 +1,90 @@
+# Cost of the instrumentation layer (instrumentation.py), off and on: a bare
+# span / decorated call, one SQLite statement through TracedConnection against
+# a plain sqlite3 connection, and the tab queries of a TenderStore grown to
+# n rows from the synthetic generator.
+#
+#   python benchmarks/bench_instrumentation.py [n_rows]
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from instrumentation import Recorder, TracedConnection, recorder  # noqa: E402
+from processing import TenderDataset  # noqa: E402
+from synth_tenders import write_dataset  # noqa: E402
+from tender_store import TenderStore  # noqa: E402
+
+def per_call(func, n, repeat=5):
+    # Median seconds per call over `repeat` loops of n calls
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        times.append((time.perf_counter() - start) / n)
+    return statistics.median(times)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    folder = tempfile.mkdtemp()
+
+    rec = Recorder()
+    @rec.timed()
+    def decorated():
+        pass
+    def plain():
+        pass
+    def with_span():
+        with rec.span("x"):
+            pass
+
+    print(f"{'':<34} {'off':>10} {'on':>10}")
+    base = per_call(plain, 200000)
+    rows = []
+    for label, func, calls in [("span()", with_span, 200000), ("@timed() call", decorated, 200000)]:
+        rec.enabled = False
+        off = per_call(func, calls) - base
+        rec.enabled = True
+        on = per_call(func, calls) - base
+        rows.append((label, off, on))
+
+    db = os.path.join(folder, "micro.db")
+    plain_conn = sqlite3.connect(db, isolation_level=None)
+    traced_conn = sqlite3.connect(db, isolation_level=None, factory=TracedConnection)
+    sql_plain = per_call(lambda: plain_conn.execute("SELECT 1").fetchone(), 50000)
+    recorder.enabled = False
+    sql_off = per_call(lambda: traced_conn.execute("SELECT 1").fetchone(), 50000) - sql_plain
+    recorder.enabled = True
+    sql_on = per_call(lambda: traced_conn.execute("SELECT 1").fetchone(), 50000) - sql_plain
+    rows.append(("SQLite statement (vs sqlite3)", sql_off, sql_on))
+    for label, off, on in rows:
+        print(f"{label:<34} {off * 1e9:8.0f}ns {on * 1e9:8.0f}ns")
+
+    path = os.path.join(folder, "tenders.json")
+    write_dataset(path, n)
+    df = TenderDataset(path, lazy=True).df
+    store = TenderStore(os.path.join(folder, "bench.db"))
+    store.sync("main", df)
+    opts = store.filter_options("main")
+    hidden = set(df["Codigo"].dropna().sample(frac=0.01, random_state=1))
+    def tab_queries():
+        store.filter_options("main")
+        store.query("main", hidden=hidden, limit=100, date_range=(opts["min_date"], opts["max_date"]))
+        store.query("main", hidden=hidden, limit=100, organismos=opts["organismos"][:3])
+        store.query("main", hidden=hidden, limit=100, offset=5000)
+    recorder.enabled = False
+    off = per_call(tab_queries, 20)
+    recorder.enabled = True
+    on = per_call(tab_queries, 20)
+    recorder.enabled = False
+    print(f"\n{n} rows, tab queries per rerun:   off {off * 1000:6.2f} ms   on {on * 1000:6.2f} ms "
+          f"({(on / off - 1) * 100:+.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Memory of the parsed tender frame in the old layout (display text for every
+# row, days as Python date objects, low-cardinality text repeated per row)
+# against the compact one (processing.FRAME_COLS: categoricals, datetime64,
+# display text only for the page on screen), and what every Streamlit session
+# added on top before the frames were shared:
+#   before: st.cache_data hands each session its own deserialized copy of
+#           both frames, the Guardadas tab concats + dedupes them, and every
+#           tab copies its filtered frame (prepare_view)
+#   now:    one shared frame per file; a session only holds its grid pages
+#
+#   python benchmarks/bench_memory.py [n_records]
+import os
+import pickle
+import sys
+import tempfile
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from processing import CATEGORY_COLS, DATE_COLS, TenderDataset, display_frame  # noqa: E402
+from synth_tenders import write_dataset  # noqa: E402
+from tender_store import TenderStore  # noqa: E402
+
+PAGE_SIZE = 100  # app.PAGE_SIZE
+TABS = 3         # Disponibles, Obras Civiles, Guardadas
+
+def mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+def legacy_frame(df):
+    # The layout derive_frame produced before: text columns (display ones
+    # included) as plain strings, days as date objects
+    out = display_frame(df).astype({c: "str" for c in CATEGORY_COLS + ["Monto", "Fecha Pub", "Fecha Cierre"]})
+    for c in DATE_COLS:
+        out[c] = out[c].dt.date.astype(object).where(out[c].notna(), None)
+    return out
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "tenders.json")
+    write_dataset(path, n)
+    compact = TenderDataset(path, lazy=True).df
+    legacy = legacy_frame(compact)
+
+    print(f"records: {n}")
+    print(f"{'column':<16} {'before MB':>10} {'now MB':>10}")
+    before, now = legacy.memory_usage(deep=True) / 2 ** 20, compact.memory_usage(deep=True) / 2 ** 20
+    for col in legacy.columns:
+        print(f"{col:<16} {before[col]:10.2f} {now.get(col, 0):10.2f}")
+    print(f"{'frame total':<16} {mb(legacy):10.2f} {mb(compact):10.2f}")
+
+    # Per session, before: two unpickled frames (the same file stands in for
+    # both), the saved-tab concat and one filtered copy per tab
+    copies = [pickle.loads(pickle.dumps(legacy)) for _ in range(2)]
+    combined = pd.concat(copies).drop_duplicates(subset=["Codigo"])
+    views = [copies[0].copy(), copies[1].copy(), combined[combined["Codigo"].isin([])].copy()]
+    session_before = sum(mb(x) for x in copies + [combined] + views)
+
+    # Now: the grid pages a rerun builds (rows come from the tender store)
+    store = TenderStore(os.path.join(folder, "bench.db"))
+    store.sync("main", compact)
+    pages = [store.query("main", limit=PAGE_SIZE)[0] for _ in range(TABS)]
+    session_now = sum(mb(p) for p in pages)
+
+    print(f"\nper session      {session_before:10.2f} {session_now:10.2f}")
+    for sessions in (1, 5, 20):
+        total_before = sessions * session_before
+        total_now = 2 * mb(compact) + sessions * session_now
+        print(f"{sessions:>2} sessions      {total_before:10.1f} {total_now:10.1f}  (2 files)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Memory and start-up cost of the parsed frame per process: derived on the
+# heap (each Streamlit worker process parses its own copy) against attached
+# from the memory-mapped Arrow snapshot (shared_frame.py) that the first
+# process wrote. Each worker runs in its own interpreter and reports how long
+# opening the dataset took (file scan included) and how much of its resident
+# memory the whole dataset adds that is private to it
+# (Linux: /proc/self/smaps_rollup) -- mapped pages are shared, so they show up
+# as Shared_* and count once however many workers map them.
+#
+#   python benchmarks/bench_shared_frame.py [n_records] [workers]
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from shared_frame import available  # noqa: E402
+
+def smaps():
+    # {"private": MB, "shared": MB} of this process (None off Linux)
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line and not line.startswith("0"))
+    except OSError:
+        return None
+    kb = lambda *names: sum(int(fields[n].split()[0]) for n in names if n in fields)
+    return {"private": kb("Private_Clean", "Private_Dirty") / 1024, "shared": kb("Shared_Clean", "Shared_Dirty") / 1024}
+
+def worker(path, snapshot, mode):
+    # One process: the whole TenderDataset as the app opens it (scan, frame,
+    # what refresh keeps for the next reload, the audit), then every column
+    # touched. A small file is opened first, so the modules imported on first
+    # use don't count as the dataset's memory.
+    import gc
+    from processing import TenderDataset
+    tiny, tiny_snapshot = path + ".tiny.json", snapshot + ".tiny.arrow"
+    TenderDataset(tiny, lazy=True, snapshot=tiny_snapshot if mode == "mapped" else None).audit()
+    gc.collect()
+    before = smaps()
+    start = time.perf_counter()
+    ds = TenderDataset(path, lazy=True, snapshot=snapshot if mode == "mapped" else None)
+    ds.audit()
+    seconds = time.perf_counter() - start
+    df = ds.df
+    for col in df.columns:
+        df[col].iloc[len(df) // 2]
+    df["Organismo"].value_counts()
+    df["Nombre"].str.len().sum()
+    gc.collect()
+    after = smaps()
+    out = {"seconds": seconds, "rows": len(df), "derived": ds.derived}
+    if before and after:
+        out.update(private=after["private"] - before["private"], shared=after["shared"] - before["shared"])
+    print(json.dumps(out))
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    if not available():
+        raise SystemExit("pyarrow no está instalado")
+    from processing import TenderDataset
+    from synth_tenders import write_dataset
+    folder = tempfile.mkdtemp()
+    path, snapshot = os.path.join(folder, "tenders.json"), os.path.join(folder, "frames", "tenders.arrow")
+    write_dataset(path, n)
+    write_dataset(path + ".tiny.json", 50)
+    TenderDataset(path + ".tiny.json", lazy=True, snapshot=snapshot + ".tiny.arrow")
+    start = time.perf_counter()
+    TenderDataset(path, lazy=True, snapshot=snapshot)
+    print(f"records: {n}, first process (scan + derive + snapshot): {time.perf_counter() - start:.2f} s, "
+          f"snapshot {os.path.getsize(snapshot) / 2 ** 20:.1f} MB")
+
+    print(f"\n{'mode':<8} {'open':>10} {'private MB':>11} {'shared MB':>10}   (per worker, {workers} workers at once)")
+    for mode in ("heap", "mapped"):
+        procs = [subprocess.Popen([sys.executable, __file__, "--worker", path, snapshot, mode], stdout=subprocess.PIPE, text=True)
+                 for _ in range(workers)]
+        results = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+        avg = lambda k: sum(r.get(k, 0) for r in results) / len(results)
+        print(f"{mode:<8} {avg('seconds') * 1000:8.0f}ms {avg('private'):11.1f} {avg('shared'):10.1f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(*sys.argv[2:5])
+    else:
+        main()
@@ -0,0 +1,84 @@
+# "Licitaciones similares" (similarity.py) on a synthetic file: batch build of
+# the hashed TF-IDF index, its size on disk and load time in a new process,
+# lookups (one tender / the centroid of a saved set) against a plain Python
+# cosine over per-tender dicts, and an incremental sync of a share of the
+# records against rebuilding it all.
+#
+#   python benchmarks/bench_similarity.py [n_records] [changed_share]
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from processing import iter_json_array  # noqa: E402
+from similarity import SimilarityIndex, similar, terms  # noqa: E402
+from synth_tenders import write_dataset  # noqa: E402
+
+def timed(func):
+    start = time.perf_counter()
+    out = func()
+    return time.perf_counter() - start, out
+
+def ms(func, codes):
+    return statistics.median(timed(lambda: func(code))[0] for code in codes) * 1000
+
+def python_top(vectors, code, k=10):
+    # Baseline: cosine of raw term counts against every tender, one at a time
+    query = vectors[code]
+    qn = sum(v * v for v in query.values()) ** 0.5
+    scores = []
+    for other, vec in vectors.items():
+        if other == code:
+            continue
+        dot = sum(w * vec.get(t, 0) for t, w in query.items())
+        if dot:
+            scores.append((dot / (qn * sum(v * v for v in vec.values()) ** 0.5), other))
+    return sorted(scores, reverse=True)[:k]
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "tenders.json")
+    write_dataset(path, n)
+    records = [item for _, _, item in iter_json_array(path)]
+    codes = [item["CodigoExterno"] for item in records if item.get("CodigoExterno")]
+    rng = random.Random(1)
+    sample = rng.sample(codes, 20)
+
+    index_path = os.path.join(folder, "tenders.similar.npz")
+    build, _ = timed(lambda: SimilarityIndex(index_path).sync(records, signature="v1"))
+    load, index = timed(lambda: SimilarityIndex(index_path))
+    print(f"records: {len(index)}, build {build:.1f} s, "
+          f"index {os.path.getsize(index_path) / 2 ** 20:.1f} MB, load {load * 1000:.0f} ms\n")
+
+    print(f"{'lookup (median)':<34} {'python':>9} {'numpy':>9}")
+    vectors = {item["CodigoExterno"]: Counter(terms(item)) for item in records if item.get("CodigoExterno")}
+    slow = ms(lambda code: python_top(vectors, code), sample[:3])
+    fast = ms(lambda code: similar([index], [code]), sample)
+    print(f"{'top-10 of one tender':<34} {slow:7.0f}ms {fast:7.1f}ms")
+    saved = rng.sample(codes, 50)
+    fast = ms(lambda _: similar([index], saved), range(5))
+    print(f"{'top-10 for a saved set of 50':<34} {'':>9} {fast:7.1f}ms\n")
+
+    changed = rng.sample(records, int(len(records) * share))
+    for item in changed:
+        item["Nombre"] = "ESTUDIO GEOTECNICO " + str(item.get("Nombre", ""))
+    dirty = {item["CodigoExterno"] for item in changed if item.get("CodigoExterno")}
+    inc, _ = timed(lambda: index.sync(changed, dirty, signature="v2"))
+    full, rebuilt = timed(lambda: (lambda ix: (ix.sync(records), ix)[1])(SimilarityIndex()))
+    print(f"{'reload, ' + format(share, '.0%') + ' of records changed':<34} {'full':>9} {'sync':>9}")
+    print(f"{'index update':<34} {full:8.2f}s {inc:8.2f}s")
+    # Same neighbours as a rebuild, up to idf drift of the untouched rows
+    a, b = similar([index], sample[:5]), similar([rebuilt], sample[:5])
+    print(f"top-10 overlap with a rebuild: {len({c for c, _ in a} & {c for c, _ in b})}/{len(b)}")
+
+if __name__ == "__main__":
+    main()
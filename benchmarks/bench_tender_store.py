@@ -0,0 +1,88 @@
+# Latency of the tab queries: in-memory DataFrame filtering (as the tabs did it)
+# against the SQLite TenderStore, on a frame grown to n rows from the real files.
+#
+#   python benchmarks/bench_tender_store.py [n_rows] [hidden_count]
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from processing import load_tenders  # noqa: E402
+from tender_store import TenderStore  # noqa: E402
+
+GRID_LIMIT = 2000
+
+def grow_frame(n):
+    # Real rows repeated with unique codes and publication/closing dates spread over ~3 years
+    base = pd.concat([load_tenders(os.path.join(ROOT, f))[0]
+                      for f in ("FINAL_PRODUCTION_DATA.json", "OBRAS_CIVILES_DATA.json")], ignore_index=True)
+    df = base.iloc[[i % len(base) for i in range(n)]].reset_index(drop=True)
+    df["Codigo"] = [f"{c}-{i}" for i, c in enumerate(df["Codigo"])]
+    shift = pd.to_timedelta(np.arange(n) % 1000, unit="D")
+    for col in ("FechaPubObj", "FechaCierreObj"):
+        df[col] = df[col] - shift
+    return df
+
+def legacy_view(df, hidden, date_range=None, cats=None, orgs=None, codes=None):
+    view = df.copy()
+    if date_range:
+        lo, hi = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+        view = view[(view["FechaCierreObj"] >= lo) & (view["FechaCierreObj"] <= hi)]
+    if cats: view = view[view["Categoria"].isin(cats)]
+    if orgs: view = view[view["Organismo"].isin(orgs)]
+    if codes is not None: view = view[view["Codigo"].isin(codes)]
+    view = view[~view["Codigo"].isin(hidden)].copy()
+    return view.sort_values(by=["FechaPubObj"], ascending=False)
+
+def timed(func, repeat=7):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    n_hidden = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    df = grow_frame(n)
+    hidden = set(df["Codigo"].sample(n_hidden, random_state=1))
+    saved = set(df["Codigo"].sample(200, random_state=2))
+
+    store = TenderStore(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    start = time.perf_counter()
+    store.sync("main", df)
+    print(f"rows: {n}  hidden: {n_hidden}  sync: {time.perf_counter() - start:.2f} s")
+
+    opts = store.filter_options("main")
+    lo, hi = opts["min_date"], opts["max_date"]
+    month = (hi - timedelta(days=30), hi)
+    cats, orgs = opts["categorias"][:2], opts["organismos"][:3]
+    cases = [
+        ("no filters", {}),
+        ("date range (30 days)", {"date_range": month}),
+        ("date range (all)", {"date_range": (lo, hi)}),
+        ("2 categorias", {"categorias": cats}),
+        ("3 organismos", {"organismos": orgs}),
+        ("saved tab", {"codes": saved}),
+    ]
+    print(f"{'query':<22} {'DataFrame':>10} {'SQLite':>10} {'rows':>8}")
+    for label, kw in cases:
+        legacy = {"date_range": kw.get("date_range"), "cats": kw.get("categorias"),
+                  "orgs": kw.get("organismos"), "codes": kw.get("codes")}
+        t_df = timed(lambda: legacy_view(df, hidden, **legacy))
+        t_sql = timed(lambda: store.query("main", hidden=hidden, limit=GRID_LIMIT, **kw))
+        total = store.query("main", hidden=hidden, limit=GRID_LIMIT, **kw)[1]
+        print(f"{label:<22} {t_df:8.1f}ms {t_sql:8.1f}ms {total:8d}")
+    print(f"filter options (cached): {timed(lambda: store.filter_options('main')):.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# Benchmark suite for the app's hot paths, run outside Streamlit on synthetic
+# files (benchmarks/synth_tenders.py) at several scales. Every case is timed
+# (median of --repeat runs after a warm-up) and then run once more under tracemalloc for its
+# peak memory. Results go to a JSON file that --compare checks against an
+# earlier run (e.g. the parent commit's), exiting 1 on regressions.
+#
+#   python benchmarks/run_benchmarks.py [--sizes 1000,10000,100000] [--out results.json]
+#   python benchmarks/run_benchmarks.py --sizes 1000000 --repeat 1 --no-memory
+#   python benchmarks/run_benchmarks.py --compare old.json           (run, then compare)
+#   python benchmarks/run_benchmarks.py --diff old.json new.json     (compare two saved runs)
+#
+# Cases: load_data (lazy streaming, as the app runs, and eager json.load up to
+# --eager-max), derive_frame, get_category / categorize_series,
+# clean_money_string / estimate_monto (scalar loop and Series), prepare_view
+# (one grid page and the whole frame), the tab filter chains against the
+# TenderStore (sync, then filter_options + query + prepare_view per tab, the
+# closing-soon view included), the Ficha Técnica (record read and resolved on
+# every rerun against DetailService's LRU) and
+# the audit (audit_frame once per file, audit_status per rerun).
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from categorization import categorize_series, get_category  # noqa: E402
+from detail_service import DetailService, resolve_detail  # noqa: E402
+from processing import (TenderDataset, audit_frame, audit_source, audit_status,  # noqa: E402
+                        clean_money_series, clean_money_string, derive_frame, estimate_monto,
+                        estimate_monto_series, mark_view, raw_frame, scan_records, title_text)
+from synth_tenders import Pool, write_dataset  # noqa: E402
+from tender_store import TenderStore  # noqa: E402
+
+SIZES = [1000, 10000, 100000]
+PAGE_SIZE = 100  # app.PAGE_SIZE
+FORMAT = 1       # bumped when the result layout changes
+
+# ==========================================
+# ⏱️ MEASUREMENT
+# ==========================================
+def measure(func, repeat, memory):
+    # (run times in seconds, peak traced MB or None). With repeat > 1 a first,
+    # untimed run warms the caches the app keeps between reruns.
+    times = []
+    if repeat > 1:
+        func()
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return times, peak
+
+def rss_mb():
+    # Peak resident set of the whole run so far (Linux/macOS)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+def git_info():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "HEAD") or None,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+# ==========================================
+# 📋 CASES
+# ==========================================
+def cases(n, path, folder, eager_max):
+    # Yields (name, func) for one file. Setup runs between yields, untimed;
+    # later cases reuse the dataset/store the earlier ones built.
+    yield "load_data.lazy", lambda: TenderDataset(path, lazy=True)
+    if n <= eager_max:
+        yield "load_data.eager", lambda: TenderDataset(path)
+
+    ds = TenderDataset(path, lazy=True)
+    rows, _ = scan_records(path)
+    raw = raw_frame(rows)
+    yield "derive_frame", lambda: derive_frame(raw)
+
+    names = title_text(raw["Nombre"])
+    name_list = names.tolist()
+    yield "get_category.loop", lambda: [get_category(x) for x in name_list]
+    yield "get_category.series", lambda: categorize_series(names)
+
+    presupuesto, tipo = raw["Presupuesto"], raw["TipoLicitacion"]
+    pres_list, tipo_list = presupuesto.tolist(), tipo.tolist()
+    yield "clean_money_string.loop", lambda: [clean_money_string(x) for x in pres_list]
+    yield "clean_money_string.series", lambda: clean_money_series(presupuesto)
+    yield "estimate_monto.loop", lambda: [estimate_monto(x) for x in tipo_list]
+    yield "estimate_monto.series", lambda: estimate_monto_series(tipo)
+
+    df = ds.df
+    codes = df["Codigo"].dropna()
+    history = set(codes.sample(frac=0.5, random_state=1))
+    saved = set(codes.sample(frac=0.01, random_state=2))
+    hidden = set(codes.sample(frac=0.01, random_state=3))
+    page = df.head(PAGE_SIZE)
+    yield "prepare_view.page", lambda: mark_view(page, history, saved)
+    yield "prepare_view.frame", lambda: mark_view(df, history, saved)
+
+    # The Obras tab reads its own file; the same rows stand in for it here
+    store = TenderStore(os.path.join(folder, "bench.db"))
+    def sync():
+        store.sync("main", df)
+        store.sync("obras", df)
+    sync()  # the tab cases need it even when this one is skipped (--only)
+    yield "tenders.sync", sync
+
+    opts = store.filter_options("main")
+    hi = opts["max_date"] or datetime.now().date()
+    month = (hi - timedelta(days=30), hi)
+    cats, orgs = opts["categorias"][:2], opts["organismos"][:3]
+
+    def tab(datasets, **filters):
+        def run():
+            store.filter_options(datasets if isinstance(datasets, str) else datasets[0])
+            rows, _ = store.query(datasets, hidden=hidden, limit=PAGE_SIZE, **filters)
+            return mark_view(rows, history, saved)
+        return run
+    yield "tab.main.default", tab("main", date_range=(opts["min_date"], hi))
+    yield "tab.main.filtered", tab("main", date_range=month, categorias=cats, organismos=orgs)
+    yield "tab.obras", tab("obras", organismos=orgs)
+    yield "tab.saved", tab(("main", "obras"), codes=saved)
+    # Closing within a week, soonest first, plus the expired count beside it
+    soon = tab(("main", "obras"), date_range=(hi - timedelta(days=7), hi), order="cierre")
+    yield "tab.soon", lambda: (soon(), store.query(("main", "obras"), hidden=hidden, limit=0,
+                                                   date_range=(opts["min_date"], hi - timedelta(days=8))))
+    total = store.query("main", hidden=hidden, limit=1)[1]
+    yield "tab.main.last_page", lambda: store.query("main", hidden=hidden, limit=PAGE_SIZE,
+                                                    offset=max(0, total - PAGE_SIZE))
+
+    code = codes.iloc[len(codes) // 2]
+    yield "detail.uncached", lambda: resolve_detail(ds.full_map[code])
+    details = DetailService([ds])
+    yield "detail.cached", lambda: details.get(code)
+
+    source = audit_source(rows)
+    yield "audit.frame", lambda: audit_frame(audit_source(rows), df)
+    base = audit_frame(source, df)
+    yield "audit.status", lambda: audit_status(base, hidden, month, cats, orgs)
+
+def run_size(n, args, pool, results):
+    folder = tempfile.mkdtemp(prefix=f"bench_{n}_")
+    try:
+        path = os.path.join(folder, "tenders.json")
+        start = time.perf_counter()
+        size = write_dataset(path, n, args.seed, pool)
+        info = {"file_mb": round(size / 1e6, 1), "generate_s": round(time.perf_counter() - start, 2)}
+        print(f"\n== {n:,} records ({info['file_mb']} MB, generated in {info['generate_s']} s)")
+        print(f"{'case':<28} {'median':>10} {'min':>10} {'peak MB':>9}")
+        for name, func in cases(n, path, folder, args.eager_max):
+            if args.only and not any(name.startswith(p) for p in args.only):
+                continue
+            times, peak = measure(func, args.repeat, not args.no_memory)
+            results.append({"case": name, "n": n, "median_s": statistics.median(times), "min_s": min(times),
+                            "runs": times, "peak_mb": None if peak is None else round(peak, 2)})
+            peak_txt = "-" if peak is None else f"{peak:9.1f}"
+            print(f"{name:<28} {statistics.median(times) * 1000:8.1f}ms {min(times) * 1000:8.1f}ms {peak_txt:>9}")
+        info["rss_mb"] = rss_mb()
+        return info
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+# ==========================================
+# 📊 COMPARISON
+# ==========================================
+def compare(old, new, threshold, min_delta):
+    # Prints new/old per (case, n); returns the regressions (slower by more
+    # than threshold and by more than min_delta seconds)
+    before = {(r["case"], r["n"]): r for r in old["results"]}
+    regressions = []
+    print(f"\n{'case':<28} {'n':>9} {'old':>10} {'new':>10} {'ratio':>7}")
+    for r in new["results"]:
+        o = before.get((r["case"], r["n"]))
+        if not o:
+            continue
+        ratio = r["median_s"] / o["median_s"] if o["median_s"] else float("inf")
+        slower = ratio > 1 + threshold and r["median_s"] - o["median_s"] > min_delta
+        mem = ""
+        if o.get("peak_mb") and r.get("peak_mb"):
+            mem = f"  mem x{r['peak_mb'] / o['peak_mb']:.2f}"
+        print(f"{r['case']:<28} {r['n']:>9,} {o['median_s'] * 1000:8.1f}ms {r['median_s'] * 1000:8.1f}ms "
+              f"{ratio:6.2f}x{mem}{'  <-- REGRESSION' if slower else ''}")
+        if slower:
+            regressions.append((r["case"], r["n"], ratio))
+    print(f"\n{len(regressions)} regression(s) over {threshold:.0%} "
+          f"({(old['meta'].get('commit') or '?')[:10]} -> {(new['meta'].get('commit') or '?')[:10]})")
+    return regressions
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        out = json.load(f)
+    if out.get("format") != FORMAT:
+        raise SystemExit(f"{path}: formato de resultados {out.get('format')} != {FORMAT}")
+    return out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas críticas de la app (sin Streamlit)")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="tamaños separados por coma (p.ej. 1000,1000000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--eager-max", type=int, default=100000, help="tamaño máximo para la carga con json.load")
+    parser.add_argument("--only", nargs="*", help="solo los casos con estos prefijos (p.ej. tab. audit.)")
+    parser.add_argument("--no-memory", action="store_true", help="sin la pasada con tracemalloc")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", help="resultados anteriores contra los que comparar")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="compara dos resultados guardados, sin ejecutar")
+    parser.add_argument("--threshold", type=float, default=0.25, help="empeoramiento relativo tolerado")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="diferencia mínima en segundos para contar")
+    args = parser.parse_args(argv)
+
+    if args.diff:
+        return 1 if compare(load(args.diff[0]), load(args.diff[1]), args.threshold, args.min_delta) else 0
+
+    meta = dict(git_info(), date=datetime.now().isoformat(timespec="seconds"),
+                python=platform.python_version(), pandas=pd.__version__, numpy=np.__version__,
+                platform=platform.platform(), cpus=os.cpu_count(), repeat=args.repeat, seed=args.seed)
+    results, sizes = [], {}
+    pool = Pool()
+    for n in (int(x) for x in args.sizes.split(",") if x.strip()):
+        sizes[str(n)] = run_size(n, args, pool, results)
+
+    out = {"format": FORMAT, "meta": meta, "sizes": sizes, "results": results}
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+    print(f"\nresultados -> {args.out}")
+    if args.compare:
+        return 1 if compare(load(args.compare), out, args.threshold, args.min_delta) else 0
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
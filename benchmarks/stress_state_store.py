@@ -0,0 +1,95 @@
+# Multi-threaded stress run for StateStore: concurrent writers and readers on one
+# database file, then checks that no write was lost.
+#
+#   python benchmarks/stress_state_store.py [threads] [ops_per_thread] [--write-behind]
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from state_store import StateStore, WriteBehindStore  # noqa: E402
+
+def writer(store, tid, ops, expected, errors):
+    rnd = random.Random(tid)
+    try:
+        for i in range(ops):
+            code = f"T{tid}-{rnd.randrange(ops // 4 or 1)}"
+            kind = rnd.choice(["save", "unsave", "hide", "seen"])
+            if kind == "seen":
+                batch = [f"T{tid}-seen-{i}-{k}" for k in range(5)]
+                store.mark_seen(batch)
+                expected["history"].update(batch)
+                continue
+            if kind == "hide":
+                store.hide(code)
+            else:
+                store.toggle_save(code, kind == "save")
+            expected["last"][code] = kind
+            # Read-your-writes: the writer's own change must be visible right away
+            hidden, saved, _ = store.lists()
+            if (code in saved) != (kind == "save") or (kind != "unsave" and (code in hidden) != (kind == "hide")):
+                expected["ryw_misses"] += 1
+    except Exception as e:  # noqa: BLE001 - reported below
+        errors.append(repr(e))
+
+def reader(store, stop, errors, reads):
+    try:
+        while not stop.is_set():
+            store.lists()
+            reads[0] += 1
+    except Exception as e:  # noqa: BLE001
+        errors.append(repr(e))
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n_threads = int(args[0]) if args else 10
+    ops = int(args[1]) if len(args) > 1 else 400
+    path = os.path.join(tempfile.mkdtemp(), "stress_state.db")
+    store = StateStore(path)
+    if "--write-behind" in sys.argv:
+        store = WriteBehindStore(store, interval=0.05)
+
+    expected = [{"history": set(), "last": {}, "ryw_misses": 0} for _ in range(n_threads)]
+    errors, reads, stop = [], [0], threading.Event()
+    writers = [threading.Thread(target=writer, args=(store, t, ops, expected[t], errors)) for t in range(n_threads)]
+    readers = [threading.Thread(target=reader, args=(store, stop, errors, reads)) for _ in range(4)]
+
+    start = time.perf_counter()
+    for t in readers + writers: t.start()
+    for t in writers: t.join()
+    stop.set()
+    for t in readers: t.join()
+    if isinstance(store, WriteBehindStore):
+        store.flush()
+        store = store.store
+    elapsed = time.perf_counter() - start
+
+    hidden, saved, history = store.lists()
+    conn = sqlite3.connect(path)
+    db = {t: {r[0] for r in conn.execute(f"SELECT code FROM {t}")} for t in ("hidden", "saved", "history")}
+
+    lost = 0
+    for exp in expected:
+        lost += len(exp["history"] - history)
+        for code, kind in exp["last"].items():
+            want_saved, want_hidden = kind == "save", kind == "hide"
+            if kind == "unsave":
+                want_hidden = code in db["hidden"]  # unsave leaves hidden untouched
+            lost += (code in saved) != want_saved or (code in hidden) != want_hidden
+    stale = (hidden, saved, history) != (db["hidden"], db["saved"], db["history"])
+    ryw = sum(exp["ryw_misses"] for exp in expected)
+
+    print(f"threads={n_threads} ops/thread={ops} time={elapsed:.2f}s "
+          f"writes/s={n_threads * ops / elapsed:,.0f} reads={reads[0]}")
+    print(f"errors={len(errors)} lost_updates={lost} stale_cache={stale} read_your_writes_misses={ryw}")
+    for e in errors[:5]: print("  ", e)
+    sys.exit(1 if errors or lost or stale or ryw else 0)
+
+if __name__ == "__main__":
+    main()
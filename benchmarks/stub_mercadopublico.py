@@ -0,0 +1,124 @@
+# Local stand-in for the MercadoPúblico licitaciones API, for exercising
+# ingestion.py without a ticket: listing (?estado= / ?fecha=) and detail
+# (?codigo=) with configurable latency, injected 429/500/"peticiones
+# simultáneas" failures and HTTP/1.1 keep-alive.
+#
+#   python benchmarks/stub_mercadopublico.py [n_tenders] [port]
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_FILE = os.path.join(ROOT, "OBRAS_CIVILES_DATA.json")
+
+# Fields the real API does not return (added by the enrichment steps)
+NOT_IN_API = ["URL_Publica", "URL_Documentos_Portal", "CategoriasIDIEM", "Match_Category",
+              "Match_Keyword", "ExtendedMetadata"]
+
+def make_tenders(n, seed=0):
+    # n API-shaped detail records built from the shipped file, unique codes
+    with open(TEMPLATE_FILE, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    rng = random.Random(seed)
+    tenders = {}
+    for i in range(n):
+        rec = {k: v for k, v in base[i % len(base)].items() if k not in NOT_IN_API}
+        rec["CodigoExterno"] = f"{1000 + i}-{rng.randint(1, 99)}-LE26"
+        rec["Nombre"] = f"{rec.get('Nombre', '')} {i}"
+        tenders[rec["CodigoExterno"]] = rec
+    return tenders
+
+class StubAPI:
+    def __init__(self, tenders, latency=0.05, fail_rate=0.0, port=0):
+        self.tenders = tenders
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.hits = {"listing": 0, "detail": 0, "failed": 0}
+        self.connections = set()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/servicios/v1/publico/licitaciones.json"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def set_state(self, code, estado, fecha_cierre=None):
+        rec = self.tenders[code]
+        rec["CodigoEstado"] = estado
+        if fecha_cierre:
+            rec.setdefault("Fechas", {})["FechaCierre"] = fecha_cierre
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, headers=()):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with api._lock:
+                    api.connections.add(self.client_address)
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                time.sleep(api.latency)
+                if not query.get("ticket"):
+                    return self._send(400, {"Codigo": 203, "Mensaje": "Ticket no válido."})
+
+                if "codigo" in query:
+                    roll = random.random()
+                    if roll < api.fail_rate:
+                        with api._lock: api.hits["failed"] += 1
+                        kind = random.choice(["429", "500", "10500"])
+                        if kind == "429":
+                            return self._send(429, {"Mensaje": "Too Many Requests"}, [("Retry-After", "0.05")])
+                        if kind == "500":
+                            return self._send(500, {"Mensaje": "Error"})
+                        return self._send(200, {"Codigo": 10500, "Mensaje": "Lo sentimos. Hemos detectado que existen peticiones simultáneas."})
+                    with api._lock: api.hits["detail"] += 1
+                    rec = api.tenders.get(query["codigo"])
+                    return self._send(200, {"Cantidad": int(rec is not None), "Listado": [rec] if rec else []})
+
+                with api._lock: api.hits["listing"] += 1
+                listado = [{
+                    "CodigoExterno": r["CodigoExterno"], "Nombre": r.get("Nombre"),
+                    "CodigoEstado": r.get("CodigoEstado"),
+                    "FechaCierre": (r.get("Fechas") or {}).get("FechaCierre"),
+                } for r in api.tenders.values()]
+                return self._send(200, {"Cantidad": len(listado), "Listado": listado})
+
+        return Handler
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    api = StubAPI(make_tenders(n), port=port).start()
+    print(f"{n} licitaciones en {api.url}?ticket=stub  (Ctrl+C para salir)")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Synthetic tenders in the layout of the shipped files, at any scale. Every
+# record is a real record used as a template (same ~70 API fields) with the
+# fields the app reads drawn independently from the real values: Nombre,
+# Comprador, Fechas, Items.Listado, ExtendedMetadata sections, Match_Category,
+# MontoEstimado. A small share of records carries the defects the audit tab
+# looks for (no code, duplicated code, bad or missing dates).
+#
+#   python benchmarks/synth_tenders.py [n_records] [out.json] [seed]
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = ["FINAL_PRODUCTION_DATA.json", "OBRAS_CIVILES_DATA.json", "OBRAS_CIVILES_READY.json"]
+
+# Share of records with each defect
+DEFECTS = {"no_code": 0.001, "duplicate": 0.002, "bad_date": 0.005, "no_cierre": 0.01}
+START = datetime(2024, 1, 1)
+DAYS = 900  # publication dates spread over ~2.5 years
+
+class Pool:
+    # Real values, one list per field, drawn independently of each other
+    def __init__(self, sources=SOURCES):
+        records = []
+        for name in sources:
+            path = os.path.join(ROOT, name)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    records += json.load(f)
+        self.templates = records
+        self.names = [r["Nombre"] for r in records if r.get("Nombre")]
+        self.compradores = [r["Comprador"] for r in records if r.get("Comprador")]
+        self.descripciones = [r["Descripcion"] for r in records if r.get("Descripcion")]
+        self.items = [it for r in records for it in ((r.get("Items") or {}).get("Listado") or [])]
+        self.montos = [r["MontoEstimado"] for r in records if r.get("MontoEstimado")]
+        self.categorias = [r.get("Match_Category") for r in records]
+        self.estados = [r.get("Estado") for r in records]
+        self.section_1 = [s for s in (((r.get("ExtendedMetadata") or {}).get("Section_1_Características"))
+                                      for r in records) if s]
+
+def _criterios(rng):
+    return [{"Ítem": item, "Observaciones": f"Según bases {rng.randint(1, 9)}", "Ponderación": f"{pond}%"}
+            for item, pond in [("Oferta económica", rng.choice([40, 50, 60])), ("Experiencia", 30), ("Plazo", 10)]]
+
+def make_record(i, rng, pool, earlier=None):
+    # earlier: codes already emitted, the source of duplicated codes
+    rec = dict(rng.choice(pool.templates))
+    pub = START + timedelta(days=rng.randrange(DAYS), seconds=rng.randrange(86400))
+    cierre = pub + timedelta(days=rng.randint(5, 60))
+    tipo = rng.choice(["LE", "LP", "LR", "L1"])
+
+    rec["CodigoExterno"] = f"{rng.randint(1000, 5000000)}-{i}-{tipo}{pub.year % 100}"
+    rec["Nombre"] = f"{rng.choice(pool.names)} {rng.randint(1, 999)}"
+    rec["Descripcion"] = rng.choice(pool.descripciones)
+    rec["Comprador"] = rng.choice(pool.compradores)
+    rec["Estado"] = rng.choice(pool.estados)
+    rec["MontoEstimado"] = rng.choice(pool.montos) * rng.uniform(0.5, 2) if rng.random() < 0.5 else None
+    rec["Fechas"] = dict(rec.get("Fechas") or {}, FechaPublicacion=pub.isoformat(timespec="milliseconds"),
+                         FechaCierre=cierre.isoformat(timespec="seconds"))
+    # Mostly one item, a long tail of tenders with many
+    listado = [rng.choice(pool.items) for _ in range(int(min(rng.paretovariate(2.5), 20)))]
+    rec["Items"] = {"Cantidad": len(listado), "Listado": listado}
+
+    section_1 = dict(rng.choice(pool.section_1)) if rng.random() < 0.4 else {}
+    if section_1 and rng.random() < 0.05:
+        section_1["Presupuesto"] = f"$ {rng.randint(10, 5000) * 1000000:,}".replace(",", ".")
+    rec["ExtendedMetadata"] = {
+        "Section_1_Características": section_1,
+        "Section_6_Criterios": _criterios(rng) if section_1 else [],
+        "Section_7_Montos": {"Monto Total Estimado": str(rng.randint(10, 5000) * 1000000)} if section_1 else {},
+        "Section_8_Garantias": [],
+    }
+    # Missing / "Sin Categoría" labels are categorized by the app
+    rec["Match_Category"] = rng.choice(pool.categorias + [None, "Sin Categoría"])
+
+    roll = rng.random()
+    for defect, share in DEFECTS.items():
+        if roll >= share:
+            roll -= share
+            continue
+        if defect == "no_code":
+            rec["CodigoExterno"] = None
+        elif defect == "duplicate" and earlier:
+            rec["CodigoExterno"] = rng.choice(earlier)
+        elif defect == "bad_date":
+            rec["Fechas"]["FechaCierre"] = "2026-02-31T12:00:00"
+        elif defect == "no_cierre":
+            rec["Fechas"]["FechaCierre"] = None
+        break
+    return rec
+
+def iter_records(n, seed=0, pool=None):
+    rng = random.Random(seed)
+    pool = pool or Pool()
+    codes = []
+    for i in range(n):
+        rec = make_record(i, rng, pool, codes)
+        codes.append(rec["CodigoExterno"] or "")
+        yield rec
+
+def write_dataset(path, n, seed=0, pool=None):
+    # Streams n records to path in the layout write_records uses (indent=4), so
+    # 1M records never sit in memory at once. Returns the file size in bytes.
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for i, rec in enumerate(iter_records(n, seed, pool)):
+            f.write(",\n    " if i else "\n    ")
+            f.write(json.dumps(rec, ensure_ascii=False, indent=4).replace("\n", "\n    "))
+        f.write("\n]")
+    return os.path.getsize(path)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    out = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{n}.json"
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    size = write_dataset(out, n, seed)
+    print(f"{n} licitaciones -> {out} ({size / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Rule table: ordered by priority, first matching rule wins
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "category_rules.json")
+
+# Combining accents left by NFKD (literal chars so pyarrow's regex accepts it too)
+_ACCENTS = "[\u0300-\u036f]"
+_ACCENTS_RE = re.compile(_ACCENTS)
+# Separator used when a whole column is scanned as one string
+_SEP = "\x00"
+
+# ==========================================
+# 🔤 TEXT NORMALIZATION
+# ==========================================
+def _fold(text):
+    return _ACCENTS_RE.sub("", unicodedata.normalize("NFKD", text.upper()))
+
+def normalize_text(text):
+    # "Estudio Geotécnico" -> "ESTUDIO GEOTECNICO"
+    return _fold(str(text)).replace(_SEP, "")
+
+def _is_word(ch):
+    return ch.isalnum() or ch == "_"
+
+def _is_boundary(text, i):
+    # Same meaning as regex \b
+    left = i > 0 and _is_word(text[i - 1])
+    right = i < len(text) and _is_word(text[i])
+    return left != right
+
+def _trie_pattern(words):
+    # Keywords sharing a prefix share a branch; optional tails are greedy so the
+    # longest keyword starting at a position is the one returned
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches: return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+# ==========================================
+# 🧠 CATEGORIZATION ENGINE
+# ==========================================
+class CategoryEngine:
+    # All keywords of all rules compiled into one trie-shaped regex. A single scan
+    # finds every keyword occurrence (overlapping ones too, via a lookahead) and
+    # the lowest rule index among them is the category, as in the old if-chain.
+
+    def __init__(self, rules, default="Otras Civiles", empty="General"):
+        self.default = default
+        self.empty = empty
+        self.labels = [rule["category"] for rule in rules] + [default]
+        self.no_match = len(rules)
+
+        # normalized keyword -> [(priority, whole_word)]
+        owners = {}
+        for prio, rule in enumerate(rules):
+            for kw in rule.get("keywords", []):
+                owners.setdefault(normalize_text(kw), []).append((prio, bool(rule.get("whole_word"))))
+        owners.pop("", None)
+
+        # Every keyword that is a prefix of the matched one starts at the same position
+        self.candidates = {
+            kw: sorted((prio, whole, len(k)) for k in owners if kw.startswith(k) for prio, whole in owners[k])
+            for kw in owners
+        }
+        self.pattern = re.compile(f"(?=({_trie_pattern(owners)}))") if owners else None
+
+    @classmethod
+    def from_file(cls, path=RULES_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        return cls(table["rules"], table.get("default", "Otras Civiles"), table.get("empty", "General"))
+
+    def _scan(self, text):
+        # Yields (position, priority) of each keyword hit in normalized text
+        if self.pattern is None: return
+        for m in self.pattern.finditer(text):
+            pos = m.start()
+            for prio, whole, n in self.candidates[m.group(1)]:
+                if whole and not (_is_boundary(text, pos) and _is_boundary(text, pos + n)):
+                    continue
+                yield pos, prio
+                break
+
+    def categorize(self, text):
+        if not text: return self.empty
+        best = min((prio for _, prio in self._scan(normalize_text(text))), default=self.no_match)
+        return self.labels[best]
+
+    def categorize_series(self, s):
+        # The distinct texts are joined into one string that is normalized and
+        # scanned once; hits are mapped back to their text by offset and reduced
+        # with a per-text minimum
+        codes, uniques = pd.factorize(s)
+        texts = [str(u) for u in uniques]
+        joined = _SEP.join(texts)
+        if joined.count(_SEP) != len(texts) - 1:
+            joined = _SEP.join(t.replace(_SEP, "") for t in texts)
+        folded = _fold(joined)
+        best = np.full(len(texts), self.no_match)
+
+        hits = list(self._scan(folded)) if texts else []
+        if hits:
+            # Folding may change lengths ("ß" -> "SS"), so offsets come from the folded text
+            lengths = np.fromiter((len(t) + 1 for t in folded.split(_SEP)), dtype=np.int64, count=len(texts))
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            pos, prio = np.array(hits).T
+            np.minimum.at(best, np.searchsorted(starts, pos, side="right") - 1, prio)
+
+        labels = np.array(self.labels, dtype=object)[best]
+        labels[~pd.Series(uniques, dtype=object).astype(bool).to_numpy()] = self.empty
+        # Missing values (code -1) are falsy -> empty label
+        return pd.Series(np.append(labels, self.empty)[codes], index=s.index)
+
+@lru_cache(maxsize=None)
+def get_engine(path=RULES_FILE):
+    return CategoryEngine.from_file(path)
+
+@lru_cache(maxsize=None)
+def rules_fingerprint(path=RULES_FILE):
+    # Hash of the rule table, read once like get_engine: anything stored with
+    # derived categories (e.g. a frame snapshot) is stale when it changes
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def get_category(text):
+    return get_engine().categorize(text)
+
+def categorize_series(s):
+    return get_engine().categorize_series(s)
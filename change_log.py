@@ -0,0 +1,401 @@
+import argparse
+import json
+import os
+import time
+import zlib
+from collections.abc import Mapping
+from datetime import date, datetime
+from datetime import time as day_time
+from itertools import groupby
+
+from loader import LOG_FILE
+from processing import iter_json_array, write_records
+from state_store import SQLiteDB, _ts
+
+BASE, DELTA = "base", "delta"
+CHECKPOINT_EVERY = 32  # Deltas of one record after which append()/compact() store it whole again
+
+SCHEMA = [
+    # Every version of every record, in append order: the whole record the
+    # first time and every CHECKPOINT_EVERY changes (base), otherwise only what
+    # changed (delta); zlib-compressed JSON
+    '''CREATE TABLE IF NOT EXISTS record_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        dataset TEXT NOT NULL,
+        code TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        body BLOB NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_changes_code ON record_changes (dataset, code, seq)',
+    # Current version of every record (plain JSON, read on every load): pos =
+    # seq it was first seen at (file order), seq/ts = its last change, chain =
+    # deltas since its last base
+    '''CREATE TABLE IF NOT EXISTS record_latest (
+        dataset TEXT NOT NULL,
+        code TEXT NOT NULL,
+        pos INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        ts TEXT NOT NULL,
+        chain INTEGER NOT NULL,
+        body TEXT NOT NULL,
+        PRIMARY KEY (dataset, code)
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_latest_pos ON record_latest (dataset, pos)',
+    # signature(), changed_since() and the records changed after a moment, without reading rows
+    'CREATE INDEX IF NOT EXISTS idx_latest_seq ON record_latest (dataset, seq, ts)',
+]
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def _pack(text):
+    # History is read rarely: level 1 keeps appends cheap and bases ~2.5x smaller
+    return zlib.compress(text.encode("utf-8"), 1)
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+def _until(when):
+    # datetime, date (its whole day) or text -> ts text to compare with
+    if isinstance(when, str):
+        return when
+    if not isinstance(when, datetime):
+        when = datetime.combine(when, day_time.max)
+    return _ts(when)
+
+# ==========================================
+# 🧩 DELTAS
+# ==========================================
+def diff(old, new, path=()):
+    # What turns old into new: ([(path, value)] to set, [path] to drop). Dicts
+    # are walked key by key, anything else (lists too) changes as one value.
+    sets, drops = [], []
+    for key, value in new.items():
+        if key not in old:
+            sets.append((path + (key,), value))
+        elif old[key] != value:
+            if isinstance(value, dict) and isinstance(old[key], dict):
+                s, d = diff(old[key], value, path + (key,))
+                sets += s
+                drops += d
+            else:
+                sets.append((path + (key,), value))
+    drops += [path + (key,) for key in old if key not in new]
+    return sets, drops
+
+def get_path(record, path):
+    for key in path:
+        if not isinstance(record, dict) or key not in record:
+            return None
+        record = record[key]
+    return record
+
+def apply_delta(record, delta):
+    # In place; delta as stored: {"set": [[path, value]], "drop": [path]}
+    for path, value in delta["set"]:
+        node = record
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    for path in delta["drop"]:
+        node = get_path(record, path[:-1])
+        if isinstance(node, dict):
+            node.pop(path[-1], None)
+    return record
+
+def replay(entries):
+    # (kind, stored body) of one record from a base on -> the record
+    record = None
+    for kind, body in entries:
+        record = _unpack(body) if kind == BASE else apply_delta(record, _unpack(body))
+    return record
+
+# ==========================================
+# 📜 CHANGE LOG
+# ==========================================
+class ChangeLog(SQLiteDB):
+    # Append-only history of the records of each dataset (the name of the JSON
+    # file they used to be written to). Appending stores only the records that
+    # changed, and of those only the changed fields; record_latest holds the
+    # current version of each record, so the latest state is read without
+    # replaying anything. The state at any earlier moment is the record's last
+    # base up to then plus its deltas; append() stores a record whole again
+    # every CHECKPOINT_EVERY changes to keep those chains short, and compact()
+    # can fold the history older than a date.
+
+    def __init__(self, path, timeout=30.0):
+        super().__init__(path, timeout)
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            for stmt in SCHEMA:
+                conn.execute(stmt)
+
+    # --- Writes ---
+    def append(self, dataset, records, when=None, every=CHECKPOINT_EVERY):
+        # New codes are stored whole, known ones as a delta when anything changed,
+        # or whole again once they already have `every` deltas since their last
+        # base (what compact() would do, without a later pass). Returns
+        # {"added", "changed", "unchanged"}
+        ts = _ts(when)
+        items = {}
+        for item in records:
+            if item.get("CodigoExterno"):
+                items[item["CodigoExterno"]] = item
+        counts = {"added": 0, "changed": 0, "unchanged": 0}
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            latest = {code: (body, chain) for code, body, chain in conn.execute(
+                'SELECT code, body, chain FROM record_latest WHERE dataset = ? AND code IN (SELECT value FROM json_each(?))',
+                (dataset, json.dumps(list(items))))}
+            for code, item in items.items():
+                body = _dumps(item)
+                old, chain = latest.get(code, (None, 0))
+                if old == body:
+                    counts["unchanged"] += 1
+                    continue
+                if old is None:
+                    kind, data = BASE, body
+                else:
+                    sets, drops = diff(json.loads(old), item)
+                    if not sets and not drops:
+                        counts["unchanged"] += 1
+                        continue
+                    if chain >= every:
+                        kind, data = BASE, body
+                    else:
+                        kind, data = DELTA, _dumps({"set": [[list(p), v] for p, v in sets], "drop": [list(p) for p in drops]})
+                seq = conn.execute('INSERT INTO record_changes (dataset, code, ts, kind, body) VALUES (?, ?, ?, ?, ?)',
+                                   (dataset, code, ts, kind, _pack(data))).lastrowid
+                if old is None:
+                    conn.execute('INSERT INTO record_latest (dataset, code, pos, seq, ts, chain, body) VALUES (?, ?, ?, ?, ?, 0, ?)',
+                                 (dataset, code, seq, seq, ts, body))
+                    counts["added"] += 1
+                else:
+                    conn.execute('UPDATE record_latest SET seq = ?, ts = ?, chain = ?, body = ? WHERE dataset = ? AND code = ?',
+                                 (seq, ts, 0 if kind == BASE else chain + 1, body, dataset, code))
+                    counts["changed"] += 1
+        return counts
+
+    def compact(self, dataset, every=CHECKPOINT_EVERY, before=None):
+        # - before (datetime or ts text): each record's history older than that
+        #   is folded into one base, its state at the time (the entries it
+        #   replaces are deleted, their pages reused by later appends); as of
+        #   an earlier moment a folded record shows that state
+        # - append() already stores a record whole once its chain reaches
+        #   CHECKPOINT_EVERY; this catches up chains after a lower `every`
+        # - records with more than `every` deltas since their last base are
+        #   stored whole again, which bounds what as_of() replays
+        # Returns {"folded", "deleted", "checkpoints"}
+        out = {"folded": 0, "deleted": 0, "checkpoints": 0}
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            if before is not None:
+                until = _until(before)
+                rows = conn.execute(
+                    'SELECT code, seq, ts, kind, body FROM record_changes WHERE dataset = ? AND ts < ? AND code IN ('
+                    'SELECT code FROM record_changes WHERE dataset = ? AND ts < ? GROUP BY code HAVING COUNT(*) > 1) '
+                    'ORDER BY code, seq', (dataset, until, dataset, until)).fetchall()
+                for code, entries in groupby(rows, key=lambda r: r[0]):
+                    entries = list(entries)
+                    first, last = entries[0], entries[-1]
+                    start = max(i for i, e in enumerate(entries) if e[3] == BASE)
+                    body = _dumps(replay((e[3], e[4]) for e in entries[start:]))
+                    conn.execute('DELETE FROM record_changes WHERE dataset = ? AND code = ? AND seq <= ?',
+                                 (dataset, code, last[1]))
+                    # Same seq as the last entry it replaces, so later deltas still
+                    # follow it, but the ts of the first one: the record still
+                    # exists as of any moment since it was first seen
+                    conn.execute('INSERT INTO record_changes (seq, dataset, code, ts, kind, body) VALUES (?, ?, ?, ?, ?, ?)',
+                                 (last[1], dataset, code, first[2], BASE, _pack(body)))
+                    out["folded"] += 1
+                    out["deleted"] += len(entries) - 1
+                if out["folded"]:
+                    conn.execute('''UPDATE record_latest SET chain = (
+                        SELECT COUNT(*) FROM record_changes c WHERE c.dataset = record_latest.dataset
+                        AND c.code = record_latest.code AND c.kind = 'delta' AND c.seq > (
+                            SELECT MAX(b.seq) FROM record_changes b WHERE b.dataset = record_latest.dataset
+                            AND b.code = record_latest.code AND b.kind = 'base'))
+                        WHERE dataset = ?''', (dataset,))
+
+            # The latest body at the time of its last change: same state, nothing to show in a timeline
+            rows = conn.execute('SELECT code, ts, body FROM record_latest WHERE dataset = ? AND chain > ?',
+                                (dataset, every)).fetchall()
+            conn.executemany('INSERT INTO record_changes (dataset, code, ts, kind, body) VALUES (?, ?, ?, ?, ?)',
+                             [(dataset, code, ts, BASE, _pack(body)) for code, ts, body in rows])
+            conn.executemany('UPDATE record_latest SET chain = 0 WHERE dataset = ? AND code = ?',
+                             [(dataset, code) for code, _, _ in rows])
+            out["checkpoints"] = len(rows)
+        return out
+
+    # --- Latest state ---
+    def datasets(self):
+        return [row[0] for row in self._conn().execute('SELECT DISTINCT dataset FROM record_latest')]
+
+    def signature(self, dataset):
+        # (seq, ts) of the dataset's last change, None when it has no records.
+        # The ts tells a recreated log apart from the one a snapshot was taken of
+        row = self._conn().execute(
+            'SELECT seq, ts FROM record_latest WHERE dataset = ? ORDER BY seq DESC LIMIT 1', (dataset,)).fetchone()
+        return tuple(row) if row else None
+
+    def changed_since(self, dataset, seq):
+        return [row[0] for row in self._conn().execute(
+            'SELECT code FROM record_latest WHERE dataset = ? AND seq > ?', (dataset, seq))]
+
+    def latest(self, dataset, codes=None):
+        # Current records in first-seen order (only the given codes, if any)
+        if codes is None:
+            cur = self._conn().execute('SELECT body FROM record_latest WHERE dataset = ? ORDER BY pos', (dataset,))
+            for (body,) in cur:
+                yield json.loads(body)
+            return
+        # By primary key and sorted here: ORDER BY pos would walk the whole dataset
+        rows = self._conn().execute(
+            'SELECT pos, body FROM record_latest WHERE dataset = ? AND code IN (SELECT value FROM json_each(?))',
+            (dataset, json.dumps(list(codes)))).fetchall()
+        for _, body in sorted(rows, key=lambda r: r[0]):
+            yield json.loads(body)
+
+    def has(self, dataset, code):
+        return self._conn().execute('SELECT 1 FROM record_latest WHERE dataset = ? AND code = ?', (dataset, code)).fetchone() is not None
+
+    def get(self, dataset, code):
+        row = self._conn().execute('SELECT body FROM record_latest WHERE dataset = ? AND code = ?', (dataset, code)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, dataset):
+        return self._conn().execute('SELECT COUNT(*) FROM record_latest WHERE dataset = ?', (dataset,)).fetchone()[0]
+
+    def codes(self, dataset):
+        return [row[0] for row in self._conn().execute(
+            'SELECT code FROM record_latest WHERE dataset = ? ORDER BY pos', (dataset,))]
+
+    # --- History ---
+    def as_of(self, dataset, when, codes=None):
+        # Records as they were at `when` (datetime, date = end of that day, or
+        # ts text), in first-seen order; codes first seen later are left out.
+        until = _until(when)
+        only = ' AND code IN (SELECT value FROM json_each(?))' if codes is not None else ''
+        picked = [json.dumps(list(codes))] if codes is not None else []
+        conn = self._conn()
+        # Not changed since: the current version as is
+        found = {code: json.loads(body) for code, body in conn.execute(
+            f'SELECT code, body FROM record_latest WHERE dataset = ? AND ts <= ?{only}', [dataset, until] + picked)}
+        # Changed since: the last base up to then plus its deltas, walking
+        # idx_changes_code in (code, seq) order (no sort over the bodies)
+        rows = conn.execute(f'''
+            SELECT c.code, c.kind, c.body FROM record_changes c
+            WHERE c.dataset = ? AND c.code IN (SELECT code FROM record_latest WHERE dataset = ? AND ts > ?{only})
+            AND c.ts <= ? AND c.seq >= (
+                SELECT MAX(b.seq) FROM record_changes b
+                WHERE b.dataset = c.dataset AND b.code = c.code AND b.kind = 'base' AND b.ts <= ?)
+            ORDER BY c.code, c.seq''', [dataset, dataset, until] + picked + [until, until])
+        for code, entries in groupby(rows, key=lambda r: r[0]):
+            found[code] = replay((kind, body) for _, kind, body in entries)
+        order = self.codes(dataset) if codes is None else [code for code, _ in sorted(conn.execute(
+            'SELECT code, pos FROM record_latest WHERE dataset = ? AND code IN (SELECT value FROM json_each(?))',
+            (dataset, json.dumps(list(found)))), key=lambda r: r[1])]
+        return [found[code] for code in order if code in found]
+
+    def timeline(self, dataset, code):
+        # [(ts, field, before, after)] oldest first. The first version is one
+        # row with field None; nested fields are "Fechas.FechaCierre"
+        rows = self._conn().execute(
+            'SELECT ts, kind, body FROM record_changes WHERE dataset = ? AND code = ? ORDER BY seq', (dataset, code))
+        out, record = [], None
+        for ts, kind, body in rows:
+            if record is None:
+                record = replay([(kind, body)])
+                out.append((ts, None, None, None))
+                continue
+            # A later base (checkpoint or compaction) shows whatever differs from the replayed state
+            if kind == BASE:
+                new = _unpack(body)
+                sets, drops = diff(record, new)
+            else:
+                delta = _unpack(body)
+                sets, drops = delta["set"], delta["drop"]
+            changes = [(path, value) for path, value in sets] + [(path, None) for path in drops]
+            out += [(ts, ".".join(map(str, path)), get_path(record, path), value) for path, value in changes]
+            record = new if kind == BASE else apply_delta(record, delta)
+        return out
+
+class LogRecords(Mapping):
+    # code -> latest record of one dataset of the log, read when asked for:
+    # the full_map of a TenderDataset loaded from the log (processing.py)
+
+    def __init__(self, log, dataset):
+        self.log = log
+        self.dataset = dataset
+
+    def __getitem__(self, code):
+        item = self.log.get(self.dataset, code)
+        if item is None:
+            raise KeyError(code)
+        return item
+
+    def __contains__(self, code):
+        return self.log.has(self.dataset, code)
+
+    def __iter__(self):
+        return iter(self.log.codes(self.dataset))
+
+    def __len__(self):
+        return self.log.count(self.dataset)
+
+    def signature(self):
+        return self.log.signature(self.dataset)
+
+    def changed_since(self, seq):
+        return self.log.changed_since(self.dataset, seq)
+
+    def records(self, codes=None):
+        return self.log.latest(self.dataset, codes)
+
+    def timeline(self, code):
+        return self.log.timeline(self.dataset, code)
+
+# ==========================================
+# 🖥️ CLI
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Historial de versiones de las licitaciones (registro de cambios)")
+    parser.add_argument("--log", default=LOG_FILE, help="base SQLite del registro de cambios")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="agrega al registro los cambios de un JSON (la primera vez, todo)")
+    p.add_argument("json", help="archivo JSON (su nombre es el del dataset)")
+    p = sub.add_parser("export", help="escribe un JSON con el estado actual o el de una fecha")
+    p.add_argument("dataset", help="nombre del JSON de origen (p.ej. FINAL_PRODUCTION_DATA.json)")
+    p.add_argument("output")
+    p.add_argument("--fecha", type=date.fromisoformat, help="estado al final de ese día (AAAA-MM-DD)")
+    p = sub.add_parser("timeline", help="cambios de una licitación")
+    p.add_argument("dataset")
+    p.add_argument("code")
+    p = sub.add_parser("compact", help="guarda completas las cadenas largas y, con --antes, funde el historial anterior")
+    p.add_argument("dataset")
+    p.add_argument("--cada", type=int, default=CHECKPOINT_EVERY, help="deltas por registro antes de guardarlo completo")
+    p.add_argument("--antes", type=date.fromisoformat, help="fundir las versiones anteriores a este día (AAAA-MM-DD)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    log = ChangeLog(args.log)
+    if args.command == "import":
+        result = log.append(os.path.basename(args.json), (item for _, _, item in iter_json_array(args.json)))
+    elif args.command == "export":
+        records = log.as_of(args.dataset, args.fecha) if args.fecha else list(log.latest(args.dataset))
+        write_records(args.output, records)
+        result = {"records": len(records)}
+    elif args.command == "timeline":
+        result = [{"ts": ts, "campo": field, "antes": before, "despues": after}
+                  for ts, field, before, after in log.timeline(args.dataset, args.code)]
+    else:
+        before = datetime.combine(args.antes, day_time.min) if args.antes else None
+        result = log.compact(args.dataset, every=args.cada, before=before)
+    if isinstance(result, dict):
+        result["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from instrumentation import recorder
+from processing import clean_money_string, estimate_monto, format_clp
+
+log = logging.getLogger(__name__)
+
+DETAIL_CACHE = 256  # Resolved details kept (LRU), across sessions
+
+# ==========================================
+# 📄 FICHA TÉCNICA (one record at a time)
+# ==========================================
+def detail_monto(item, sec1):
+    # (label, color, text) of the detail amount, None when there is none:
+    # MontoEstimado -> Presupuesto (Section_1) -> UTM estimate from "Tipo de Licitación"
+    try:
+        api = float(item.get("MontoEstimado") or 0)
+    except (TypeError, ValueError):
+        api = 0
+    if api > 0:
+        return "Monto (API)", "gray", format_clp(api)
+    presupuesto = clean_money_string(sec1.get("Presupuesto"))
+    if presupuesto > 0:
+        return "Presupuesto (Base)", "gray", format_clp(presupuesto)
+    estimado = estimate_monto(sec1.get("Tipo de Licitación", ""))
+    if estimado > 0:
+        return "Monto (Estimado)", "orange", format_clp(estimado)
+    return None
+
+def resolve_detail(item):
+    # Everything the detail tab shows, from the raw record
+    sec1 = (item.get("ExtendedMetadata") or {}).get("Section_1_Características") or {}
+    items = (item.get("Items") or {}).get("Listado") or item.get("DetalleArticulos") or []
+    return {
+        "nombre": item.get("Nombre"),
+        "estado": item.get("Estado"),
+        "organismo": str((item.get("Comprador") or {}).get("NombreOrganismo", "-")).title(),
+        "tipo": sec1.get("Tipo de Licitación", "-"),
+        "cierre": (item.get("Fechas") or {}).get("FechaCierre", "No informado"),
+        "url": item.get("URL_Documentos_Portal"),
+        "monto": detail_monto(item, sec1),
+        "descripcion": item.get("Descripcion", "Sin descripción"),
+        "items": pd.json_normalize(items) if items else None,
+    }
+
+class DetailService:
+    # Detail of one code at a time, for the Ficha Técnica tab. The raw record is
+    # decoded from its dataset only when asked for (a byte span with lazy
+    # datasets) and the resolved fields + items table are kept in a bounded LRU
+    # keyed by (file, file version, code): a reload never serves a stale entry,
+    # older versions just age out. prefetch() warms it from a background thread.
+
+    def __init__(self, datasets, size=DETAIL_CACHE):
+        self.datasets = datasets  # By preference: the first one holding a code wins
+        self.size = size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # Codes waiting for the prefetch thread
+        self._thread = None
+
+    def get(self, code):
+        detail, hit = self._fetch(code)
+        recorder.cache("detail", hit)
+        return detail
+
+    def _fetch(self, code):
+        # (detail or None, served from the cache)
+        for ds in self.datasets:
+            if code not in ds.full_map:
+                continue
+            # Version first: refresh() moves the spans before the signature
+            key = (ds.filepath, ds.file_sig, code)
+            with self._lock:
+                detail = self._cache.get(key)
+                if detail is not None:
+                    self._cache.move_to_end(key)
+                    return detail, True
+            try:
+                item = ds.full_map[code]
+            except KeyError:
+                continue
+            detail = resolve_detail(item)
+            with self._lock:
+                self._cache[key] = detail
+                while len(self._cache) > self.size:
+                    self._cache.popitem(last=False)
+            return detail, False
+        return None, False
+
+    # --- Prefetch thread ---
+    def prefetch(self, codes):
+        # Queue codes to resolve ahead: the latest call goes first, its codes in
+        # the given order, and the queue never holds more than the cache keeps
+        with self._cond:
+            for code in reversed(list(codes)):
+                self._pending.pop(code, None)
+                self._pending[code] = None
+            while len(self._pending) > self.size:
+                self._pending.popitem(last=False)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="detail-prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                code, _ = self._pending.popitem()
+            try:
+                recorder.cache("detail_prefetch", self._fetch(code)[1])
+            except Exception:
+                log.exception("Prefetch of %s failed", code)
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from loader import DATASETS, DB_FILE, FRAME_DIR, LOG_FILE
+
+# Tab -> (datasets by preference, sort order); same queries as the app's grids
+TABS = {
+    "disponibles": ("main", "pub"),
+    "por-cerrar": (("main", "obras"), "cierre"),
+    "obras": ("obras", "pub"),
+    "guardadas": (("main", "obras"), "pub"),
+}
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".json": "json"}
+
+def _day(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida (AAAA-MM-DD): {text}")
+
+# ==========================================
+# 📤 EXPORT
+# ==========================================
+def _load(args, names, scratch):
+    # TenderStore with the datasets of names synced from args.files. The app's
+    # own files go through its tenders table (syncing an unchanged file is
+    # skipped). Any other file goes to a table in scratch, without snapshot or
+    # change log: synced as "main"/"obras" into the app's table it would replace
+    # what the running app serves, and the app would never notice (its file
+    # didn't change)
+    from loader import open_dataset
+    from tender_store import TenderStore
+
+    if all(os.path.abspath(args.files[name]) == os.path.abspath(DATASETS[name]) for name in names):
+        tenders, frame_dir, log_file = TenderStore(args.db), args.frames, LOG_FILE
+    else:
+        tenders, frame_dir, log_file = TenderStore(os.path.join(scratch, "tenders.db")), None, None
+    for name in names:
+        open_dataset(name, args.files[name], tenders=tenders, frame_dir=frame_dir, log_file=log_file)
+    return tenders
+
+def export(args):
+    # Heavy imports only once the arguments are valid
+    from processing import FIELD_COLS
+    from state_store import StateStore
+
+    start = time.perf_counter()
+    hidden, saved, history = StateStore(args.db).lists()
+    datasets, order = TABS[args.tab]
+    names = (datasets,) if isinstance(datasets, str) else datasets
+    with tempfile.TemporaryDirectory(prefix="export-", ignore_cleanup_errors=True) as scratch:
+        tenders = _load(args, names, scratch)
+        loaded = time.perf_counter()
+
+        # Same defaults as the tabs: Disponibles spans every closing date, Por Cerrar the next days
+        date_range = None
+        if args.tab == "por-cerrar":
+            today = date.today()
+            date_range = (args.desde or today, args.hasta or today + timedelta(days=args.dias))
+        elif args.tab == "disponibles" or args.desde or args.hasta:
+            opts = tenders.filter_options(names[0])
+            date_range = (args.desde or opts["min_date"], args.hasta or opts["max_date"])
+            if None in date_range: date_range = None
+
+        rows, total = tenders.query(
+            datasets, date_range=date_range, categorias=args.categoria, organismos=args.organismo,
+            hidden=None if args.incluir_ocultas else hidden,
+            codes=saved if args.tab == "guardadas" else None,
+            limit=args.limite, order=order,
+        )
+    out = rows[FIELD_COLS].rename(columns={"FechaPubObj": "Fecha_Pub", "FechaCierreObj": "Fecha_Cierre"})
+    out["Guardada"] = out["Codigo"].isin(saved)
+    out["Vista"] = out["Codigo"].isin(history)
+
+    fmt = args.formato or FORMATS.get(os.path.splitext(args.output)[1].lower(), "csv")
+    if fmt == "csv":
+        out.to_csv(args.output, index=False, date_format="%Y-%m-%d")
+    elif fmt == "parquet":
+        out.to_parquet(args.output, index=False)
+    else:
+        # Days as "YYYY-MM-DD" and missing values as null, like the CSV
+        days = {c: out[c].dt.strftime("%Y-%m-%d") for c in ("Fecha_Pub", "Fecha_Cierre")}
+        records = out.assign(**days).astype(object)
+        records = records.where(records.notna(), None).to_dict("records")
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+    return {"tab": args.tab, "rows": len(out), "total": total, "output": args.output, "format": fmt,
+            "load_s": round(loaded - start, 3), "total_s": round(time.perf_counter() - start, 3)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta las licitaciones de una pestaña, con sus filtros, sin abrir la app")
+    parser.add_argument("output", help="archivo de salida (.csv, .parquet o .json)")
+    parser.add_argument("--tab", choices=list(TABS), default="disponibles")
+    parser.add_argument("--desde", type=_day, help="fecha de cierre mínima (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=_day, help="fecha de cierre máxima (AAAA-MM-DD)")
+    parser.add_argument("--dias", type=int, default=7, help="ventana de --tab por-cerrar")
+    parser.add_argument("--categoria", nargs="*", help="una o más categorías")
+    parser.add_argument("--organismo", nargs="*", help="uno o más organismos")
+    parser.add_argument("--incluir-ocultas", action="store_true", help="no excluir las ocultadas en la app")
+    parser.add_argument("--limite", type=int, help="máximo de filas")
+    parser.add_argument("--formato", choices=sorted(set(FORMATS.values())), help="por defecto, según la extensión")
+    parser.add_argument("--db", default=DB_FILE, help="base SQLite de la app (ocultas/guardadas/vistas)")
+    parser.add_argument("--main", default=DATASETS["main"], help="JSON de Disponibles (otro archivo que el de la app se carga aparte)")
+    parser.add_argument("--obras", default=DATASETS["obras"], help="JSON de Obras Civiles (ídem)")
+    parser.add_argument("--frames", default=FRAME_DIR, help="carpeta de snapshots Arrow ('' = sin snapshots)")
+    args = parser.parse_args(argv)
+    args.files = {"main": args.main, "obras": args.obras}
+    args.frames = args.frames or None
+
+    print(json.dumps(export(args), ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
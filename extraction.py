@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from html.parser import HTMLParser
+
+from change_log import ChangeLog
+from loader import DB_FILE, LOG_FILE, log_for
+from processing import read_records, write_records
+from state_store import SQLiteDB
+
+log = logging.getLogger(__name__)
+
+# Portal section number -> ExtendedMetadata key and shape
+SECTIONS = {
+    1: ("Section_1_Características", "pairs"),
+    6: ("Section_6_Criterios", "table"),
+    7: ("Section_7_Montos", "pairs"),
+    8: ("Section_8_Garantias", "blocks"),
+}
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+LAST_SECTION = max(SECTIONS)
+_SECTION_RE = re.compile(r"^(\d+)\s*[.)-]\s*\S")
+# Where the numbered sections start: menus/scripts before it are never parsed
+_FIRST_HEADING_RE = re.compile(r"<h[1-6][^>]*>(?:\s|<[^>]*>)*\d+\s*[.)-]", re.IGNORECASE)
+_SPACES_RE = re.compile(r"[ \t\r\f\v\xa0]+")
+PARSER_VERSION = 1  # Bump when parse_ficha changes: cached results (failures too) of older versions are redone
+
+SCHEMA = [
+    # One row per (code, page version), from the parser version it names;
+    # error is set when that page failed to parse
+    '''CREATE TABLE IF NOT EXISTS extraction_cache (
+        codigo TEXT NOT NULL,
+        page_hash TEXT NOT NULL,
+        parser INTEGER NOT NULL,
+        metadata TEXT,
+        error TEXT,
+        extracted_at TEXT,
+        PRIMARY KEY (codigo, page_hash)
+    )''',
+]
+
+# ==========================================
+# 🧾 FICHA PARSER
+# ==========================================
+def _clean(text):
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+class _Done(Exception):
+    pass
+
+class _FichaParser(HTMLParser):
+    # Collects the tables under each numbered section heading ("1. Características
+    # de la licitación", "6. Criterios de evaluación", ...) as rows of cell texts.
+    # Nested tables are kept apart (each table has its own row/cell state).
+    # Parsing stops at the first heading past the last section we keep.
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections = {}
+        self.current = None
+        self._heading = None
+        self._tables = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in HEADINGS:
+            self._heading = []
+        elif tag == "table":
+            self._tables.append({"rows": [], "row": None, "cell": None})
+        elif not self._tables:
+            return
+        elif tag == "tr":
+            self._tables[-1]["row"] = []
+        elif tag in ("td", "th") and self._tables[-1]["row"] is not None:
+            self._tables[-1]["cell"] = []
+        elif tag == "br" and self._tables[-1]["cell"] is not None:
+            self._tables[-1]["cell"].append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in HEADINGS and self._heading is not None:
+            m = _SECTION_RE.match(_clean("".join(self._heading)))
+            self._heading = None
+            if m:
+                self.current = int(m.group(1))
+                if self.current > LAST_SECTION and self.sections:
+                    raise _Done()
+                self.sections.setdefault(self.current, [])
+        elif tag == "table" and self._tables:
+            rows = self._tables.pop()["rows"]
+            if rows and self.current is not None:
+                self.sections[self.current].append(rows)
+        elif not self._tables:
+            return
+        elif tag in ("td", "th") and self._tables[-1]["cell"] is not None:
+            table = self._tables[-1]
+            table["row"].append((_clean("".join(table["cell"])), tag == "th"))
+            table["cell"] = None
+        elif tag == "tr" and self._tables[-1]["row"] is not None:
+            table = self._tables[-1]
+            if table["row"]:
+                table["rows"].append(table["row"])
+            table["row"] = None
+
+    def handle_data(self, data):
+        if self._heading is not None:
+            self._heading.append(data)
+        if self._tables and self._tables[-1]["cell"] is not None:
+            self._tables[-1]["cell"].append(data)
+
+def _pairs(tables):
+    # "Label:" | value rows -> {label: value}
+    out = {}
+    for rows in tables:
+        for row in rows:
+            cells = [text for text, _ in row]
+            if len(cells) >= 2 and cells[0]:
+                out[cells[0].rstrip(":").strip()] = "\n".join(c for c in cells[1:] if c)
+    return out
+
+def _table(tables):
+    # Header row + data rows -> [{header: value}]
+    out = []
+    for rows in tables:
+        header = [text for text, _ in rows[0]]
+        out += [dict(zip(header, (text for text, _ in row))) for row in rows[1:] if any(t for t, _ in row)]
+    return out
+
+def parse_ficha(html):
+    # Portal detail page -> ExtendedMetadata dict (absent sections stay empty)
+    start = _FIRST_HEADING_RE.search(html)
+    parser = _FichaParser()
+    try:
+        parser.feed(html[start.start():] if start else html)
+        parser.close()
+    except _Done:
+        pass
+    if not parser.sections:
+        raise ValueError("sin secciones numeradas (¿no es una ficha de licitación?)")
+    metadata = {}
+    for number, (key, shape) in SECTIONS.items():
+        tables = parser.sections.get(number, [])
+        if shape == "pairs":
+            metadata[key] = _pairs(tables)
+        elif shape == "table":
+            metadata[key] = _table(tables)
+        else:
+            metadata[key] = [_pairs([rows]) for rows in tables]
+    return metadata
+
+def page_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _read_page(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _extract_file(path):
+    # Worker side (process pool): never raises, failures travel back as text
+    try:
+        data = _read_page(path)
+        return page_hash(data), parse_ficha(data.decode("utf-8", errors="replace")), None
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+# ==========================================
+# ⚙️ PIPELINE
+# ==========================================
+class ExtractionCache(SQLiteDB):
+    def __init__(self, path, timeout=30.0):
+        super().__init__(path, timeout)
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            # A cache from before the parser column: start over
+            have = [r[1] for r in conn.execute("PRAGMA table_info(extraction_cache)")]
+            if have and "parser" not in have:
+                conn.execute('DROP TABLE extraction_cache')
+            for stmt in SCHEMA:
+                conn.execute(stmt)
+
+    def get_many(self, keys):
+        # {(code, hash): (metadata or None, error or None)}, current parser only
+        conn = self._conn()
+        found = {}
+        for code, digest in keys:
+            row = conn.execute('SELECT metadata, error FROM extraction_cache WHERE codigo = ? AND page_hash = ? AND parser = ?',
+                               (code, digest, PARSER_VERSION)).fetchone()
+            if row:
+                found[(code, digest)] = (json.loads(row[0]) if row[0] else None, row[1])
+        return found
+
+    def put_many(self, entries):
+        # entries: [(code, hash, metadata or None, error or None)]
+        now = datetime.now().isoformat(" ")
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            conn.executemany(
+                'INSERT OR REPLACE INTO extraction_cache (codigo, page_hash, parser, metadata, error, extracted_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(c, h, PARSER_VERSION, json.dumps(m, ensure_ascii=False) if m is not None else None, e, now)
+                 for c, h, m, e in entries])
+
+def find_pages(pages_dir):
+    # {code: path} for every "<CodigoExterno>.html" saved in pages_dir
+    pages = {}
+    for name in os.listdir(pages_dir):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in (".html", ".htm"):
+            pages[stem] = os.path.join(pages_dir, name)
+    return pages
+
+def extract_pages(pages, cache=None, workers=None, chunksize=16):
+    # pages: {code: html path}. Returns (metadata by code, errors by code, stats).
+    # Pages already parsed with the same content hash (and PARSER_VERSION) come
+    # from the cache; the rest are parsed in a process pool. A failing page is
+    # reported, not fatal.
+    start = time.perf_counter()
+    metadata, errors = {}, {}
+    hashes = {}
+    for code, path in pages.items():
+        try:
+            hashes[code] = page_hash(_read_page(path))
+        except OSError as e:
+            errors[code] = f"{type(e).__name__}: {e}"
+
+    cached = cache.get_many(hashes.items()) if cache else {}
+    todo = []
+    for code, digest in hashes.items():
+        hit = cached.get((code, digest))
+        if hit is None:
+            todo.append(code)
+        elif hit[1]:
+            errors[code] = hit[1]
+        else:
+            metadata[code] = hit[0]
+
+    fresh = []
+    if todo:
+        paths = [pages[code] for code in todo]
+        if workers == 1:
+            results = map(_extract_file, paths)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(_extract_file, paths, chunksize=chunksize)
+        try:
+            for code, (digest, meta, error) in zip(todo, results):
+                digest = digest or hashes[code]
+                if error:
+                    errors[code] = error
+                else:
+                    metadata[code] = meta
+                fresh.append((code, digest, meta, error))
+        finally:
+            if pool: pool.shutdown()
+        if cache and fresh:
+            cache.put_many(fresh)
+
+    stats = {"pages": len(pages), "cached": len(hashes) - len(todo), "parsed": len(todo),
+             "failed": len(errors), "seconds": round(time.perf_counter() - start, 2)}
+    return metadata, errors, stats
+
+def enrich(filepath, pages_dir, cache=None, workers=None, changes=None):
+    # Sets ExtendedMetadata on every record of filepath that has a saved page.
+    # With changes (a ChangeLog) the records live there under the file's name
+    # instead: only those with a page are read, the updated ones appended.
+    pages = find_pages(pages_dir)
+    if changes is not None:
+        dataset = os.path.basename(filepath)
+        records = list(changes.latest(dataset, set(changes.codes(dataset)) & set(pages)))
+    else:
+        records = read_records(filepath) or []
+    wanted = {r.get("CodigoExterno") for r in records} & set(pages)
+    metadata, errors, stats = extract_pages({c: pages[c] for c in wanted}, cache, workers)
+
+    updated = []
+    for record in records:
+        meta = metadata.get(record.get("CodigoExterno"))
+        if meta is not None and record.get("ExtendedMetadata") != meta:
+            record["ExtendedMetadata"] = meta
+            updated.append(record)
+    changed = len(updated)
+    if updated and changes is not None:
+        changes.append(dataset, updated)
+    elif updated:
+        write_records(filepath, records)
+    for code, error in sorted(errors.items()):
+        log.warning("Ficha %s: %s", code, error)
+    return dict(stats, updated=changed, errors=errors)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extrae ExtendedMetadata desde fichas HTML guardadas del portal")
+    parser.add_argument("output", help="archivo JSON a enriquecer (p.ej. OBRAS_CIVILES_READY.json)")
+    parser.add_argument("--pages", required=True, help="carpeta con <CodigoExterno>.html")
+    parser.add_argument("--cache", default=DB_FILE, help=f"base SQLite del caché de extracción (por defecto {DB_FILE})")
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--log", nargs="?", const=LOG_FILE,
+                        help=f"agrega los cambios al registro (por defecto {LOG_FILE}) en vez de reescribir el JSON; "
+                             "sin esta opción se usa el registro si ya tiene este archivo")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # Same rule as the app's reads (loader.log_for)
+    changes = ChangeLog(args.log) if args.log else log_for(args.output)
+    result = enrich(args.output, args.pages, ExtractionCache(args.cache), args.workers, changes)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if result["errors"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,262 @@
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from change_log import ChangeLog
+from loader import LOG_FILE, log_for
+from processing import read_records, write_records
+
+log = logging.getLogger(__name__)
+
+API_URL = "https://api.mercadopublico.cl/servicios/v1/publico/licitaciones.json"
+URL_PUBLICA = "https://www.mercadopublico.cl/ListadoLicitaciones/Pantallas/DirectorioLicitacion.aspx?idLicitacion={}"
+URL_PORTAL = "https://www.mercadopublico.cl/Procurement/Modules/RFB/DetailsAcquisition.aspx?idLicitacion={}&parent=1"
+
+# Fields added by later enrichment steps (categories, scraped ficha): kept from
+# the previous version of a record, the API doesn't return them
+CARRIED_FIELDS = ["CategoriasIDIEM", "Match_Category", "Match_Keyword", "ExtendedMetadata"]
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class IngestionError(Exception):
+    pass
+
+# ==========================================
+# 🌐 HTTP CLIENT
+# ==========================================
+class RateLimiter:
+    # Token bucket shared by all workers: at most `rate` requests/second, bursts of `burst`
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate: return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class MercadoPublicoClient:
+    # One keep-alive Session (connection pool sized to the workers) shared by a
+    # bounded thread pool. Every attempt goes through the rate limiter; 429/5xx,
+    # transport errors and the API's "simultaneous requests" answer are retried
+    # with exponential backoff + jitter (Retry-After wins when present).
+
+    def __init__(self, ticket, base_url=API_URL, workers=8, rate=10.0, retries=5,
+                 backoff=0.5, timeout=30.0):
+        self.ticket = ticket
+        self.base_url = base_url
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate, burst=workers)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {"requests": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get(self, **params):
+        # Decoded JSON of one API call; IngestionError once retries are exhausted
+        params["ticket"] = self.ticket
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            self._count("requests")
+            retry_after = None
+            try:
+                resp = self.session.get(self.base_url, params=params, timeout=self.timeout)
+                if resp.status_code in RETRY_STATUS:
+                    retry_after = resp.headers.get("Retry-After")
+                    error = f"HTTP {resp.status_code}"
+                else:
+                    resp.raise_for_status()
+                    data = resp.json()
+                    # Throttling comes back as HTTP 200 with {"Codigo": ..., "Mensaje": ...}
+                    if "Listado" in data:
+                        return data
+                    error = f"API {data.get('Codigo')}: {data.get('Mensaje')}"
+            except requests.HTTPError as e:
+                raise IngestionError(str(e)) from e
+            # Connection/timeouts, a body cut short (ChunkedEncodingError), bad JSON...
+            except (requests.RequestException, ValueError) as e:
+                error = str(e)
+
+            if attempt == self.retries:
+                raise IngestionError(f"{params.get('codigo') or 'listado'}: {error}")
+            self._count("retries")
+            try: delay = float(retry_after)
+            except (TypeError, ValueError): delay = self.backoff * 2 ** attempt * (0.5 + random.random())
+            time.sleep(delay)
+
+    def listing(self, fecha=None, estado=None):
+        # Summaries (CodigoExterno, Nombre, CodigoEstado, FechaCierre) of one day or state
+        params = {}
+        if fecha: params["fecha"] = fecha
+        if estado: params["estado"] = estado
+        return self.get(**params)["Listado"]
+
+    def detail(self, code):
+        listado = self.get(codigo=code)["Listado"]
+        if not listado:
+            raise IngestionError(f"{code}: sin detalle")
+        return listado[0]
+
+    def details(self, codes):
+        # Yields (code, record or None, error or None) as the workers finish
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mp-fetch") as pool:
+            futures = {pool.submit(self.detail, code): code for code in codes}
+            for fut in as_completed(futures):
+                code = futures[fut]
+                try:
+                    yield code, fut.result(), None
+                except IngestionError as e:
+                    yield code, None, str(e)
+
+# ==========================================
+# 📥 INGESTION
+# ==========================================
+def fingerprint(item):
+    # (state, closing date): a listing summary and a full record of the same
+    # unchanged tender give the same value
+    fecha = (item.get("Fechas") or {}).get("FechaCierre") or item.get("FechaCierre")
+    return str(item.get("CodigoEstado")), str(fecha or "")[:19]
+
+def to_record(detail, previous=None):
+    # API detail -> the record layout load_data/processing read
+    record = dict(detail)
+    code = record.get("CodigoExterno")
+    record.setdefault("URL_Publica", URL_PUBLICA.format(code))
+    record.setdefault("URL_Documentos_Portal", URL_PORTAL.format(code))
+    for field in CARRIED_FIELDS:
+        if previous and field in previous and field not in record:
+            record[field] = previous[field]
+    return record
+
+def ingest(client, filepath, summaries, select=None, force=False, changes=None):
+    # Refreshes filepath from listing summaries: codes whose state/closing date
+    # match the stored record are skipped, the rest are fetched concurrently.
+    # Existing records keep their position, new ones are appended in listing
+    # order; records missing from the listing are kept (closed tenders stay).
+    # With changes (a ChangeLog) the records live there under the file's name
+    # instead: only the listed codes are read and only the changed fields of
+    # the fetched ones are appended, filepath is left alone.
+    start = time.perf_counter()
+    wanted = [s for s in summaries if s.get("CodigoExterno") and (select is None or select(s))]
+    if changes is not None:
+        dataset = os.path.basename(filepath)
+        previous = {r["CodigoExterno"]: r for r in changes.latest(dataset, {s["CodigoExterno"] for s in wanted})}
+    else:
+        # Only a missing file is an empty start: rewriting one that failed to
+        # parse would keep just the fetched records
+        records = read_records(filepath) if os.path.exists(filepath) else []
+        if not isinstance(records, list):
+            raise IngestionError(f"{filepath}: no se pudo leer como lista de licitaciones, no se sobrescribe")
+        position = {r.get("CodigoExterno"): i for i, r in enumerate(records)}
+        previous = {s["CodigoExterno"]: records[position[s["CodigoExterno"]]] for s in wanted if s["CodigoExterno"] in position}
+
+    to_fetch = [s["CodigoExterno"] for s in wanted
+                if force or s["CodigoExterno"] not in previous
+                or fingerprint(previous[s["CodigoExterno"]]) != fingerprint(s)]
+
+    fetched, failed = {}, {}
+    for code, detail, error in client.details(to_fetch):
+        if error:
+            failed[code] = error
+            log.warning("Detalle %s: %s", code, error)
+        else:
+            fetched[code] = detail
+
+    added = 0
+    updated = {}
+    for code in to_fetch:
+        if code not in fetched or code in updated: continue
+        updated[code] = to_record(fetched[code], previous.get(code))
+        added += code not in previous
+
+    written = None
+    if updated and changes is not None:
+        written = changes.append(dataset, updated.values())
+    elif updated:
+        for code, record in updated.items():
+            if code in position:
+                records[position[code]] = record
+            else:
+                position[code] = len(records)
+                records.append(record)
+        write_records(filepath, records)
+    out = {
+        "listed": len(wanted), "fetched": len(fetched), "added": added,
+        "skipped": len(wanted) - len(to_fetch), "failed": failed,
+        "requests": client.stats["requests"], "retries": client.stats["retries"],
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    if written is not None:
+        out["changed"] = written["changed"]
+    return out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Actualiza un JSON de licitaciones desde la API de MercadoPúblico")
+    parser.add_argument("output", help="archivo JSON a actualizar (p.ej. FINAL_PRODUCTION_DATA.json)")
+    parser.add_argument("--ticket", default=os.environ.get("MERCADOPUBLICO_TICKET"))
+    parser.add_argument("--fecha", help="día ddmmaaaa del listado")
+    parser.add_argument("--estado", help="estado del listado (p.ej. activas)")
+    parser.add_argument("--codes", nargs="*", help="solo estos códigos (detalle directo)")
+    parser.add_argument("--base-url", default=API_URL)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0, help="máximo de peticiones por segundo")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--force", action="store_true", help="descarga aunque el estado no haya cambiado")
+    parser.add_argument("--log", nargs="?", const=LOG_FILE,
+                        help=f"agrega solo los cambios al registro (por defecto {LOG_FILE}) en vez de reescribir el JSON; "
+                             "sin esta opción se usa el registro si ya tiene este archivo")
+    args = parser.parse_args(argv)
+    if not args.ticket:
+        parser.error("falta --ticket (o MERCADOPUBLICO_TICKET)")
+    if not (args.fecha or args.estado or args.codes):
+        args.estado = "activas"
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    client = MercadoPublicoClient(args.ticket, args.base_url, args.workers, args.rate, args.retries)
+    # Where the app reads the file from (loader.log_for): writing the JSON of a
+    # file the log holds would never show up
+    changes = ChangeLog(args.log) if args.log else log_for(args.output)
+    try:
+        if args.codes:
+            summaries = [{"CodigoExterno": c} for c in args.codes]
+            result = ingest(client, args.output, summaries, force=True, changes=changes)
+        else:
+            result = ingest(client, args.output, client.listing(args.fecha, args.estado), force=args.force, changes=changes)
+    finally:
+        client.close()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if result["failed"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
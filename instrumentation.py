@@ -0,0 +1,276 @@
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from atomic_file import replace_file, temp_beside
+
+log = logging.getLogger("perf")
+
+_NOOP = nullcontext()
+_VERB_RE = re.compile(r"^\s*(\w+)")
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(\w+)", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def query_label(sql):
+    # "SELECT ... FROM tenders t ..." -> "SELECT tenders" (low-cardinality metric label)
+    verb = _VERB_RE.match(sql)
+    table = _TABLE_RE.search(sql)
+    label = verb.group(1).upper() if verb else "?"
+    return f"{label} {table.group(1)}" if table else label
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# ==========================================
+# ⏱️ RECORDER
+# ==========================================
+class Recorder:
+    # Timing spans, SQLite statements and cache hits/misses. Off by default:
+    # span() then hands back a shared no-op context and every hook returns after
+    # one attribute check. Totals are process-wide (every session, background
+    # threads included); the per-rerun trace belongs to the thread that called
+    # begin_run() (the script thread of one Streamlit session).
+
+    def __init__(self, enabled=False, keep=50):
+        self.enabled = enabled
+        self.prom_file = None
+        self.log_runs = False
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.totals = {}  # (kind, name) -> [count, seconds, max seconds]
+        self.caches = {}  # (name, "hit"/"miss") -> count
+        self.runs = deque(maxlen=keep)  # summaries of the latest reruns
+        self.reruns = 0
+        self._local = threading.local()
+
+    def configure(self, enabled=None, prom_file=None, log_runs=None):
+        if enabled is not None: self.enabled = enabled
+        if prom_file is not None: self.prom_file = prom_file
+        if log_runs is not None: self.log_runs = log_runs
+        if self.log_runs and not log.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+            log.addHandler(handler)
+            log.setLevel(logging.INFO)
+        return self
+
+    # --- Hooks ---
+    def span(self, name):
+        if not self.enabled:
+            return _NOOP
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record("span", name, time.perf_counter() - start)
+
+    def timed(self, name=None):
+        # Decorator version of span()
+        def deco(func):
+            label = name or func.__name__
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._span(label):
+                    return func(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def record(self, kind, name, seconds):
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace.append((kind, name, seconds))
+        with self.lock:
+            t = self.totals.get((kind, name))
+            if t is None:
+                t = self.totals[(kind, name)] = [0, 0.0, 0.0]
+            t[0] += 1
+            t[1] += seconds
+            if seconds > t[2]: t[2] = seconds
+
+    def cache(self, name, hit):
+        if not self.enabled: return
+        outcome = "hit" if hit else "miss"
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace.append(("cache", f"{name}:{outcome}", 0.0))
+        with self.lock:
+            self.caches[(name, outcome)] = self.caches.get((name, outcome), 0) + 1
+
+    def counted(self, name, memoize):
+        # memoize: st.cache_resource / st.cache_data (any memoizing decorator).
+        # A call is a miss when the memoized body actually ran.
+        def deco(func):
+            ran = threading.local()
+
+            @functools.wraps(func)
+            def body(*args, **kwargs):
+                ran.flag = True
+                return func(*args, **kwargs)
+            memo = memoize(body)
+
+            @functools.wraps(func)
+            def call(*args, **kwargs):
+                if not self.enabled:
+                    return memo(*args, **kwargs)
+                ran.flag = False
+                out = memo(*args, **kwargs)
+                self.cache(name, not ran.flag)
+                return out
+            call.clear = getattr(memo, "clear", None)
+            return call
+        return deco
+
+    # --- Reruns ---
+    def begin_run(self):
+        self._local.trace = [] if self.enabled else None
+        self._local.start = time.perf_counter()
+
+    def end_run(self):
+        # Summary of this thread's rerun ({} when off); also logged / exported if configured
+        trace = getattr(self._local, "trace", None)
+        self._local.trace = None
+        if trace is None:
+            return {}
+        run = {"at": datetime.now().isoformat(timespec="seconds"),
+               "seconds": time.perf_counter() - self._local.start,
+               "span": {}, "sqlite": {}, "cache": {}}
+        for kind, name, seconds in trace:
+            if kind == "cache":
+                cache, outcome = name.rsplit(":", 1)
+                run["cache"].setdefault(cache, {"hit": 0, "miss": 0})[outcome] += 1
+            else:
+                agg = run[kind].setdefault(name, [0, 0.0])
+                agg[0] += 1
+                agg[1] += seconds
+        with self.lock:
+            self.runs.append(run)
+            self.reruns += 1
+        if self.log_runs:
+            log.info(json.dumps(run, ensure_ascii=False))
+        if self.prom_file:
+            self.write_prometheus(self.prom_file)
+        return run
+
+    def cache_totals(self):
+        # {name: {"hit": n, "miss": n}} since start
+        with self.lock:
+            items = list(self.caches.items())
+        out = {}
+        for (name, outcome), n in items:
+            out.setdefault(name, {"hit": 0, "miss": 0})[outcome] = n
+        return out
+
+    # --- Export ---
+    def prometheus(self):
+        # Text exposition format (e.g. for node_exporter's textfile collector)
+        with self.lock:
+            totals = dict((k, list(v)) for k, v in self.totals.items())
+            caches = dict(self.caches)
+            reruns = self.reruns
+        lines = []
+        for kind, label, help_text in [("span", "name", "Time spent in instrumented code paths"),
+                                       ("sqlite", "query", "Time spent in SQLite statements")]:
+            metric = f"idiem_{kind}_seconds"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+            for (k, name), (count, total, _) in sorted(totals.items()):
+                if k != kind: continue
+                lines.append(f'{metric}_count{{{label}="{_escape(name)}"}} {count}')
+                lines.append(f'{metric}_sum{{{label}="{_escape(name)}"}} {total:.6f}')
+            lines += [f"# HELP {metric}_max Slowest single call", f"# TYPE {metric}_max gauge"]
+            lines += [f'{metric}_max{{{label}="{_escape(name)}"}} {mx:.6f}'
+                      for (k, name), (_, _, mx) in sorted(totals.items()) if k == kind]
+        lines += ["# HELP idiem_cache_requests_total Cache lookups by result",
+                  "# TYPE idiem_cache_requests_total counter"]
+        lines += [f'idiem_cache_requests_total{{cache="{_escape(name)}",result="{outcome}"}} {n}'
+                  for (name, outcome), n in sorted(caches.items())]
+        lines += ["# HELP idiem_reruns_total Script reruns measured",
+                  "# TYPE idiem_reruns_total counter", f"idiem_reruns_total {reruns}",
+                  "# HELP idiem_start_time_seconds When the recorder started",
+                  "# TYPE idiem_start_time_seconds gauge", f"idiem_start_time_seconds {self.started:.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Atomic replace, so a scraper never reads half a file
+        fd, tmp = temp_beside(path, prefix=".perf-", suffix=".prom")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus())
+            replace_file(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+            self.caches.clear()
+            self.runs.clear()
+            self.reruns = 0
+            self.started = time.time()
+
+recorder = Recorder()
+
+# ==========================================
+# 🗄️ SQLITE
+# ==========================================
+class _Rows:
+    # Already-read result of a traced SELECT; the cursor calls the stores make
+    def __init__(self, rows, cursor):
+        self._rows = rows
+        self._pos = 0
+        self.description = cursor.description
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = cursor.rowcount
+
+    def fetchone(self):
+        if self._pos >= len(self._rows): return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchall(self):
+        rest, self._pos = self._rows[self._pos:], len(self._rows)
+        return rest
+
+    def __iter__(self):
+        while self._pos < len(self._rows):
+            yield self.fetchone()
+
+class TracedConnection(sqlite3.Connection):
+    # sqlite3.connect(factory=TracedConnection): every statement is timed while
+    # the recorder is on. SELECT rows are read inside the timing, so the time
+    # covers the whole scan and not only its first step.
+
+    def execute(self, sql, parameters=()):
+        if not recorder.enabled:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            cur = super().execute(sql, parameters)
+            if cur.description is not None:
+                cur = _Rows(cur.fetchall(), cur)
+            return cur
+        finally:
+            recorder.record("sqlite", query_label(sql), time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not recorder.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            recorder.record("sqlite", query_label(sql), time.perf_counter() - start)
@@ -0,0 +1,62 @@
+import logging
+import os
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+# Files shared by the app and the batch tools (relative to the working directory)
+JSON_FILE_MAIN = "FINAL_PRODUCTION_DATA.json"
+JSON_FILE_OBRAS = "OBRAS_CIVILES_DATA.json"
+DB_FILE = "licitaciones_state.db"
+LOG_FILE = "licitaciones_log.db"  # Change log of the records (change_log.py): a file with records there is read from it
+DATASETS = {"main": JSON_FILE_MAIN, "obras": JSON_FILE_OBRAS}
+LAZY_RECORDS = True   # Stream the JSON and decode full records only for the detail view
+FRAME_DIR = ".frames"  # Memory-mapped Arrow copies of the parsed frames, shared by every process (needs pyarrow; None = heap)
+
+# ==========================================
+# 📂 DATASETS (no Streamlit; pandas only once a file is loaded)
+# ==========================================
+def snapshot_path(filepath, frame_dir=FRAME_DIR):
+    return os.path.join(frame_dir, os.path.basename(filepath) + ".arrow") if frame_dir else None
+
+def similar_path(filepath, frame_dir=FRAME_DIR):
+    return os.path.join(frame_dir, os.path.basename(filepath) + ".similar.npz") if frame_dir else None
+
+def log_for(filepath, log_file=LOG_FILE):
+    # ChangeLog holding filepath's records, None if it has none (the JSON file
+    # is their source then). Readers and writers both decide by this
+    if not log_file or not os.path.exists(log_file):
+        return None
+    from change_log import ChangeLog
+    changes = ChangeLog(log_file)
+    return changes if changes.signature(os.path.basename(filepath)) is not None else None
+
+def open_log(filepath, log_file=LOG_FILE):
+    # LogRecords of filepath's records in the change log, None if it has none
+    changes = log_for(filepath, log_file)
+    if changes is None:
+        return None
+    from change_log import LogRecords
+    dataset = os.path.basename(filepath)
+    # Something still rewrote the JSON after the log's last change: not what is shown
+    if os.path.exists(filepath) and datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat(" ") > changes.signature(dataset)[1]:
+        log.warning("%s es más reciente que su registro en %s: se muestra el registro", filepath, log_file)
+    return LogRecords(changes, dataset)
+
+def open_dataset(name, filepath=None, tenders=None, search=None, similar=None, frame_dir=FRAME_DIR, lazy=LAZY_RECORDS, log_file=LOG_FILE):
+    # TenderDataset of one file (or of its records in the change log). Every
+    # change is mirrored into the tenders table the tabs query and the
+    # full-text index and the similarity index, when given (only the touched
+    # codes, unless the frame was rebuilt).
+    from processing import TenderDataset, derive_key
+    filepath = filepath or DATASETS[name]
+    def sync(ds, dirty):
+        if tenders is not None:
+            # Its rows also change with the rules / UTM value (derive_key), not only with the file
+            tenders.sync(name, ds.df, dirty, signature=f"{ds.file_sig} {derive_key()}")
+        if search is not None:
+            search.sync(name, ds.iter_records(dirty), dirty, signature=str(ds.file_sig))
+        if similar is not None:
+            similar.sync(ds.iter_records(dirty), dirty, signature=str(ds.file_sig))
+    return TenderDataset(filepath, lazy=lazy, on_change=sync, snapshot=snapshot_path(filepath, frame_dir),
+                         log=open_log(filepath, log_file))
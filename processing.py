@@ -0,0 +1,723 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import threading
+from collections.abc import Mapping
+from datetime import datetime, date
+
+import numpy as np
+import pandas as pd
+
+from atomic_file import replace_file, temp_beside
+from categorization import categorize_series, rules_fingerprint
+from instrumentation import recorder
+from shared_frame import available as arrow_available, map_frame, share_frame
+
+UTM_VALUE = 69611
+
+# Columns of the tender grids (kept even when the file is missing/empty)
+EXPECTED_COLS = [
+    "Codigo", "Nombre", "Organismo", "Estado_Lic", "Categoria",
+    "Monto_Num", "Monto", "Monto_Tipo",
+    "Fecha Pub", "FechaPubObj", "Fecha Cierre", "FechaCierreObj", "URL"
+]
+# Text shown in the grid, formatted only for the rows on screen (display_frame)
+DISPLAY_COLS = ["Monto", "Fecha Pub", "Fecha Cierre"]
+# Parsed grid fields (EXPECTED_COLS without their display text)
+FIELD_COLS = [c for c in EXPECTED_COLS if c not in DISPLAY_COLS]
+# Raw text of a date that doesn't read back as its parsed day ("no es fecha",
+# "2026-1-5"), shown as is like the old loop did; missing for every other row
+DATE_TEXT_COLS = {"FechaPubObj": "FechaPubTexto", "FechaCierreObj": "FechaCierreTexto"}
+# Columns of the parsed frame each file keeps in memory
+FRAME_COLS = FIELD_COLS + list(DATE_TEXT_COLS.values())
+# Few distinct values -> categoricals; days -> datetime64 (NaT when missing/invalid)
+CATEGORY_COLS = ["Organismo", "Estado_Lic", "Categoria", "Monto_Tipo"]
+DATE_COLS = ["FechaPubObj", "FechaCierreObj"]
+URGENT_DAYS = 7  # Closing dates past or this close get the "Fecha Cierre" marker
+DERIVE_VERSION = 2  # Bump when derive_frame's output changes: stored frames are re-derived
+SOURCE_COL = "_source"  # Per-record source hash kept next to the frame in the snapshot
+
+# Raw fields pulled out of every record in a single flattening pass
+RAW_COLS = [
+    "CodigoExterno", "Nombre", "NombreOrganismo", "Estado", "Match_Category",
+    "MontoEstimado", "Presupuesto", "TipoLicitacion",
+    "FechaPublicacion", "FechaCierre", "URL_Documentos_Portal",
+    "SearchDigest",  # only there so edits to the searchable text count as changes
+]
+
+# ==========================================
+# 🛠️ DATA PROCESSING
+# ==========================================
+def clean_money_string(text):
+    if not text: return 0
+    try:
+        clean = re.sub(r'[^\d]', '', str(text))
+        if clean: return float(clean)
+    except: pass
+    return 0
+
+def estimate_monto(text):
+    if not text: return 0
+    matches = re.findall(r'(\d[\d\.]*)', text)
+    if matches:
+        try:
+            return float(matches[0].replace(".", "")) * UTM_VALUE
+        except: pass
+    return 0
+
+def format_clp(val):
+    if not val or val == 0: return "$ 0"
+    return f"${val:,.0f}".replace(",", ".")
+
+def empty_frame():
+    return compact_frame(pd.DataFrame({c: pd.Series(dtype=object) for c in FRAME_COLS}))
+
+def read_records(filepath):
+    # Returns the raw list of tenders, or None when the file is missing/unreadable
+    if not os.path.exists(filepath):
+        return None
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def write_records(filepath, records):
+    # Atomic replace, so a reader (TenderDataset.refresh) never sees half a file
+    fd, tmp = temp_beside(filepath)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=4)
+        replace_file(tmp, filepath)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+# --- Streaming reader (top-level array, one record at a time) ---
+def iter_json_array(filepath, chunk_size=1 << 20):
+    # Yields (byte_offset, byte_length, record) for each element of the top-level
+    # array, holding at most one chunk plus one record in memory
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    with open(filepath, 'rb') as f:
+        buf, pos, offset = "", 0, 0
+        eof, started = False, False
+        while True:
+            # Separators are ASCII, so one char == one byte here
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+                offset += 1
+            if pos < len(buf):
+                if not started:
+                    if buf[pos] != "[": raise ValueError("Expected a top-level JSON array")
+                    started = True
+                    pos += 1
+                    offset += 1
+                    continue
+                if buf[pos] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof: raise
+                else:
+                    length = len(buf[pos:end].encode("utf-8"))
+                    yield offset, length, item
+                    offset += length
+                    pos = end
+                    continue
+            elif eof:
+                if started: raise ValueError("Unterminated JSON array")
+                return
+            # Record cut by the chunk boundary (or buffer exhausted): read more
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + utf8.decode(chunk, final=eof)
+            pos = 0
+
+def read_record_at(filepath, offset, length):
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+def scan_records(filepath):
+    # Streaming pass: grid fields + byte span of every record, raw dicts are dropped.
+    # Returns (rows, spans) or None when the file is missing/unreadable
+    if not os.path.exists(filepath):
+        return None
+    rows, spans = [], []
+    try:
+        for offset, length, item in iter_json_array(filepath):
+            rows.append(_flatten(item))
+            spans.append((offset, length))
+    except Exception:
+        return None
+    return rows, spans
+
+class RecordIndex(Mapping):
+    # code -> raw record, decoded from disk only when someone asks for it
+    # (the detail view). Spans are refreshed by TenderDataset on reload and
+    # kept as arrays (sorted UTF-8 codes, byte spans, file positions): no
+    # Python object per record stays alive after the scan.
+
+    def __init__(self, filepath, codes=(), spans=()):
+        self.filepath = filepath
+        self.set_spans(codes, spans)
+
+    def set_spans(self, codes, spans):
+        # (offset, length) per code in file order; a repeated code keeps its
+        # last one, records without a text code are left out
+        keys = np.array([c.encode("utf-8") if isinstance(c, str) else b"" for c in codes], dtype="S")
+        spans = np.array(spans, dtype="int64").reshape(-1, 2)
+        pos = np.flatnonzero(keys != b"")[::-1]
+        self.keys, first = np.unique(keys[pos], return_index=True)
+        self.spans, self.pos = spans[pos[first]], pos[first]
+
+    def _find(self, code):
+        # Row of code in the arrays, None when it isn't there
+        if not isinstance(code, str) or not code:
+            return None
+        key = code.encode("utf-8")
+        i = int(np.searchsorted(self.keys, key))
+        return i if i < len(self.keys) and self.keys[i] == key else None
+
+    def __getitem__(self, code):
+        i = self._find(code)
+        if i is None:
+            raise KeyError(code)
+        offset, length = self.spans[i].tolist()
+        try:
+            item = read_record_at(self.filepath, offset, length)
+        except (OSError, ValueError):
+            raise KeyError(code)
+        # File rewritten after the last reload: the span points elsewhere
+        if not isinstance(item, dict) or item.get("CodigoExterno") != code:
+            raise KeyError(code)
+        return item
+
+    def __contains__(self, code):
+        return self._find(code) is not None
+
+    def __iter__(self):
+        # File order
+        return (key.decode("utf-8") for key in self.keys[np.argsort(self.pos, kind="stable")])
+
+    def __len__(self):
+        return len(self.keys)
+
+# --- Columnar helpers (whole-column versions of the per-record helpers above) ---
+def _flatten(item):
+    # One tuple per record, in RAW_COLS order
+    fechas = item.get("Fechas") or {}
+    ext = (item.get("ExtendedMetadata") or {}).get("Section_1_Características") or {}
+    return (
+        item.get("CodigoExterno"),
+        item.get("Nombre", ""),
+        (item.get("Comprador") or {}).get("NombreOrganismo", ""),
+        item.get("Estado", "Publicada"),
+        item.get("Match_Category"),
+        item.get("MontoEstimado"),
+        ext.get("Presupuesto"),
+        ext.get("Tipo de Licitación", ""),
+        fechas.get("FechaPublicacion"),
+        fechas.get("FechaCierre"),
+        item.get("URL_Documentos_Portal"),
+        hash(search_document(item)[3:]),
+    )
+
+def search_document(item):
+    # Searchable text of a record: (codigo, nombre, organismo, descripcion, items)
+    items = (item.get("Items") or {}).get("Listado") or item.get("DetalleArticulos") or []
+    lines = [" ".join(str(it.get(k) or "") for k in ("NombreProducto", "Descripcion"))
+             for it in items if isinstance(it, dict)]
+    return (
+        str(item.get("CodigoExterno") or ""),
+        str(item.get("Nombre") or ""),
+        str((item.get("Comprador") or {}).get("NombreOrganismo") or ""),
+        str(item.get("Descripcion") or ""),
+        "\n".join(lines),
+    )
+
+def flatten_records(data):
+    return [_flatten(item) for item in data]
+
+def raw_frame(rows):
+    cols = zip(*rows) if rows else [()] * len(RAW_COLS)
+    return pd.DataFrame({k: pd.Series(v, dtype=object) for k, v in zip(RAW_COLS, cols)})
+
+def _truthy(s):
+    # Python truthiness per element (None, "", 0 -> False)
+    return s.astype(bool)
+
+def map_unique(s, func):
+    # Runs func once per distinct value (missing values are passed as None)
+    codes, uniques = pd.factorize(s)
+    out = np.array([func(u) for u in uniques] + [func(None)], dtype=object)
+    return pd.Series(out[codes], index=s.index)
+
+def _title(value):
+    return str(value).title()
+
+def title_text(s):
+    # str(x).title() for every element
+    return map_unique(s, _title)
+
+def clean_money_series(s):
+    # Vectorized clean_money_string
+    out = pd.Series(0.0, index=s.index)
+    has = _truthy(s)
+    digits = s[has].map(str).str.replace(r'[^\d]', '', regex=True)
+    digits = digits[digits != ""]
+    out[digits.index] = digits.astype("float64")
+    return out
+
+def estimate_monto_series(s):
+    # Vectorized estimate_monto: first number of the text, in UTM
+    out = pd.Series(0.0, index=s.index)
+    has = _truthy(s)
+    first = s[has].map(str).str.extract(r'(\d[\d\.]*)', expand=False).dropna()
+    out[first.index] = first.str.replace(".", "", regex=False).astype("float64") * UTM_VALUE
+    return out
+
+def _parse_day(text):
+    try: return datetime.strptime(text, "%Y-%m-%d").date()
+    except: return None
+
+def day_strings(s):
+    # str(x)[:10] for truthy values, "" otherwise
+    out = pd.Series("", index=s.index, dtype=object)
+    has = _truthy(s)
+    out[has] = s[has].map(str).str[:10]
+    return out
+
+def parse_days(day_str):
+    # Dates repeat a lot, so strptime runs once per distinct day string
+    return map_unique(day_str, lambda text: _parse_day(text) if text else None)
+
+def resolve_monto(raw):
+    # MontoEstimado -> Presupuesto (Section_1) -> UTM estimate from "Tipo de Licitación"
+    api = pd.to_numeric(raw["MontoEstimado"], errors="coerce")
+    is_api = _truthy(raw["MontoEstimado"]) & (api > 0)
+    presupuesto = clean_money_series(raw["Presupuesto"])
+    is_pres = ~is_api & (presupuesto > 0)
+    estimado = estimate_monto_series(raw["TipoLicitacion"])
+    is_est = ~is_api & ~is_pres & (estimado > 0)
+
+    monto = pd.Series(0.0, index=raw.index)
+    monto[is_api] = api[is_api].astype("float64")
+    monto[is_pres] = presupuesto[is_pres]
+    monto[is_est] = estimado[is_est]
+    monto_tipo = np.where(is_est, "Estimado", "Exacto")
+    return monto, monto_tipo
+
+def to_days(s):
+    # Raw date text -> (datetime64 day, str(x)[:10] where it isn't that day's
+    # "YYYY-MM-DD"). NaT when missing or invalid.
+    text = day_strings(s)
+    days = pd.to_datetime(text, format="%Y-%m-%d", errors="coerce").astype("datetime64[s]")
+    iso, _, _ = _day_text(days)
+    return days, text.where((text != "") & (text.to_numpy() != iso), None)
+
+def compact_frame(df):
+    # Category for the few distinct values (the date texts are nearly all missing)
+    return df.astype({**{c: "category" for c in CATEGORY_COLS + list(DATE_TEXT_COLS.values())},
+                      **{c: "datetime64[s]" for c in DATE_COLS}})
+
+def derive_frame(raw):
+    # Columnar rebuild of the old per-record loop, in the compact layout
+    # (FRAME_COLS); the display text is added per page by display_frame
+    name = title_text(raw["Nombre"])
+    cat = raw["Match_Category"].copy()
+    needs_cat = ~_truthy(cat) | (cat == "Sin Categoría")
+    if needs_cat.any():
+        cat[needs_cat] = categorize_series(name[needs_cat])
+
+    monto, monto_tipo = resolve_monto(raw)
+    pub, pub_text = to_days(raw["FechaPublicacion"])
+    cierre, cierre_text = to_days(raw["FechaCierre"])
+
+    df = pd.DataFrame({
+        "Codigo": raw["CodigoExterno"].to_numpy(),
+        "Nombre": name.to_numpy(),
+        "Organismo": title_text(raw["NombreOrganismo"]).to_numpy(),
+        "Estado_Lic": title_text(raw["Estado"]).to_numpy(),
+        "Categoria": cat.to_numpy(),
+        "Monto_Num": monto.to_numpy(),
+        "Monto_Tipo": monto_tipo,
+        "FechaPubObj": pub.to_numpy(),
+        "FechaCierreObj": cierre.to_numpy(),
+        "URL": raw["URL_Documentos_Portal"].to_numpy(),
+        "FechaPubTexto": pub_text.to_numpy(),
+        "FechaCierreTexto": cierre_text.to_numpy(),
+    })
+    return compact_frame(df)
+
+def _day_text(s):
+    # datetime64 Series -> ("YYYY-MM-DD" or "", days, missing), in numpy
+    days = s.to_numpy().astype("datetime64[D]")
+    missing = np.isnat(days)
+    return np.where(missing, "", np.datetime_as_string(days, unit="D")), days, missing
+
+def _shown_day(df, col):
+    # _day_text of a frame's date column, with its raw text where the frame kept one
+    text, days, missing = _day_text(df[col])
+    raw = df[DATE_TEXT_COLS[col]]
+    kept = raw.notna().to_numpy()
+    if kept.any():
+        text = np.where(kept, raw.to_numpy(dtype=object), text).astype(str)
+    return text, days, missing
+
+def display_frame(df, today=None):
+    # Rows about to be shown (one grid page) + their DISPLAY_COLS, in EXPECTED_COLS
+    # order. Urgency is checked against today on every render. Built in one
+    # go from object arrays: for a page, pandas' per-column inference and
+    # assign() would cost more than the formatting itself.
+    today = np.datetime64(today or date.today(), "D")
+    pub, _, _ = _shown_day(df, "FechaPubObj")
+    cierre, days, missing = _shown_day(df, "FechaCierreObj")
+    # Expired or closing within URGENT_DAYS
+    urgent = ~missing & (days - today <= np.timedelta64(URGENT_DAYS, "D"))
+    shown = {
+        "Monto": np.array([format_clp(v) for v in df["Monto_Num"]], dtype=object),
+        "Fecha Pub": pub.astype(object),
+        "Fecha Cierre": np.where(urgent, np.char.add(" ", cierre), cierre).astype(object),
+    }
+    return pd.DataFrame({c: shown[c] if c in shown else df[c] for c in EXPECTED_COLS}, index=df.index)
+
+def build_frame(data):
+    raw = raw_frame(flatten_records(data))
+    return derive_frame(raw), dict(zip(raw["CodigoExterno"], data))
+
+def load_tenders(filepath):
+    data = read_records(filepath)
+    # PREVENT KEY ERROR: Ensure basic structure exists even if file is missing/empty
+    if not data:
+        return empty_frame(), {}
+    return build_frame(data)
+
+def in_set(s, values):
+    # s.isin(values) for a large set and a short s (a grid page): isin would
+    # hash all of values on every call, this looks up only the rows of s
+    return pd.Series(np.fromiter((v in values for v in s), bool, len(s)), index=s.index)
+
+def mark_view(df_in, history, saved):
+    # Grid rows + the Visto/Guardar/Ocultar columns; returns (rows, codes seen for the first time)
+    if df_in.empty: return pd.DataFrame(), []
+    df_out = df_in.copy()
+    new_mask = ~in_set(df_out["Codigo"], history)
+    df_out["Visto"] = ~new_mask
+    df_out["Guardar"] = in_set(df_out["Codigo"], saved)
+    df_out["Ocultar"] = False
+    return df_out.reset_index(drop=True), df_out.loc[new_mask, "Codigo"].tolist()
+
+# ==========================================
+# 🕵️ DATA AUDIT
+# ==========================================
+# Parse problems, checked on the flattened rows (the file is not read again)
+AUDIT_REASONS = [
+    ("no_code", "Sin CodigoExterno"),
+    ("duplicate", "Código duplicado (vale la última aparición)"),
+    ("bad_pub", "Fecha publicación inválida"),
+    ("no_cierre", "Sin fecha cierre"),
+    ("bad_cierre", "Fecha cierre inválida"),
+]
+
+def audit_source(rows):
+    # What audit_frame needs of each flattened record (code, name, parse
+    # problems), kept per file version instead of the records themselves. The
+    # texts are "str" columns (one Arrow buffer with pyarrow): no Python
+    # object per record stays alive after the scan.
+    raw = raw_frame(rows)
+    code = raw["CodigoExterno"]
+    pub, cierre = day_strings(raw["FechaPublicacion"]), day_strings(raw["FechaCierre"])
+    return pd.DataFrame({
+        "Codigo": code.astype("str"),
+        "Nombre": raw["Nombre"].astype("str"),
+        "no_code": ~_truthy(code),
+        "bad_pub": (pub != "") & parse_days(pub).isna(),
+        "no_cierre": cierre == "",
+        "bad_cierre": (cierre != "") & parse_days(cierre).isna(),
+    })
+
+def audit_frame(source, df):
+    # One row per record of the file, in file order (source: audit_source of
+    # its rows): the parse problems found and, joined by code, the grid fields
+    # the tab filters look at
+    code = source["Codigo"]
+    has_code = ~source["no_code"]
+    flags = pd.DataFrame({
+        "no_code": source["no_code"],
+        # The tender store keeps the last record of a code
+        "duplicate": has_code & code.duplicated(keep="last"),
+        "bad_pub": source["bad_pub"],
+        "no_cierre": source["no_cierre"],
+        "bad_cierre": source["bad_cierre"],
+    })
+    motivo = pd.Series("", index=source.index, dtype=object)
+    for key, label in AUDIT_REASONS:
+        motivo = motivo.where(~flags[key], motivo + label + "; ")
+
+    out = pd.DataFrame({
+        "Codigo": code.where(has_code, "SIN_CODIGO"),
+        "Nombre": source["Nombre"],
+        "Parseado": ~(flags["no_code"] | flags["duplicate"]),
+        "Motivo": motivo.str.rstrip("; ").astype("str"),
+    })
+    grid = df[["Codigo", "Organismo", "Categoria"]].astype({"Codigo": "str", "Organismo": object, "Categoria": object}).assign(
+        Cierre=df["FechaCierreObj"].dt.strftime("%Y-%m-%d").astype("str")
+    ).drop_duplicates("Codigo", keep="last")
+    out = out.merge(grid, on="Codigo", how="left")
+    # Cached with the dataset: texts as "str" columns too, not an object per row
+    out["Cierre"] = out["Cierre"].fillna("").astype("str")
+    return out
+
+AUDIT_STATUS = ["❌ Error Parseo", "👻 Oculto en DB", "🔍 Filtrado UI"]
+
+def audit_status(base, hidden, date_range=None, categorias=None, organismos=None):
+    # audit_frame + the per-rerun flags (hidden codes, current tab filters), all vectorized
+    df_audit = base[["Codigo", "Nombre"]].copy()
+    df_audit["1. En JSON"] = True
+    df_audit["2. Parseado (DF)"] = base["Parseado"]
+    df_audit["3. DB Oculto"] = base["Codigo"].isin(hidden)
+
+    filtered = pd.Series(False, index=base.index)
+    if date_range is not None and len(date_range) == 2:
+        lo, hi = date_range[0].isoformat(), date_range[1].isoformat()
+        filtered |= ~((base["Cierre"] >= lo) & (base["Cierre"] <= hi))
+    if categorias: filtered |= ~base["Categoria"].isin(categorias)
+    if organismos: filtered |= ~base["Organismo"].isin(organismos)
+    df_audit["4. Filtro UI"] = filtered & base["Parseado"]
+
+    df_audit["Motivo"] = base["Motivo"]
+    df_audit["RESULTADO"] = np.select(
+        [~base["Parseado"], df_audit["3. DB Oculto"], df_audit["4. Filtro UI"]], AUDIT_STATUS, "✅ VISIBLE")
+    return df_audit
+
+# ==========================================
+# 🔄 INCREMENTAL RELOAD
+# ==========================================
+def file_signature(filepath):
+    # (mtime, size) is enough to skip re-reading an untouched file
+    try:
+        st_ = os.stat(filepath)
+    except OSError:
+        return None
+    return (st_.st_mtime_ns, st_.st_size)
+
+def source_hash(row):
+    # Stable across processes, unlike hash(): the flattened fields derive_frame
+    # reads (all but SearchDigest, the last one)
+    digest = hashlib.blake2b(repr(row[:-1]).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+def row_digest(row):
+    # In-process hash of a whole flattened record (SearchDigest included): tells
+    # a changed record from an untouched one without keeping the record around
+    try: return hash(row)
+    except TypeError: return hash(repr(row))  # a dict/list where a scalar was expected
+
+def derive_key():
+    # What derived values depend on besides the record itself
+    return json.dumps([DERIVE_VERSION, FRAME_COLS, rules_fingerprint(), UTM_VALUE])
+
+def reuse_frame(rows, hashes, cached):
+    # derive_frame(raw_frame(rows)), taking each record whose source hash is
+    # unchanged from cached (an earlier frame + SOURCE_COL) and deriving only
+    # the rest. Returns (frame, records derived).
+    cached = cached.drop_duplicates("Codigo", keep="last")
+    pos = pd.Index(cached["Codigo"]).get_indexer([row[0] for row in rows])
+    hit = pos >= 0
+    hit[hit] = cached[SOURCE_COL].to_numpy()[pos[hit]] == hashes[hit]
+    miss = np.flatnonzero(~hit)
+    parts = [cached[FRAME_COLS].take(pos[hit])]
+    if len(miss):
+        parts.append(derive_frame(raw_frame([rows[i] for i in miss])))
+    out = pd.concat(parts, ignore_index=True)
+    # Back to file order; concat turns categoricals with different categories into objects
+    order = np.argsort(np.concatenate([np.flatnonzero(hit), miss]), kind="stable")
+    return compact_frame(out.take(order).reset_index(drop=True)), len(miss)
+
+def patch_frame(frame, keep, fresh, order):
+    # The rows of frame where keep, then those of fresh, taken in order
+    out = pd.concat([frame[keep], fresh], ignore_index=True) if len(fresh) else frame[keep]
+    return out.take(order).reset_index(drop=True)
+
+class TenderDataset:
+    # Parsed view of one JSON file, shared by every session and patched on reload.
+    # Each row keeps a digest of the source fields it is derived from, so a
+    # reload only re-derives the rows whose fields were added, changed or
+    # removed; the flattened records themselves are dropped once the frame (and
+    # the small audit_source) is built. With lazy=True the file is streamed and
+    # full_map is a RecordIndex of byte spans instead of a dict holding every
+    # raw record. on_change(dataset, dirty) is called after every change; dirty
+    # is the set of touched codes, or None when the whole frame was rebuilt.
+    # With a snapshot path (and pyarrow) the frame is kept there as a
+    # memory-mapped Arrow file (shared_frame.py), with the source hash of every
+    # record: a process loading the same file version maps it as is, a later
+    # version re-derives only the records whose hash changed (or all of them
+    # after a derive_key change). With log (a change_log.LogRecords) the
+    # records come from the change log instead of the file: its latest
+    # versions, and on refresh only the ones appended since.
+
+    def __init__(self, filepath, lazy=False, on_change=None, snapshot=None, log=None):
+        self.filepath = filepath
+        self.lazy = lazy
+        self.log = log
+        self.on_change = on_change
+        self.snapshot = snapshot if arrow_available() else None
+        self.hashes = None   # source_hash per row of df (only with a snapshot)
+        self.digests = None  # row_digest per row of df
+        self.derived = 0     # records the last change had to derive
+        self.lock = threading.Lock()
+        self.file_sig = None
+        self._audit_source = audit_source([])
+        self._audit = None
+        self.df = empty_frame()
+        self.full_map = log if log is not None else RecordIndex(filepath) if lazy else {}
+        self.refresh()
+
+    def _signature(self):
+        return self.log.signature() if self.log is not None else file_signature(self.filepath)
+
+    def _read(self, sig):
+        # (codes, rows, values for full_map) in file order
+        if self.log is not None:
+            # Codes are never removed from the log: changed rows in place, new
+            # ones at the end. Only the records appended since are read, the
+            # row of every other code is None (unchanged)
+            if self.digests is None or self.file_sig is None or sig is None or sig[0] < self.file_sig[0]:
+                rows = [_flatten(item) for item in self.log.records()]
+                return [row[0] for row in rows], rows, None
+            fresh = {row[0]: row for row in map(_flatten, self.log.records(self.log.changed_since(self.file_sig[0])))}
+            codes = self._codes()
+            rows = [fresh.pop(code, None) for code in codes] + list(fresh.values())
+            return codes + list(fresh), rows, None
+        if self.lazy:
+            rows, values = scan_records(self.filepath) or ([], [])
+        else:
+            values = read_records(self.filepath) or []
+            rows = flatten_records(values)
+        return [row[0] for row in rows], rows, values
+
+    def refresh(self):
+        # Returns {"added", "changed", "removed"} counts, or None if the file is untouched
+        with self.lock:
+            sig = self._signature()
+            untouched = sig == self.file_sig
+            recorder.cache("dataset_reload", untouched)
+            if untouched:
+                return None
+
+            codes, rows, values = self._read(sig)
+            old = dict(zip(self._codes(), self.digests.tolist())) if self.digests is not None else {}
+            digests = [old[code] if row is None else row_digest(row) for code, row in zip(codes, rows)]
+            sources = dict(zip(codes, digests))
+
+            added = [c for c in sources if c not in old]
+            changed = [c for c in sources if c in old and old[c] != sources[c]]
+            removed = [c for c in old if c not in sources]
+
+            # First load, or duplicated codes (they can't be patched by key)
+            dirty = set(added) | set(changed) | set(removed)
+            if not old or len(sources) != len(rows) or len(old) != len(self.df):
+                self.df = self._rebuild(rows, sig)
+                self._audit_source = audit_source(rows)
+                dirty = None
+            elif dirty:
+                fresh = set(added) | set(changed)
+                self.derived = len(fresh)
+                df, self._audit_source = self._patch(codes, rows, fresh)
+                self.df = self._share(df, rows, sig, fresh)
+
+            # Nothing to keep for a log: its full_map reads it on demand
+            if self.log is None and self.lazy:
+                # Every span moves when the file is rewritten
+                self.full_map.set_spans(codes, values)
+            elif self.log is None:
+                for c in removed:
+                    self.full_map.pop(c, None)
+                self.full_map.update(zip(codes, values))
+
+            self.file_sig, self.digests = sig, np.array(digests, dtype="int64")
+            self._audit = None
+            if self.on_change and (dirty is None or dirty):
+                self.on_change(self, dirty)
+            return {"added": len(added), "changed": len(changed), "removed": len(removed)}
+
+    def _codes(self):
+        # Codes of df's rows as flattened (a mapped frame has NaN where one is missing)
+        codes = self.df["Codigo"]
+        return codes.astype(object).where(codes.notna(), None).tolist()
+
+    def audit(self):
+        # audit_frame of the current file version, built on first use
+        with self.lock:
+            recorder.cache("audit_frame", self._audit is not None)
+            if self._audit is None:
+                self._audit = audit_frame(self._audit_source, self.df)
+            return self._audit
+
+    def iter_records(self, codes=None):
+        # Raw records: the given codes (missing ones skipped) or the whole file in order
+        if codes is not None:
+            for code in codes:
+                try: yield self.full_map[code]
+                except KeyError: continue
+        elif self.log is not None:
+            yield from self.log.records()
+        elif self.lazy:
+            if os.path.exists(self.filepath):
+                for _, _, item in iter_json_array(self.filepath):
+                    yield item
+        else:
+            yield from self.full_map.values()
+
+    def _rebuild(self, rows, sig):
+        self.derived = len(rows)
+        if not rows:
+            return empty_frame()
+        if not self.snapshot:
+            return derive_frame(raw_frame(rows))
+        cached, meta = map_frame(self.snapshot)
+        if cached is None or meta.get("derive") != derive_key():
+            return self._share(derive_frame(raw_frame(rows)), rows, sig)
+        # Same file version, written by another process or the previous run
+        if meta.get("file") == str(sig) and len(cached) == len(rows):
+            self.hashes, self.derived = cached[SOURCE_COL].to_numpy(), 0
+            return cached[FRAME_COLS]
+        hashes = np.array([source_hash(row) for row in rows], dtype="int64")
+        df, self.derived = reuse_frame(rows, hashes, cached)
+        return self._share(df, rows, sig, hashes=hashes)
+
+    def _share(self, df, rows, sig, fresh=None, hashes=None):
+        # Snapshot of df + its source hashes, mapped back. With fresh (codes
+        # re-derived by a patch) the other rows keep the hash of the previous
+        # version, still in self.df / self.hashes at this point (their row in
+        # rows may be None: a log record not read again).
+        if not self.snapshot:
+            return df
+        if hashes is None and fresh is not None and self.hashes is not None:
+            known = dict(zip(self.df["Codigo"], self.hashes))
+            hashes = np.array([known[code] if code in known and code not in fresh else source_hash(row)
+                               for code, row in zip(df["Codigo"], rows)], dtype="int64")
+        elif hashes is None:
+            hashes = np.array([source_hash(row) for row in rows], dtype="int64")
+        out = share_frame(df.assign(**{SOURCE_COL: hashes}), self.snapshot, {"derive": derive_key(), "file": sig})
+        self.hashes = out[SOURCE_COL].to_numpy()
+        return out[FRAME_COLS]
+
+    def _patch(self, codes, rows, fresh):
+        # (frame, audit source) of the new version: the rows of the previous
+        # one whose code is kept and not fresh, the fresh codes derived, in
+        # file order. Both are aligned with self.df, so one order serves both.
+        if not codes:
+            return empty_frame(), audit_source([])
+        fresh_rows = [row for row in rows if row is not None and row[0] in fresh]
+        old = pd.Series(self._codes(), dtype=object)
+        keep = (~old.isin(fresh) & old.isin(codes)).to_numpy()
+        order = pd.Index(old[keep].tolist() + [row[0] for row in fresh_rows], dtype=object).get_indexer(codes)
+        df = patch_frame(self.df, keep, derive_frame(raw_frame(fresh_rows)), order)
+        # concat turns categoricals with different categories into objects
+        return compact_frame(df), patch_frame(self._audit_source, keep, audit_source(fresh_rows), order)
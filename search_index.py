@@ -0,0 +1,122 @@
+import hashlib
+import re
+import threading
+
+from processing import search_document
+from state_store import SQLiteDB
+
+# bm25 weight per indexed column (codigo, nombre, organismo, descripcion, items)
+WEIGHTS = (10.0, 5.0, 2.0, 1.0, 1.0)
+
+SCHEMA = [
+    # unicode61 + remove_diacritics: "geotecnico" matches "Geotécnico".
+    # Prefix indexes keep as-you-type queries ("geot*") cheap.
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS tender_search USING fts5(
+        codigo, nombre, organismo, descripcion, items,
+        tokenize = "unicode61 remove_diacritics 2", prefix = '2 3 4'
+    )''',
+    # FTS row per (dataset, code) and a digest of its text, so unchanged
+    # records are not rewritten when a file is re-indexed
+    '''CREATE TABLE IF NOT EXISTS tender_search_docs (
+        id INTEGER PRIMARY KEY,
+        dataset TEXT NOT NULL,
+        codigo TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        UNIQUE (dataset, codigo)
+    )''',
+    'CREATE TABLE IF NOT EXISTS search_files (dataset TEXT PRIMARY KEY, signature TEXT)',
+]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def _digest(doc):
+    return hashlib.blake2b("\x00".join(doc).encode("utf-8"), digest_size=16).hexdigest()
+
+def match_expression(text):
+    # Free text -> FTS5 query: every word must match, the last one as a prefix
+    # (the user may still be typing it). Words are quoted, so no operator syntax leaks in.
+    words = _TOKEN_RE.findall(text or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+class SearchIndex(SQLiteDB):
+    # Full-text index over code, name, organismo, description and item lines of
+    # every tender, kept in step with the JSON files through TenderDataset.on_change.
+
+    def __init__(self, path, timeout=30.0):
+        super().__init__(path, timeout)
+        self._write_lock = threading.Lock()
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            for stmt in SCHEMA:
+                conn.execute(stmt)
+            rank = "bm25({})".format(", ".join(str(w) for w in WEIGHTS))
+            conn.execute("INSERT INTO tender_search (tender_search, rank) VALUES ('rank', ?)", (rank,))
+
+    # --- Writes ---
+    def sync(self, dataset, records, dirty=None, signature=None):
+        # records: raw dicts. dirty=None means records is the whole dataset (codes
+        # not in it are dropped); otherwise only the dirty codes are touched and
+        # the ones missing from records were removed from the file.
+        with self._write_lock:
+            conn = self._conn()
+            with self._transaction(conn, "BEGIN IMMEDIATE"):
+                if dirty is None:
+                    row = conn.execute('SELECT signature FROM search_files WHERE dataset = ?', (dataset,)).fetchone()
+                    if signature is not None and row and row[0] == signature:
+                        return 0
+                known = dict(conn.execute(
+                    'SELECT codigo, digest FROM tender_search_docs WHERE dataset = ?', (dataset,)))
+
+                docs = {}
+                for item in records:
+                    doc = search_document(item)
+                    if doc[0]:
+                        docs[doc[0]] = doc    # duplicated codes: last one wins, as in full_map
+                scope = set(known) if dirty is None else set(dirty)
+                stale = [c for c in scope if c in known and c not in docs]
+                fresh = [(c, doc, d) for c, doc in docs.items() for d in [_digest(doc)] if known.get(c) != d]
+
+                self._delete(conn, dataset, stale + [c for c, _, _ in fresh if c in known])
+                for code, doc, digest in fresh:
+                    cur = conn.execute('INSERT INTO tender_search_docs (dataset, codigo, digest) VALUES (?, ?, ?)',
+                                       (dataset, code, digest))
+                    conn.execute('INSERT INTO tender_search (rowid, codigo, nombre, organismo, descripcion, items) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)', (cur.lastrowid, *doc))
+                if dirty is None:
+                    conn.execute('INSERT OR REPLACE INTO search_files (dataset, signature) VALUES (?, ?)',
+                                 (dataset, signature))
+            return len(stale) + len(fresh)
+
+    def _delete(self, conn, dataset, codes):
+        for code in codes:
+            row = conn.execute('SELECT id FROM tender_search_docs WHERE dataset = ? AND codigo = ?',
+                               (dataset, code)).fetchone()
+            if row:
+                conn.execute('DELETE FROM tender_search WHERE rowid = ?', row)
+                conn.execute('DELETE FROM tender_search_docs WHERE id = ?', row)
+
+    # --- Reads ---
+    def search(self, text, limit=20):
+        # [(codigo, nombre, snippet)] best first, one hit per code
+        expr = match_expression(text)
+        if expr is None:
+            return []
+        # ORDER BY rank LIMIT straight on the FTS table lets it keep only the top rows
+        rows = self._conn().execute(
+            '''SELECT d.codigo, s.nombre, s.snip FROM (
+                   SELECT rowid, nombre, snippet(tender_search, -1, '**', '**', '…', 12) AS snip, rank
+                   FROM tender_search WHERE tender_search MATCH ? ORDER BY rank LIMIT ?
+               ) s JOIN tender_search_docs d ON d.id = s.rowid
+               ORDER BY s.rank''',
+            (expr, limit * 2))
+        hits, seen = [], set()
+        for code, name, snip in rows:
+            if code in seen: continue
+            seen.add(code)
+            hits.append((code, name, snip))
+            if len(hits) == limit: break
+        return hits
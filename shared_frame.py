@@ -0,0 +1,69 @@
+import logging
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional: without it every process keeps its frames on the heap
+    pa = None
+
+from atomic_file import replace_file, temp_beside
+
+log = logging.getLogger(__name__)
+
+META_PREFIX = "idiem."  # schema metadata written by write_frame
+
+# ==========================================
+# 🗺️ ARROW SNAPSHOTS
+# ==========================================
+# A parsed frame is written once as an uncompressed Arrow IPC file and read
+# back through a read-only memory map: the string, number and date buffers of
+# the returned DataFrame point into the mapped file, so every process that
+# maps it (other Streamlit workers, the next restart) shares the same page
+# cache pages instead of holding its own copy. Only the categorical codes and
+# the index are materialized.
+
+def available():
+    return pa is not None
+
+def map_frame(path):
+    # (memory-mapped frame, its metadata dict); (None, {}) when pyarrow is
+    # missing or the file doesn't exist / can't be read
+    if pa is None or not os.path.exists(path):
+        return None, {}
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        meta = {k.decode("utf-8")[len(META_PREFIX):]: v.decode("utf-8")
+                for k, v in (reader.schema.metadata or {}).items() if k.startswith(META_PREFIX.encode())}
+        return reader.read_all().to_pandas(split_blocks=True), meta
+    except (OSError, pa.ArrowException) as e:
+        log.warning("Snapshot %s ilegible: %s", path, e)
+        return None, {}
+
+def write_frame(df, path, meta):
+    # Atomic replace, so a process mapping the file never sees half of it
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    extra = {f"{META_PREFIX}{k}".encode("utf-8"): str(v).encode("utf-8") for k, v in meta.items()}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **extra})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp = temp_beside(path, prefix=".frame-", suffix=".arrow")
+    try:
+        with os.fdopen(fd, 'wb') as f, pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+        replace_file(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def share_frame(df, path, meta):
+    # df swapped for its memory-mapped snapshot; df itself if that isn't possible
+    # (no pyarrow, or Windows refusing to replace a file another process maps)
+    if pa is None or df.empty:
+        return df
+    try:
+        write_frame(df, path, meta)
+    except OSError as e:
+        log.warning("No se pudo escribir %s: %s", path, e)
+        return df
+    mapped, _ = map_frame(path)
+    return df if mapped is None else mapped
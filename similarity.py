@@ -0,0 +1,278 @@
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from atomic_file import replace_file, temp_beside
+from processing import search_document
+
+SIM_BITS = 18        # Hashed feature space: 2**18 buckets for words and word pairs
+SIM_TERMS = 64       # Strongest features kept per tender
+SIM_MAX_DF = 0.1     # Features in more tenders than this share don't drive a lookup (long postings, low idf)
+SIM_VERSION = 1      # Bump when the features change: stored indexes are rebuilt
+SIM_DEAD = 0.25      # Share of replaced/removed rows after which sync() drops them for good
+
+STOPWORDS = frozenset("""
+    del las los por para con una uno sus que como sin sobre entre desde hasta ante bajo segun
+    otros otras este esta estos estas ese esa dicho dicha sera seran debe deben cada todo toda
+    todos todas mas menos muy tambien servicio servicios adquisicion contratacion licitacion
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+_MASK = (1 << SIM_BITS) - 1
+_TF = (1.0 + np.log(np.maximum(np.arange(256), 1))).astype("float32")  # count -> sublinear tf
+_TF[0] = 0.0
+
+# ==========================================
+# 🔤 FEATURES
+# ==========================================
+def _words(text):
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+    return [w for w in _WORD_RE.findall(text) if w not in STOPWORDS]
+
+def terms(item):
+    # Words and adjacent word pairs of the name (counted twice), description
+    # and item lines of a raw record
+    _, nombre, _, descripcion, items = search_document(item)
+    out = []
+    for text, times in ((nombre, 2), (descripcion, 1), (items, 1)):
+        words = _words(text)
+        out += (words + [f"{a} {b}" for a, b in zip(words, words[1:])]) * times
+    return out
+
+def _entries(records):
+    # (codes, doc, feature, count) of every (tender, feature) pair, one row
+    # per tender in record order (duplicated codes: last one wins). Hashing and
+    # counting run once over all the terms, not per tender.
+    docs = {}
+    for item in records:
+        code = item.get("CodigoExterno")
+        if code:
+            docs.pop(code, None)
+            docs[code] = terms(item)
+    codes = list(docs)
+    lengths = np.fromiter((len(t) for t in docs.values()), dtype=np.int64, count=len(codes))
+    tokens = np.array([t for ts in docs.values() for t in ts], dtype=object)
+    if not len(tokens):
+        return codes, *(np.zeros(0, dtype=t) for t in ("int64", "int32", "int64"))
+    # hash_array is stable across processes, unlike hash()
+    feats = (pd.util.hash_array(tokens, categorize=True) & np.uint64(_MASK)).astype(np.int64)
+    key = np.repeat(np.arange(len(codes), dtype=np.int64), lengths) << SIM_BITS | feats
+    key, counts = np.unique(key, return_counts=True)
+    return codes, key >> SIM_BITS, (key & _MASK).astype(np.int32), counts
+
+def _idf(df, n):
+    return (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype("float32")
+
+def _keep_top(doc, feat, counts, idf):
+    # The SIM_TERMS strongest features of each tender (doc ascending in and out)
+    weight = _TF[np.minimum(counts, 255)] * idf[feat]
+    order = np.lexsort((-weight, doc))
+    doc, feat, counts = doc[order], feat[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, doc[1:] != doc[:-1]]) if len(doc) else np.zeros(0, dtype=np.int64)
+    rank = np.arange(len(doc)) - np.repeat(starts, np.diff(np.r_[starts, len(doc)]))
+    keep = rank < SIM_TERMS
+    return doc[keep], feat[keep], np.minimum(counts[keep], 255).astype(np.uint8)
+
+def _by_feature(feat):
+    # Stable argsort of the features: two radix passes over 16-bit halves
+    # (numpy only radix-sorts 16-bit keys), ~2x faster than on int32
+    order = np.argsort((feat & 0xFFFF).astype(np.uint16), kind="stable")
+    return order[np.argsort((feat[order] >> 16).astype(np.uint16), kind="stable")]
+
+# ==========================================
+# 🔗 SIMILARITY INDEX
+# ==========================================
+class SimilarityIndex:
+    # Hashed TF-IDF vectors of the tenders of one file, for "Licitaciones
+    # similares". Rows are kept as CSR arrays (feature + uint8 count per entry)
+    # in a .npz next to the frame snapshots; postings by feature (CSC) and the
+    # row norms are derived in memory, so a lookup is one bincount over the
+    # postings of the query's features. sync() follows TenderDataset.on_change:
+    # only the dirty codes are re-tokenized, their old rows are marked dead and
+    # dropped once they pass SIM_DEAD of the index.
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.signature = None
+        self._state = self._derive(self._empty())
+        if path and os.path.exists(path):
+            try:
+                with np.load(path) as f:
+                    rows = {k: f[k] for k in f.files}
+                if int(rows.pop("version")) == SIM_VERSION:
+                    self.signature = str(rows.pop("signature"))
+                    self._state = self._derive(rows)
+            except (OSError, ValueError, KeyError):
+                pass
+
+    @staticmethod
+    def _empty():
+        return {"codes": np.zeros(0, dtype=str), "alive": np.zeros(0, dtype=bool),
+                "df": np.zeros(1 << SIM_BITS, dtype=np.int32), "row_ptr": np.zeros(1, dtype=np.int64),
+                "row_feat": np.zeros(0, dtype=np.int32), "row_tf": np.zeros(0, dtype=np.uint8)}
+
+    @staticmethod
+    def _derive(rows):
+        # Stored rows + what lookups need: postings by feature, idf, norms, code -> row
+        n_alive = int(rows["alive"].sum())
+        idf = _idf(rows["df"], n_alive)
+        row_doc = np.repeat(np.arange(len(rows["codes"]), dtype=np.int32), np.diff(rows["row_ptr"]))
+        order = _by_feature(rows["row_feat"])
+        tfidf = _TF[rows["row_tf"]] * idf[rows["row_feat"]]
+        norms = np.sqrt(np.bincount(row_doc, weights=tfidf.astype("float64") ** 2, minlength=len(rows["codes"])))
+        state = dict(rows)
+        state.update(
+            idf=idf, n_alive=n_alive, norms=np.where(norms > 0, norms, 1.0).astype("float32"),
+            post_ptr=np.r_[0, np.cumsum(np.bincount(rows["row_feat"], minlength=1 << SIM_BITS))].astype(np.int64),
+            post_doc=row_doc[order], post_tf=rows["row_tf"][order],
+            row=dict(zip(rows["codes"][rows["alive"]].tolist(), np.flatnonzero(rows["alive"]).tolist())),
+        )
+        return state
+
+    # --- Writes ---
+    def sync(self, records, dirty=None, signature=None):
+        # records: raw dicts. dirty=None means records is the whole file (a
+        # full rebuild, skipped when the stored index is of the same signature);
+        # otherwise only the dirty codes change, missing ones were removed.
+        # Returns the number of tenders (re)indexed, or None when skipped.
+        with self.lock:
+            if dirty is None and signature is not None and signature == self.signature:
+                return None
+            old = self._state
+            codes, doc, feat, counts = _entries(records)
+            if dirty is None:
+                rows = self._empty()
+                alive = np.zeros(0, dtype=bool)
+            else:
+                rows = {k: old[k] for k in self._empty()}
+                alive = rows["alive"].copy()
+                gone = [old["row"][c] for c in set(dirty) | set(codes) if c in old["row"]]
+                alive[gone] = False
+                # Their features leave the document frequencies
+                dead_doc = np.zeros(len(alive), dtype=bool)
+                dead_doc[gone] = True
+                entry_dead = np.repeat(dead_doc, np.diff(rows["row_ptr"]))
+                rows["df"] = rows["df"] - np.bincount(rows["row_feat"][entry_dead], minlength=1 << SIM_BITS).astype(np.int32)
+
+            # New rows: their top features picked with all of them counted in
+            # the idf, but df only counts what is kept (what a removal subtracts)
+            n = int(alive.sum()) + len(codes)
+            doc, feat, tf = _keep_top(doc, feat, counts, _idf(rows["df"] + np.bincount(feat, minlength=1 << SIM_BITS), n))
+            rows = {
+                "codes": np.concatenate([rows["codes"], np.array(codes, dtype=str)]),
+                "alive": np.concatenate([alive, np.ones(len(codes), dtype=bool)]),
+                "df": rows["df"] + np.bincount(feat, minlength=1 << SIM_BITS).astype(np.int32),
+                "row_ptr": np.concatenate([rows["row_ptr"], rows["row_ptr"][-1] + np.cumsum(np.bincount(doc, minlength=len(codes)))]),
+                "row_feat": np.concatenate([rows["row_feat"], feat]),
+                "row_tf": np.concatenate([rows["row_tf"], tf]),
+            }
+            if (~rows["alive"]).sum() > SIM_DEAD * len(rows["alive"]):
+                rows = self._drop_dead(rows)
+            self._state = self._derive(rows)
+            self.signature = signature
+            self._save(rows, signature)
+            return len(codes)
+
+    @staticmethod
+    def _drop_dead(rows):
+        lengths = np.diff(rows["row_ptr"])
+        keep = np.repeat(rows["alive"], lengths)
+        return {"codes": rows["codes"][rows["alive"]], "alive": np.ones(int(rows["alive"].sum()), dtype=bool),
+                "df": rows["df"], "row_ptr": np.r_[0, np.cumsum(lengths[rows["alive"]])].astype(np.int64),
+                "row_feat": rows["row_feat"][keep], "row_tf": rows["row_tf"][keep]}
+
+    def _save(self, rows, signature):
+        # Atomic replace, like the frame snapshots (uncompressed: loads are one read)
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd, tmp = temp_beside(self.path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, version=SIM_VERSION, signature=str(signature), **rows)
+            replace_file(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    # --- Reads ---
+    def __contains__(self, code):
+        return code in self._state["row"]
+
+    def __len__(self):
+        return self._state["n_alive"]
+
+    def vector(self, codes):
+        # (features, weights) of the sum of the unit vectors of the codes found
+        # here, None when none is. Features are global: a vector from one
+        # file's index can be looked up in another's.
+        s = self._state
+        rows = [s["row"][c] for c in codes if c in s["row"]]
+        if not rows:
+            return None
+        ptr = s["row_ptr"]
+        idx = np.concatenate([np.arange(ptr[r], ptr[r + 1]) for r in rows])
+        doc = np.repeat(np.array(rows), [ptr[r + 1] - ptr[r] for r in rows])
+        feat = s["row_feat"][idx]
+        weight = _TF[s["row_tf"][idx]] * s["idf"][feat] / s["norms"][doc]
+        feats, inverse = np.unique(feat, return_inverse=True)
+        return feats, np.bincount(inverse, weights=weight).astype("float32")
+
+    def scores(self, vector, state=None):
+        # Cosine of every row against vector (tf-idf weights, as vector() gives
+        # them), but over the features not skipped as too common; dead rows: 0.
+        # state: the index state to score (by default the current one)
+        s = state or self._state
+        feats, weights = vector
+        norm = float(np.sqrt((weights.astype("float64") ** 2).sum()))
+        # Features in too many tenders barely move the ranking: their postings are skipped
+        common = s["df"][feats] > max(SIM_MAX_DF * s["n_alive"], 1)
+        feats, weights = feats[~common], weights[~common] * s["idf"][feats[~common]]
+        starts, lengths = s["post_ptr"][feats], s["post_ptr"][feats + 1] - s["post_ptr"][feats]
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(len(s["codes"]), dtype="float32")
+        # Every posting of every query feature in one gather
+        idx = np.arange(total) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        contrib = _TF[s["post_tf"][idx]] * np.repeat(weights, lengths)
+        out = np.bincount(s["post_doc"][idx], weights=contrib, minlength=len(s["codes"])) / s["norms"]
+        out[~s["alive"]] = 0.0
+        return out / norm if norm else out
+
+    def top(self, vector, k=10, exclude=()):
+        # [(code, score)] best first, score > 0, codes in exclude left out.
+        # Scores, exclusions and codes all from one state: a sync from another
+        # session may swap self._state in between
+        s = self._state
+        scores = self.scores(vector, s)
+        if exclude:
+            skip = [s["row"][c] for c in exclude if c in s["row"]]
+            scores[skip] = 0.0
+        k = min(k, int((scores > 0).sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return list(zip(s["codes"][best].tolist(), scores[best].astype(float).tolist()))
+
+def similar(indexes, codes, k=10, exclude=()):
+    # [(code, score)] of the tenders most like the given ones across several
+    # indexes (one per file), best first, one entry per code. With several
+    # codes the query is their centroid: "more like my saved tenders".
+    vectors = [v for v in (index.vector(codes) for index in indexes) if v is not None]
+    if not vectors:
+        return []
+    feats, inverse = np.unique(np.concatenate([f for f, _ in vectors]), return_inverse=True)
+    vector = (feats, np.bincount(inverse, weights=np.concatenate([w for _, w in vectors])).astype("float32"))
+    exclude = set(exclude) | set(codes)
+    best = {}
+    for index in indexes:
+        for code, score in index.top(vector, k, exclude):
+            if score > best.get(code, 0.0):
+                best[code] = score
+    return sorted(best.items(), key=lambda kv: -kv[1])[:k]
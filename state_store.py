@@ -0,0 +1,304 @@
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+from instrumentation import TracedConnection
+
+log = logging.getLogger(__name__)
+
+TABLES = ("hidden", "saved", "history")
+POOL_SIZE = 4  # Idle connections kept per database for the next threads
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS hidden (code TEXT PRIMARY KEY, timestamp DATETIME)',
+    'CREATE TABLE IF NOT EXISTS saved (code TEXT PRIMARY KEY, timestamp DATETIME, note TEXT)',
+    'CREATE TABLE IF NOT EXISTS history (code TEXT PRIMARY KEY, first_seen DATETIME)',
+    # One counter per table, bumped inside every write transaction
+    'CREATE TABLE IF NOT EXISTS state_version (name TEXT PRIMARY KEY, version INTEGER NOT NULL)',
+]
+
+# event kind -> [(statement, takes timestamp)], tables it touches
+EVENTS = {
+    "save": ([
+        ('INSERT OR REPLACE INTO saved (code, timestamp) VALUES (?, ?)', True),
+        ('DELETE FROM hidden WHERE code = ?', False),
+    ], ("saved", "hidden")),
+    "unsave": ([('DELETE FROM saved WHERE code = ?', False)], ("saved",)),
+    "hide": ([
+        ('DELETE FROM saved WHERE code = ?', False),
+        ('INSERT OR REPLACE INTO hidden (code, timestamp) VALUES (?, ?)', True),
+    ], ("saved", "hidden")),
+    "seen": ([('INSERT OR IGNORE INTO history (code, first_seen) VALUES (?, ?)', True)], ("history",)),
+}
+
+def _ts(when=None):
+    # Same text format the sqlite3 datetime adapter used to write
+    return (when or datetime.now()).isoformat(" ")
+
+class _Lease:
+    # A pooled connection held by one thread: back to the pool when the thread
+    # (and with it its threading.local) goes away
+    def __init__(self, db, conn):
+        self.db = db
+        self.conn = conn
+
+    def __del__(self):
+        self.db._release(self.conn)
+
+class SQLiteDB:
+    # WAL database file with one connection per thread at a time (busy timeout
+    # for writers). In WAL mode readers never block the writer and vice versa.
+    # Streamlit runs every rerun on a new thread: a finished thread's connection
+    # goes back to a small pool for the next one, so its page cache and
+    # PRAGMAs carry over instead of starting cold on every rerun.
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._idle = []
+        self._idle_lock = threading.Lock()
+        self._conn().execute('PRAGMA journal_mode=WAL')
+
+    def _connect(self):
+        # A new connection (subclasses add their PRAGMAs); used by one thread at a time
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                               check_same_thread=False, factory=TracedConnection)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _conn(self):
+        lease = getattr(self._local, "lease", None)
+        if lease is None:
+            with self._idle_lock:
+                conn = self._idle.pop() if self._idle else None
+            lease = self._local.lease = _Lease(self, conn or self._connect())
+        return lease.conn
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            with self._idle_lock:
+                if len(self._idle) < POOL_SIZE:
+                    self._idle.append(conn)
+                    return
+            conn.close()
+        except Exception:
+            # Interpreter shutdown / closed database: nothing left to reuse
+            pass
+
+    @contextmanager
+    def _transaction(self, conn, begin="BEGIN"):
+        conn.execute(begin)
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+class StateStore(SQLiteDB):
+    # hidden/saved/history state shared by every session.
+    # - writes run under BEGIN IMMEDIATE, each call is one transaction
+    #   (apply() groups any number of events)
+    # - reads are versioned: a table is re-read only after its version moved,
+    #   otherwise every session gets the same cached frozensets
+
+    def __init__(self, path, timeout=30.0):
+        super().__init__(path, timeout)
+        self._cache_lock = threading.Lock()
+        self._versions = {}
+        self._sets = {t: frozenset() for t in TABLES}
+
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            for stmt in SCHEMA:
+                conn.execute(stmt)
+            conn.executemany('INSERT OR IGNORE INTO state_version (name, version) VALUES (?, 0)', [(t,) for t in TABLES])
+
+    # --- Writes ---
+    def apply(self, events):
+        # events: iterable of (kind, code) or (kind, code, datetime), applied in order
+        # in a single transaction; consecutive events of one kind share an executemany
+        rows = [(e[0], e[1], _ts(e[2] if len(e) > 2 else None)) for e in events]
+        if not rows:
+            return
+
+        conn = self._conn()
+        touched = set()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            for kind, run in groupby(rows, key=itemgetter(0)):
+                run = [(code, ts) for _, code, ts in run]
+                statements, tables = EVENTS[kind]
+                for sql, with_ts in statements:
+                    conn.executemany(sql, run if with_ts else [(code,) for code, _ in run])
+                touched.update(tables)
+            conn.executemany('UPDATE state_version SET version = version + 1 WHERE name = ?', [(t,) for t in touched])
+
+    def toggle_save(self, code, action):
+        self.apply([("save" if action else "unsave", code)])
+
+    def hide(self, code):
+        self.apply([("hide", code)])
+
+    def mark_seen(self, codes):
+        self.apply(("seen", code) for code in codes)
+
+    # --- Reads ---
+    def versions(self):
+        return dict(self._conn().execute('SELECT name, version FROM state_version').fetchall())
+
+    def lists(self):
+        # (hidden, saved, history); tables are re-read only when their version changed
+        conn = self._conn()
+        current = self.versions()
+        with self._cache_lock:
+            stale = [t for t in TABLES if self._versions.get(t) != current.get(t)]
+        if stale:
+            # Versions and rows from the same snapshot
+            with self._transaction(conn):
+                current = self.versions()
+                fresh = {t: frozenset(row[0] for row in conn.execute(f'SELECT code FROM {t}')) for t in stale}
+            with self._cache_lock:
+                for t in stale:
+                    if self._versions.get(t, -1) < current[t]:
+                        self._sets[t] = fresh[t]
+                        self._versions[t] = current[t]
+        return self.cached()
+
+    def cached(self):
+        # Last sets read by lists(), without touching the database
+        with self._cache_lock:
+            return tuple(self._sets[t] for t in TABLES)
+
+def overlay(sets, events):
+    # Applies not-yet-committed events on top of (hidden, saved, history)
+    if not events:
+        return sets
+    hidden, saved, history = (set(s) for s in sets)
+    for kind, code in events:
+        if kind == "save":
+            saved.add(code)
+            hidden.discard(code)
+        elif kind == "unsave":
+            saved.discard(code)
+        elif kind == "hide":
+            saved.discard(code)
+            hidden.add(code)
+        elif kind == "seen":
+            history.add(code)
+    return hidden, saved, history
+
+class WriteBehindStore:
+    # Front for StateStore used by the UI: writes are queued and committed by a
+    # background thread in periodic batches (events from every session in one
+    # transaction), and reads never touch disk. lists() is the last committed
+    # state plus the queued events, so a session sees its own writes at once.
+    # The same thread polls for changes made by other processes.
+
+    def __init__(self, store, interval=0.5, poll_every=5.0):
+        self.store = store
+        self.interval = interval
+        self.poll_every = poll_every
+        self._cond = threading.Condition()
+        self._pending = []    # [(kind, code, datetime)] in submit order
+        self._closed = False
+        self.store.lists()
+        self._thread = threading.Thread(target=self._run, name="state-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- UI side (memory only) ---
+    def submit(self, events):
+        now = datetime.now()
+        with self._cond:
+            self._pending.extend((kind, code, now) for kind, code in events)
+            self._cond.notify()
+
+    def toggle_save(self, code, action):
+        self.submit([("save" if action else "unsave", code)])
+
+    def hide(self, code):
+        self.submit([("hide", code)])
+
+    def mark_seen(self, codes):
+        self.submit(("seen", code) for code in codes)
+
+    def lists(self):
+        with self._cond:
+            events = [(kind, code) for kind, code, _ in self._pending]
+        return overlay(self.store.cached(), events)
+
+    # --- Writer thread ---
+    def _run(self):
+        last_poll = 0.0
+        while True:
+            with self._cond:
+                if not self._pending and not self._closed:
+                    self._cond.wait(self.poll_every)
+                closing, has_events = self._closed, bool(self._pending)
+            if has_events and not closing:
+                # Let events from other sessions pile up into the same transaction
+                time.sleep(self.interval)
+
+            committed = self._drain()
+            if committed is None:
+                if closing:
+                    log.error("Dropping %d unsaved state events at shutdown", len(self._pending))
+                    return
+                time.sleep(self.interval)
+                continue
+
+            now = time.monotonic()
+            if committed or now - last_poll >= self.poll_every:
+                try:
+                    self.store.lists()
+                except sqlite3.Error:
+                    log.exception("State refresh failed")
+                last_poll = now
+            with self._cond:
+                if committed:
+                    # Only now (cache refreshed) can the overlay forget them
+                    del self._pending[:committed]
+                    self._cond.notify_all()
+                if closing and not self._pending:
+                    return
+
+    def _drain(self):
+        # Commits everything queued so far; returns how many events, None on failure
+        with self._cond:
+            batch = list(self._pending)
+        if not batch:
+            return 0
+        # "seen" is idempotent: one row per code is enough
+        seen, events = set(), []
+        for kind, code, ts in batch:
+            if kind == "seen":
+                if code in seen: continue
+                seen.add(code)
+            events.append((kind, code, ts))
+        try:
+            self.store.apply(events)
+        except sqlite3.Error:
+            log.exception("Batched state write failed (%d events)", len(events))
+            return None
+        return len(batch)
+
+    def flush(self, timeout=None):
+        # Blocks until everything submitted so far is committed
+        with self._cond:
+            self._cond.notify()
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=30)
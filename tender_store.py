@@ -0,0 +1,260 @@
+import json
+import threading
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import recorder
+from processing import DATE_COLS, FRAME_COLS, display_frame, parse_days
+from state_store import SQLiteDB
+
+# grid column -> tenders table column
+COLUMNS = {
+    "Codigo": "codigo",
+    "Nombre": "nombre",
+    "Organismo": "organismo",
+    "Estado_Lic": "estado_lic",
+    "Categoria": "categoria",
+    "Monto_Num": "monto_num",
+    "Monto_Tipo": "monto_tipo",
+    "FechaPubObj": "fecha_pub",
+    "FechaCierreObj": "fecha_cierre",
+    "URL": "url",
+    "FechaPubTexto": "fecha_pub_texto",
+    "FechaCierreTexto": "fecha_cierre_texto",
+}
+
+TABLE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS tenders (
+        dataset TEXT NOT NULL,
+        codigo TEXT NOT NULL,
+        nombre TEXT, organismo TEXT, estado_lic TEXT, categoria TEXT,
+        monto_num REAL, monto_tipo TEXT,
+        fecha_pub TEXT, fecha_cierre TEXT,
+        url TEXT,
+        fecha_pub_texto TEXT, fecha_cierre_texto TEXT,
+        PRIMARY KEY (dataset, codigo)
+    )''',
+    # What was last loaded per dataset, so a restart on unchanged files skips the rewrite
+    'CREATE TABLE IF NOT EXISTS tender_files (dataset TEXT PRIMARY KEY, signature TEXT)',
+]
+# Default sort (newest first) and each tab filter has its own index. The sort
+# index also carries the filter columns, so walking it skips non-matching rows
+# without reading them.
+SCHEMA = [
+    'CREATE INDEX IF NOT EXISTS idx_tenders_pub ON tenders (dataset, fecha_pub, codigo, categoria, organismo, fecha_cierre)',
+    'CREATE INDEX IF NOT EXISTS idx_tenders_cierre ON tenders (dataset, fecha_cierre)',
+    'CREATE INDEX IF NOT EXISTS idx_tenders_categoria ON tenders (dataset, categoria)',
+    'CREATE INDEX IF NOT EXISTS idx_tenders_organismo ON tenders (dataset, organismo)',
+    'CREATE INDEX IF NOT EXISTS idx_tenders_codigo ON tenders (codigo)',
+]
+INDEXES = [stmt.split()[5] for stmt in SCHEMA]
+# Index used when a filter is narrow enough to drive the query, most selective first
+FILTER_INDEX = {
+    "codes": "idx_tenders_codigo",
+    "organismos": "idx_tenders_organismo",
+    "categorias": "idx_tenders_categoria",
+    "date_range": "idx_tenders_cierre",
+}
+# Sort orders: (index that walks rows in that order, ORDER BY)
+ORDERS = {
+    "pub": ("idx_tenders_pub", "t.fecha_pub DESC, t.codigo DESC"),        # newest first
+    "cierre": ("idx_tenders_cierre", "t.fecha_cierre ASC, t.codigo ASC"),  # closing first
+}
+HIDDEN_CLAUSE = 't.codigo NOT IN (SELECT value FROM json_each(?))'
+CACHE_KB = 65536
+MAX_CACHED_COUNTS = 256
+
+INSERT_SQL = 'INSERT OR REPLACE INTO tenders (dataset, {}) VALUES (?, {})'.format(
+    ", ".join(COLUMNS.values()), ", ".join("?" * len(COLUMNS)))
+SELECT_COLS = ", ".join(f't.{col} AS "{name}"' for name, col in COLUMNS.items())
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def _values(s):
+    # Frame column -> sqlite3 values (None when missing, days as "YYYY-MM-DD")
+    if s.dtype.kind == "M":
+        # numpy pads the year to 4 digits (strftime's %Y doesn't below 1000): text order stays date order
+        days = s.to_numpy().astype("datetime64[D]")
+        return np.where(np.isnat(days), None, np.datetime_as_string(days, unit="D")).tolist()
+    return s.astype(object).where(s.notna(), None).tolist()
+
+def _as_json(values):
+    return json.dumps(sorted({v for v in values if v is not None}))
+
+class TenderStore(SQLiteDB):
+    # Parsed tenders persisted in SQLite so the tabs can push their filters, the
+    # hidden/saved joins, the sort and the row limit down to indexed queries
+    # instead of copying and masking the whole DataFrame on every rerun.
+
+    def __init__(self, path, timeout=30.0):
+        super().__init__(path, timeout)
+        self._cache_lock = threading.Lock()
+        self._options = {}
+        self._counts = {}
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            # Derived data: a table from an older layout is dropped and refilled by the next sync
+            have = [r[1] for r in conn.execute("PRAGMA table_info(tenders)")]
+            if have and have != ["dataset", *COLUMNS.values()]:
+                conn.execute('DROP TABLE tenders')
+                conn.execute('DROP TABLE IF EXISTS tender_files')
+            for stmt in TABLE_SCHEMA + SCHEMA:
+                conn.execute(stmt)
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.execute(f'PRAGMA cache_size=-{CACHE_KB}')
+        return conn
+
+    # --- Writes ---
+    def sync(self, dataset, df, dirty=None, signature=None):
+        # dirty=None replaces the whole dataset, otherwise only those codes
+        conn = self._conn()
+        with self._transaction(conn, "BEGIN IMMEDIATE"):
+            if dirty is None:
+                row = conn.execute('SELECT signature FROM tender_files WHERE dataset = ?', (dataset,)).fetchone()
+                if signature is not None and row and row[0] == signature:
+                    return
+                # Bulk load: indexes are rebuilt once at the end instead of row by row
+                for name in INDEXES:
+                    conn.execute(f'DROP INDEX IF EXISTS {name}')
+                conn.execute('DELETE FROM tenders WHERE dataset = ?', (dataset,))
+                conn.executemany(INSERT_SQL, sorted(self._records(dataset, df), key=itemgetter(1)))
+                for stmt in SCHEMA:
+                    conn.execute(stmt)
+            else:
+                conn.executemany('DELETE FROM tenders WHERE dataset = ? AND codigo = ?', [(dataset, c) for c in dirty])
+                conn.executemany(INSERT_SQL, self._records(dataset, df[df["Codigo"].isin(dirty)]))
+            conn.execute('INSERT OR REPLACE INTO tender_files (dataset, signature) VALUES (?, ?)', (dataset, signature))
+        with self._cache_lock:
+            self._options.pop(dataset, None)
+            self._counts = {k: v for k, v in self._counts.items()
+                            if dataset not in (k[0] if isinstance(k[0], tuple) else (k[0],))}
+
+    def _records(self, dataset, df):
+        # Rows without a code can't be saved/hidden (the audit tab reports them)
+        df = df[df["Codigo"].notna()]
+        cols = [_values(df[c]) for c in COLUMNS]
+        return ((dataset, *row) for row in zip(*cols))
+
+    # --- Reads ---
+    def filter_options(self, dataset):
+        # {min_date, max_date, categorias, organismos}; cached until the next sync
+        with self._cache_lock:
+            cached = self._options.get(dataset)
+        recorder.cache("filter_options", cached is not None)
+        if cached is not None:
+            return cached
+        conn = self._conn()
+        lo, hi = conn.execute('SELECT MIN(fecha_cierre), MAX(fecha_cierre) FROM tenders WHERE dataset = ?', (dataset,)).fetchone()
+        options = {
+            "min_date": parse_days(pd.Series([lo or ""])).iloc[0],
+            "max_date": parse_days(pd.Series([hi or ""])).iloc[0],
+            "categorias": [r[0] for r in conn.execute(
+                'SELECT DISTINCT categoria FROM tenders WHERE dataset = ? AND categoria IS NOT NULL ORDER BY categoria', (dataset,))],
+            "organismos": [r[0] for r in conn.execute(
+                'SELECT DISTINCT organismo FROM tenders WHERE dataset = ? AND organismo IS NOT NULL ORDER BY organismo', (dataset,))],
+        }
+        with self._cache_lock:
+            self._options[dataset] = options
+        return options
+
+    def query(self, datasets, date_range=None, categorias=None, organismos=None,
+              hidden=None, codes=None, limit=None, offset=0, order="pub"):
+        # Returns (rows, total) sorted by ORDERS[order], hidden codes left out.
+        # datasets is one name or several by preference: a code present in more
+        # than one of them is returned once, from the first.
+        filters = []    # (kind, clause, param)
+        if date_range:
+            filters.append(("date_range", 't.fecha_cierre BETWEEN ? AND ?', [_iso(date_range[0]), _iso(date_range[1])]))
+        if categorias:
+            filters.append(("categorias", 't.categoria IN (SELECT value FROM json_each(?))', [_as_json(categorias)]))
+        if organismos:
+            filters.append(("organismos", 't.organismo IN (SELECT value FROM json_each(?))', [_as_json(organismos)]))
+        if codes is not None:
+            filters.append(("codes", 't.codigo IN (SELECT value FROM json_each(?))', [_as_json(codes)]))
+        # In-memory set (includes writes still queued by WriteBehindStore)
+        hidden = [_as_json(hidden)] if hidden else []
+
+        if isinstance(datasets, str):
+            return self._query_one(datasets, filters, hidden, limit, offset, order)
+        if len(datasets) == 1:
+            return self._query_one(datasets[0], filters, hidden, limit, offset, order)
+        return self._query_merged(list(datasets), filters, hidden, limit, offset, order)
+
+    def _query_one(self, dataset, filters, hidden, limit, offset, order):
+        conn = self._conn()
+        where = ['t.dataset = ?'] + [clause for _, clause, _ in filters]
+        params = [dataset] + [p for _, _, ps in filters for p in ps]
+
+        matched = self._count(dataset, where, params)
+        total = matched
+        if hidden:
+            # Driven by the hidden list: one primary key lookup per code
+            total -= conn.execute('SELECT COUNT(*) FROM json_each(?) h CROSS JOIN tenders t '
+                                  f'WHERE t.codigo = h.value AND {" AND ".join(where)}', hidden + params).fetchone()[0]
+            where = where + [HIDDEN_CLAUSE]
+            params = params + hidden
+
+        # Without statistics SQLite can't tell a wide filter from a narrow one,
+        # so the driving index is picked from the counts: walk the sort order
+        # and stop at the limit when matches are dense, otherwise fetch the
+        # matches through their filter's index and sort them
+        index, order_by = ORDERS[order]
+        if filters:
+            rows = self._count(dataset, ['t.dataset = ?'], [dataset])
+            window = offset + limit if limit is not None else rows
+            if matched * matched < window * rows:
+                kinds = {kind for kind, _, _ in filters}
+                index = next(FILTER_INDEX[k] for k in FILTER_INDEX if k in kinds)
+
+        sql = (f'SELECT {SELECT_COLS} FROM tenders t INDEXED BY {index} WHERE {" AND ".join(where)} '
+               f'ORDER BY {order_by}')
+        return self._fetch(conn, sql, params, limit, offset), total
+
+    def _query_merged(self, datasets, filters, hidden, limit, offset, order):
+        # Filters run first, so only the matching rows are ranked per code
+        conn = self._conn()
+        where = ['t.dataset IN (SELECT value FROM json_each(?))'] + [clause for _, clause, _ in filters]
+        params = [json.dumps(datasets)] + [p for _, _, ps in filters for p in ps]
+        if hidden:
+            where.append(HIDDEN_CLAUSE)
+            params += hidden
+        where = " AND ".join(where)
+
+        total = self._count(tuple(datasets), [where], params, "DISTINCT t.codigo")
+        rank = " ".join(f"WHEN ? THEN {i}" for i in range(len(datasets)))
+        sql = (f'SELECT {SELECT_COLS} FROM (SELECT *, ROW_NUMBER() OVER ('
+               f'PARTITION BY codigo ORDER BY CASE dataset {rank} END) AS pick '
+               f'FROM tenders t WHERE {where}) t WHERE t.pick = 1 '
+               f'ORDER BY {ORDERS[order][1]}')
+        return self._fetch(conn, sql, datasets + params, limit, offset), total
+
+    def _count(self, dataset, where, params, what="*"):
+        # Matches per filter set are stable until the next sync (dataset: one
+        # name, or a tuple of them for a merged count)
+        key = (dataset, what, tuple(where), tuple(params))
+        with self._cache_lock:
+            n = self._counts.get(key)
+        recorder.cache("tender_counts", n is not None)
+        if n is not None:
+            return n
+        n = self._conn().execute(f'SELECT COUNT({what}) FROM tenders t WHERE {" AND ".join(where)}', params).fetchone()[0]
+        with self._cache_lock:
+            if len(self._counts) >= MAX_CACHED_COUNTS:
+                self._counts.clear()
+            self._counts[key] = n
+        return n
+
+    def _fetch(self, conn, sql, params, limit, offset):
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params = params + [limit, offset]
+        df = pd.DataFrame(conn.execute(sql, params).fetchall(), columns=FRAME_COLS)
+        df["Monto_Num"] = df["Monto_Num"].astype("float64")  # object when the page is empty
+        for c in DATE_COLS:
+            df[c] = np.array(df[c].fillna("NaT").tolist(), dtype="datetime64[s]")  # ISO text
+        return display_frame(df)
@@ -0,0 +1,66 @@
+from datetime import date
+
+import pandas as pd
+
+from processing import TenderDataset, audit_status
+from test_processing import fixture_records, write
+
+def legacy_status(records, df, hidden, organismos):
+    # The per-record loop the audit tab ran before (organismo filter only)
+    df_ids = set(df["Codigo"].tolist())
+    out = []
+    for item in records:
+        code = item.get("CodigoExterno", "SIN_CODIGO")
+        is_loaded = code in df_ids
+        is_filtered_ui = False
+        if is_loaded:
+            row = df[df["Codigo"] == code].iloc[0]
+            if organismos and row["Organismo"] not in organismos:
+                is_filtered_ui = True
+        if not is_loaded: status = "❌ Error Parseo"
+        elif code in hidden: status = "👻 Oculto en DB"
+        elif is_filtered_ui: status = "🔍 Filtrado UI"
+        else: status = "✅ VISIBLE"
+        out.append((code, is_loaded, code in hidden, is_filtered_ui, status))
+    return out
+
+# ==========================================
+# 🕵️ VECTORIZED AUDIT == THE OLD LOOP
+# ==========================================
+def test_audit_status_matches_legacy_loop(tmp_path):
+    path = tmp_path / "obras.json"
+    records = fixture_records()
+    write(path, records)
+    ds = TenderDataset(str(path))
+    hidden = {r["CodigoExterno"] for r in records[::7]}
+    organismos = ds.df["Organismo"].value_counts().index[:3].tolist()
+
+    got = audit_status(ds.audit(), hidden, organismos=organismos)
+    cols = ["Codigo", "2. Parseado (DF)", "3. DB Oculto", "4. Filtro UI", "RESULTADO"]
+    assert list(got[cols].itertuples(index=False, name=None)) == legacy_status(records, ds.df, hidden, organismos)
+    assert set(got["RESULTADO"]) == {"✅ VISIBLE", "👻 Oculto en DB", "🔍 Filtrado UI"}
+
+def test_audit_flags_parse_problems(tmp_path):
+    path = tmp_path / "obras.json"
+    records = [
+        {"CodigoExterno": "A-1", "Nombre": "primera", "Fechas": {"FechaCierre": "2026-02-01"}},
+        {"Nombre": "sin código", "Fechas": {"FechaCierre": "2026-02-01"}},
+        {"CodigoExterno": "A-2", "Nombre": "fechas malas", "Fechas": {"FechaPublicacion": "ayer", "FechaCierre": "2026-13-01"}},
+        {"CodigoExterno": "A-1", "Nombre": "segunda", "Fechas": {"FechaCierre": "2026-03-01"}},
+        {"CodigoExterno": "A-3", "Nombre": "sin cierre"},
+    ]
+    write(path, records)
+    ds = TenderDataset(str(path))
+    got = audit_status(ds.audit(), {"A-3"}, date_range=(date(2026, 1, 1), date(2026, 2, 15)))
+    assert got["Codigo"].tolist() == ["A-1", "SIN_CODIGO", "A-2", "A-1", "A-3"]
+    assert got["Motivo"].tolist() == [
+        "Código duplicado (vale la última aparición)",
+        "Sin CodigoExterno",
+        "Fecha publicación inválida; Fecha cierre inválida",
+        "",
+        "Sin fecha cierre",
+    ]
+    # The duplicate's status follows the record the grid shows (the last one, closing in March)
+    assert got["RESULTADO"].tolist() == ["❌ Error Parseo", "❌ Error Parseo", "🔍 Filtrado UI", "🔍 Filtrado UI", "👻 Oculto en DB"]
+    assert ds.audit() is ds.audit()
+    pd.testing.assert_series_equal(ds.audit()["Cierre"], pd.Series(["2026-03-01", "", "", "2026-03-01", ""], name="Cierre", dtype="str"))
@@ -0,0 +1,88 @@
+import copy
+from datetime import date, datetime, timedelta
+
+from change_log import ChangeLog
+
+T0 = datetime(2026, 1, 1, 12)
+
+def versions():
+    # Snapshots of a small file over five days: edits (nested ones too), a
+    # dropped field, an addition and a record that disappears
+    day0 = [
+        {"CodigoExterno": "C-1", "Nombre": "Estudio", "Estado": "Publicada", "Fechas": {"FechaCierre": "2026-01-10"}},
+        {"CodigoExterno": "C-2", "Nombre": "Topografía", "Estado": "Publicada", "MontoEstimado": 100},
+        {"CodigoExterno": "C-3", "Nombre": "Pavimento", "Estado": "Publicada"},
+    ]
+    out = [day0]
+    for day in range(1, 5):
+        records = copy.deepcopy(out[-1])
+        records[0]["Fechas"]["FechaCierre"] = f"2026-01-{10 + day}"
+        records[1]["MontoEstimado"] += day
+        if day == 2:
+            records[1].pop("Estado")
+            records.append({"CodigoExterno": "C-4", "Nombre": "Nuevo"})
+        if day == 3:
+            records[2]["Estado"] = "Cerrada"
+        out.append(records)
+    return out
+
+def filled(path, every=32):
+    log = ChangeLog(str(path))
+    counts = [log.append("obras", records, when=T0 + timedelta(days=day), every=every)
+              for day, records in enumerate(versions())]
+    return log, counts
+
+# ==========================================
+# 📜 REPLAY
+# ==========================================
+def test_as_of_replays_every_version(tmp_path):
+    for every in (32, 2):   # plain delta chains, then a checkpoint every 2 changes
+        log, counts = filled(tmp_path / f"log{every}.db", every)
+        assert counts[0] == {"added": 3, "changed": 0, "unchanged": 0}
+        assert counts[2] == {"added": 1, "changed": 2, "unchanged": 1}
+        for day, records in enumerate(versions()):
+            assert log.as_of("obras", T0 + timedelta(days=day, hours=1)) == records
+            assert log.as_of("obras", (T0 + timedelta(days=day)).date()) == records
+        assert log.as_of("obras", T0 - timedelta(days=1)) == []
+        assert list(log.latest("obras")) == versions()[-1]
+        assert log.as_of("obras", T0 + timedelta(days=1), codes=["C-3", "C-1"]) == [versions()[1][0], versions()[1][2]]
+
+def test_unchanged_append_writes_nothing(tmp_path):
+    log, _ = filled(tmp_path / "log.db")
+    before = log.signature("obras")
+    assert log.append("obras", versions()[-1], when=T0 + timedelta(days=9)) == {"added": 0, "changed": 0, "unchanged": 4}
+    assert log.signature("obras") == before and log.changed_since("obras", before[0]) == []
+
+def test_timeline_lists_field_changes(tmp_path):
+    log, _ = filled(tmp_path / "log.db", every=2)
+    timeline = log.timeline("obras", "C-1")
+    assert timeline[0] == (str(T0), None, None, None)
+    assert [(field, before, after) for _, field, before, after in timeline[1:]] == [
+        ("Fechas.FechaCierre", f"2026-01-{9 + day}", f"2026-01-{10 + day}") for day in range(1, 5)]
+    assert [(f, b, a) for _, f, b, a in log.timeline("obras", "C-2") if f == "Estado"] == [("Estado", "Publicada", None)]
+
+# ==========================================
+# 🗜️ COMPACTION
+# ==========================================
+def test_compact_folds_old_history(tmp_path):
+    log, _ = filled(tmp_path / "log.db")
+    cutoff = T0 + timedelta(days=2, hours=1)
+    stats = log.compact("obras", before=cutoff)
+    # C-1 and C-2 had 3 entries up to the cutoff, C-3 and C-4 only one
+    assert stats == {"folded": 2, "deleted": 4, "checkpoints": 0}
+    assert list(log.latest("obras")) == versions()[-1]
+    for day in range(2, 5):
+        assert log.as_of("obras", T0 + timedelta(days=day, hours=1)) == versions()[day]
+    # Before the cutoff a folded record shows its state at the cutoff
+    early = log.as_of("obras", T0 + timedelta(hours=1))
+    assert early == [versions()[2][0], versions()[2][1], versions()[0][2]]
+    assert len(log.timeline("obras", "C-1")) == 3
+    assert log.compact("obras", before=cutoff)["folded"] == 0
+
+def test_compact_checkpoints_long_chains(tmp_path):
+    log, _ = filled(tmp_path / "log.db")
+    assert log.compact("obras", every=2)["checkpoints"] == 2
+    for day, records in enumerate(versions()):
+        assert log.as_of("obras", T0 + timedelta(days=day, hours=1)) == records
+    assert log.compact("obras", every=2)["checkpoints"] == 0
+    assert log.as_of("obras", date(2026, 1, 3)) == versions()[2]
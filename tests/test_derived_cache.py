@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+import processing
+from processing import TenderDataset
+from shared_frame import available
+from test_processing import edit, fixture_records, plain, write
+
+pytestmark = pytest.mark.skipif(not available(), reason="pyarrow no está instalado")
+
+# ==========================================
+# ♻️ DERIVED FIELDS REUSED BY SOURCE HASH
+# ==========================================
+def test_snapshot_reuse_matches_full_derive(tmp_path):
+    # A new process mapping the snapshot of the same version, then of an
+    # older version (only changed records re-derived, by source hash)
+    path, snap = tmp_path / "tenders.json", str(tmp_path / "tenders.arrow")
+    records = fixture_records()
+    write(path, records)
+    TenderDataset(str(path), snapshot=snap)
+    same = TenderDataset(str(path), snapshot=snap)
+    assert same.derived == 0
+    pd.testing.assert_frame_equal(plain(same.df), plain(TenderDataset(str(path)).df))
+
+    write(path, edit(records))
+    later = TenderDataset(str(path), snapshot=snap)
+    assert later.derived == 4
+    pd.testing.assert_frame_equal(plain(later.df), plain(TenderDataset(str(path)).df))
+
+def test_rule_change_rederives_everything(tmp_path, monkeypatch):
+    # The cached fields depend on the rules and the UTM value too (derive_key)
+    path, snap = tmp_path / "tenders.json", str(tmp_path / "tenders.arrow")
+    records = fixture_records()
+    write(path, records)
+    TenderDataset(str(path), snapshot=snap)
+    monkeypatch.setattr(processing, "UTM_VALUE", 70000)
+    ds = TenderDataset(str(path), snapshot=snap)
+    assert ds.derived == len(records)
+    pd.testing.assert_frame_equal(plain(ds.df), plain(TenderDataset(str(path)).df))
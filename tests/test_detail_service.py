@@ -0,0 +1,59 @@
+import time
+
+from detail_service import DetailService, detail_monto
+from processing import UTM_VALUE, TenderDataset, format_clp
+from test_processing import write
+
+RECORDS = [
+    {"CodigoExterno": "D-1", "Nombre": "Estudio de suelos", "MontoEstimado": 5000000,
+     "Comprador": {"NombreOrganismo": "MUNICIPALIDAD DE A"}, "Fechas": {"FechaCierre": "2026-02-01"},
+     "Items": {"Listado": [{"NombreProducto": "Sondaje", "Cantidad": 3}, {"NombreProducto": "Informe", "Cantidad": 1}]}},
+    {"CodigoExterno": "D-2", "Nombre": "Pavimentación",
+     "ExtendedMetadata": {"Section_1_Características": {"Presupuesto": "$1.234.567"}}},
+    {"CodigoExterno": "D-3", "Nombre": "Topografía",
+     "ExtendedMetadata": {"Section_1_Características": {"Tipo de Licitación": "Licitación Pública entre 100 y 1.000 UTM (LE)"}}},
+]
+
+def datasets(tmp_path, main, obras):
+    write(tmp_path / "main.json", main)
+    write(tmp_path / "obras.json", obras)
+    return TenderDataset(str(tmp_path / "obras.json"), lazy=True), TenderDataset(str(tmp_path / "main.json"), lazy=True)
+
+# ==========================================
+# 📄 LAZY, CACHED DETAIL
+# ==========================================
+def test_detail_is_resolved_once_per_file_version(tmp_path):
+    obras, main = datasets(tmp_path, RECORDS, [{**RECORDS[0], "Nombre": "Estudio de suelos (Obras)"}])
+    details = DetailService([obras, main])
+    first, hit = details._fetch("D-1")
+    assert not hit and first["nombre"] == "Estudio de suelos (Obras)"  # first dataset wins
+    assert first["organismo"] == "Municipalidad De A" and first["cierre"] == "2026-02-01"
+    assert first["items"]["NombreProducto"].tolist() == ["Sondaje", "Informe"]
+    assert details._fetch("D-1") == (first, True)
+    assert details.get("NO-EXISTE") is None
+
+    # A reload is a new version: the old entry is never served again
+    write(tmp_path / "obras.json", [{**RECORDS[0], "Nombre": "Estudio de suelos (v2)"}])
+    obras.refresh()
+    detail, hit = details._fetch("D-1")
+    assert not hit and detail["nombre"] == "Estudio de suelos (v2)"
+
+def test_cache_is_bounded_and_prefetch_warms_it(tmp_path):
+    obras, main = datasets(tmp_path, RECORDS, [])
+    details = DetailService([obras, main], size=2)
+    details.prefetch(["D-1", "D-2", "D-3"])
+    deadline = time.monotonic() + 5
+    while len(details._cache) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    # The queue keeps what the cache can hold, first codes first
+    assert [key[2] for key in details._cache] == ["D-1", "D-2"]
+    assert details._fetch("D-1")[1] and not details._fetch("D-3")[1]
+    assert [key[2] for key in details._cache] == ["D-1", "D-3"]
+
+def test_detail_monto_fallbacks():
+    sec1 = lambda item: item.get("ExtendedMetadata", {}).get("Section_1_Características", {})
+    assert detail_monto(RECORDS[0], sec1(RECORDS[0])) == ("Monto (API)", "gray", "$5.000.000")
+    assert detail_monto(RECORDS[1], sec1(RECORDS[1])) == ("Presupuesto (Base)", "gray", "$1.234.567")
+    assert detail_monto(RECORDS[2], sec1(RECORDS[2])) == ("Monto (Estimado)", "orange", format_clp(100 * UTM_VALUE))
+    assert detail_monto({"MontoEstimado": "n/d"}, {}) is None
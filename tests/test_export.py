@@ -0,0 +1,36 @@
+import json
+
+from export import main
+from loader import DB_FILE, JSON_FILE_MAIN
+from processing import write_records
+from tender_store import TenderStore
+
+def record(code, name):
+    return {"CodigoExterno": code, "Nombre": name, "Fechas": {"FechaCierre": "2026-02-01"}}
+
+def app_codes():
+    rows, _ = TenderStore(DB_FILE).query("main")
+    return sorted(rows["Codigo"])
+
+# ==========================================
+# 📤 EXPORT CLI
+# ==========================================
+def test_other_file_leaves_the_app_table_alone(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_records(JSON_FILE_MAIN, [record("APP-1", "puente"), record("APP-2", "camino")])
+    write_records("otro.json", [record("OTRO-1", "muelle")])
+
+    assert main(["app.csv", "--frames", ""]) == 0
+    assert app_codes() == ["APP-1", "APP-2"]
+
+    assert main(["otro.csv", "--main", "otro.json", "--frames", ""]) == 0
+    assert app_codes() == ["APP-1", "APP-2"]
+    assert "OTRO-1" in (tmp_path / "otro.csv").read_text(encoding="utf-8")
+    assert "APP-1" not in (tmp_path / "otro.csv").read_text(encoding="utf-8")
+
+def test_export_json_keeps_the_tab_filters(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_records(JSON_FILE_MAIN, [record("A-1", "estudio de suelos"), record("A-2", "pavimentación")])
+    assert main(["out.json", "--frames", "", "--limite", "1"]) == 0
+    rows = json.loads((tmp_path / "out.json").read_text(encoding="utf-8"))
+    assert len(rows) == 1 and rows[0]["Fecha_Cierre"] == "2026-02-01"
@@ -0,0 +1,75 @@
+import extraction
+from extraction import ExtractionCache, enrich, extract_pages, parse_ficha
+from processing import read_records, write_records
+
+FICHA = """<html><head><script>var x = 1;</script></head><body><h1>Ficha</h1>
+<h2>1. Características de la licitación</h2>
+<table><tr><td>Tipo de Licitación:</td><td>Licitación Pública entre 100 y 1.000 UTM (LE)</td></tr>
+<tr><td>Presupuesto:</td><td>$ 12.345.678<br>Monto Total</td></tr></table>
+<h2>6. Criterios de evaluación</h2>
+<table><tr><th>Ítem</th><th>Ponderación</th></tr><tr><td>Oferta económica</td><td>60%</td></tr>
+<tr><td>Experiencia</td><td>40%</td></tr></table>
+<h2>8. Garantías</h2>
+<table><tr><td>Tipo:</td><td>Seriedad de la oferta</td></tr></table>
+<table><tr><td>Tipo:</td><td>Fiel cumplimiento</td></tr></table>
+<h2>9. Requisitos</h2>
+<table><tr><td>Nada:</td><td>que leer</td></tr></table>
+</body></html>"""
+
+def pages(tmp_path, texts):
+    folder = tmp_path / "fichas"
+    folder.mkdir(exist_ok=True)
+    out = {}
+    for code, text in texts.items():
+        out[code] = str(folder / f"{code}.html")
+        (folder / f"{code}.html").write_text(text, encoding="utf-8")
+    return out
+
+# ==========================================
+# 🧾 FICHA PARSER
+# ==========================================
+def test_parse_ficha_sections():
+    meta = parse_ficha(FICHA)
+    assert meta["Section_1_Características"] == {
+        "Tipo de Licitación": "Licitación Pública entre 100 y 1.000 UTM (LE)",
+        "Presupuesto": "$ 12.345.678\nMonto Total",
+    }
+    assert meta["Section_6_Criterios"] == [{"Ítem": "Oferta económica", "Ponderación": "60%"},
+                                          {"Ítem": "Experiencia", "Ponderación": "40%"}]
+    assert meta["Section_7_Montos"] == {}
+    assert meta["Section_8_Garantias"] == [{"Tipo": "Seriedad de la oferta"}, {"Tipo": "Fiel cumplimiento"}]
+
+# ==========================================
+# 🗃️ EXTRACTION CACHE
+# ==========================================
+def test_cache_keeps_results_until_the_page_or_parser_changes(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    found = pages(tmp_path, {"F-1": FICHA, "F-2": "<html><body>Error 500</body></html>"})
+    meta, errors, stats = extract_pages(found, cache, workers=1)
+    assert stats["parsed"] == 2 and stats["cached"] == 0
+    assert list(meta) == ["F-1"] and errors["F-2"].startswith("ValueError")
+
+    # Failures are cached too
+    again, errors_again, stats = extract_pages(found, cache, workers=1)
+    assert stats["parsed"] == 0 and stats["cached"] == 2
+    assert again == meta and errors_again == errors
+
+    pages(tmp_path, {"F-2": FICHA.replace("60%", "70%")})
+    meta, errors, stats = extract_pages(found, cache, workers=1)
+    assert stats["parsed"] == 1 and not errors
+    assert meta["F-2"]["Section_6_Criterios"][0]["Ponderación"] == "70%"
+
+    monkeypatch.setattr(extraction, "PARSER_VERSION", extraction.PARSER_VERSION + 1)
+    _, _, stats = extract_pages(found, cache, workers=1)
+    assert stats["parsed"] == 2 and stats["cached"] == 0
+
+def test_enrich_sets_extended_metadata(tmp_path):
+    path = str(tmp_path / "obras.json")
+    write_records(path, [{"CodigoExterno": "F-1", "Nombre": "a"}, {"CodigoExterno": "F-3", "Nombre": "b"}])
+    pages(tmp_path, {"F-1": FICHA})
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    result = enrich(path, str(tmp_path / "fichas"), cache, workers=1)
+    assert result["updated"] == 1 and result["pages"] == 1
+    records = read_records(path)
+    assert records[0]["ExtendedMetadata"] == parse_ficha(FICHA) and "ExtendedMetadata" not in records[1]
+    assert enrich(path, str(tmp_path / "fichas"), cache, workers=1)["updated"] == 0
@@ -0,0 +1,57 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from loader import open_dataset
+from processing import FIELD_COLS, mark_view, write_records
+from tender_store import TenderStore
+from test_processing import fixture_records, plain
+
+def pandas_view(df, hidden, date_range=None, categorias=None, order="pub"):
+    # The tab filters and sort the grids used to run on the whole frame
+    view = df[df["Codigo"].notna() & ~df["Codigo"].isin(hidden)]
+    if date_range:
+        lo, hi = (pd.Timestamp(d) for d in date_range)
+        view = view[(view["FechaCierreObj"] >= lo) & (view["FechaCierreObj"] <= hi)]
+    if categorias:
+        view = view[view["Categoria"].isin(categorias)]
+    if order == "pub":
+        return view.sort_values(["FechaPubObj", "Codigo"], ascending=False, na_position="last")
+    return view.sort_values(["FechaCierreObj", "Codigo"], na_position="first")
+
+# ==========================================
+# 📄 SERVER-SIDE PAGES == THE FILTERED FRAME
+# ==========================================
+@pytest.mark.parametrize("order", ["pub", "cierre"])
+@pytest.mark.parametrize("filters", [{}, {"date_range": (date(2026, 1, 1), date(2026, 2, 15))},
+                                     {"categorias": ["Mandantes Clave", "Topografía y Levantamientos"]}])
+def test_pages_add_up_to_the_filtered_frame(tmp_path, order, filters):
+    path = tmp_path / "main.json"
+    records = fixture_records()
+    write_records(str(path), records)
+    store = TenderStore(str(tmp_path / "state.db"))
+    ds = open_dataset("main", str(path), tenders=store, frame_dir=None, lazy=False, log_file=None)
+    hidden = [r["CodigoExterno"] for r in records[::9]]
+
+    expected = pandas_view(ds.df, hidden, order=order, **filters)
+    pages, size, total = [], 25, None
+    while total is None or len(pages) * size < total:
+        rows, total = store.query("main", hidden=hidden, limit=size, offset=len(pages) * size, order=order, **filters)
+        assert len(rows) == min(size, total - len(pages) * size)
+        pages.append(rows)
+    assert total == len(expected) and total > size
+    got = pd.concat(pages, ignore_index=True)
+    pd.testing.assert_frame_equal(plain(got[FIELD_COLS]), plain(expected[FIELD_COLS]))
+
+def test_only_the_page_is_marked_seen(tmp_path):
+    path = tmp_path / "main.json"
+    write_records(str(path), fixture_records())
+    store = TenderStore(str(tmp_path / "state.db"))
+    open_dataset("main", str(path), tenders=store, frame_dir=None, lazy=False, log_file=None)
+    rows, _ = store.query("main", limit=10, offset=10)
+    seen, saved = set(rows["Codigo"][:3]), {rows["Codigo"].iloc[4]}
+    out, new = mark_view(rows, seen, saved)
+    assert new == rows["Codigo"].tolist()[3:]
+    assert out["Visto"].tolist() == [True] * 3 + [False] * 7
+    assert out["Guardar"].sum() == 1 and not out["Ocultar"].any()
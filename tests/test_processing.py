@@ -0,0 +1,107 @@
+import copy
+import json
+import os
+from datetime import date, datetime
+
+import pandas as pd
+
+from categorization import get_category
+from processing import (CATEGORY_COLS, EXPECTED_COLS, clean_money_string, derive_frame,
+                        display_frame, estimate_monto, flatten_records, format_clp, raw_frame, write_records)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TODAY = date(2026, 1, 20)
+
+# Records the real files don't cover: missing blocks, Presupuesto / UTM
+# estimate fallbacks, bad and urgent dates, "Sin Categoría"
+EDGE_CASES = [
+    {"CodigoExterno": "E-1"},
+    {"CodigoExterno": "E-2", "Nombre": "estudio geotécnico puente", "Match_Category": "Sin Categoría",
+     "MontoEstimado": "0", "Fechas": {"FechaPublicacion": "2026-01-02T10:00:00", "FechaCierre": "2026-01-19T15:00:00"},
+     "ExtendedMetadata": {"Section_1_Características": {"Presupuesto": "$ 12.345.678"}}},
+    {"CodigoExterno": "E-3", "Nombre": "ITO obras", "Estado": "adjudicada", "Comprador": {"NombreOrganismo": "MUNICIPALIDAD DE X"},
+     "Fechas": {"FechaPublicacion": "no es fecha", "FechaCierre": "2026-01-25"},
+     "ExtendedMetadata": {"Section_1_Características": {"Tipo de Licitación": "Licitación Pública entre 100 y 1.000 UTM (LE)"}}},
+    {"CodigoExterno": "E-4", "Nombre": "Arquitectura", "MontoEstimado": 1500000.5, "Match_Category": "Topografía",
+     "Fechas": {"FechaCierre": "2027-03-01T00:00:00"}, "URL_Documentos_Portal": "https://example.org/E-4"},
+]
+
+def fixture_records():
+    with open(os.path.join(ROOT, "FINAL_PRODUCTION_DATA.json"), encoding="utf-8") as f:
+        return json.load(f) + copy.deepcopy(EDGE_CASES)
+
+def legacy_rows(data, today):
+    # The per-record loop load_data ran before the columnar rebuild
+    rows = []
+    for item in data:
+        name = str(item.get("Nombre", "")).title()
+        cat = item.get("Match_Category")
+        if not cat or cat == "Sin Categoría":
+            cat = get_category(name)
+        monto_tipo = "Exacto"
+        if item.get("MontoEstimado") and float(item.get("MontoEstimado") or 0) > 0:
+            monto = float(item.get("MontoEstimado"))
+        else:
+            ext = item.get("ExtendedMetadata", {}).get("Section_1_Características", {})
+            monto = clean_money_string(ext.get("Presupuesto"))
+            if not monto > 0:
+                monto = estimate_monto(ext.get("Tipo de Licitación", ""))
+                if monto > 0: monto_tipo = "Estimado"
+        fechas = item.get("Fechas") or {}
+        raw_pub, raw_cierre = fechas.get("FechaPublicacion"), fechas.get("FechaCierre")
+        f_pub_str = str(raw_pub)[:10] if raw_pub else ""
+        f_pub_obj = None
+        if f_pub_str:
+            try: f_pub_obj = datetime.strptime(f_pub_str, "%Y-%m-%d").date()
+            except ValueError: pass
+        f_cierre_str = str(raw_cierre)[:10] if raw_cierre else ""
+        f_cierre_obj = None
+        if f_cierre_str:
+            try:
+                f_cierre_obj = datetime.strptime(f_cierre_str, "%Y-%m-%d").date()
+                if (f_cierre_obj - today).days <= 7:
+                    f_cierre_str = f" {f_cierre_str}"
+            except ValueError: pass
+        rows.append({
+            "Codigo": item.get("CodigoExterno"), "Nombre": name,
+            "Organismo": str(item.get("Comprador", {}).get("NombreOrganismo", "")).title(),
+            "Estado_Lic": str(item.get("Estado", "Publicada")).title(), "Categoria": cat,
+            "Monto_Num": monto, "Monto": format_clp(monto), "Monto_Tipo": monto_tipo,
+            "Fecha Pub": f_pub_str, "FechaPubObj": f_pub_obj,
+            "Fecha Cierre": f_cierre_str, "FechaCierreObj": f_cierre_obj,
+            "URL": item.get("URL_Documentos_Portal"),
+        })
+    return pd.DataFrame(rows, columns=EXPECTED_COLS)
+
+def plain(df):
+    # Categoricals as their values, datetime64 days as date or None, NaN as None:
+    # what matters is each row's values, not the dtypes or category order
+    out = df.reset_index(drop=True).astype({c: object for c in CATEGORY_COLS if c in df})
+    for c in ("FechaPubObj", "FechaCierreObj"):
+        if c in out and pd.api.types.is_datetime64_any_dtype(out[c]):
+            out[c] = [None if pd.isna(v) else v.date() for v in out[c]]
+    return out.astype(object).where(out.notna(), None)
+
+def write(path, records):
+    write_records(str(path), records)
+    # Same-second rewrites of the same size still count as a new version
+    stamp = os.stat(path).st_mtime_ns
+    os.utime(path, ns=(stamp + 10 ** 9, stamp + 10 ** 9))
+
+def edit(records):
+    # A reload's worth of changes: state, name and amount edits, one removal, one addition
+    out = copy.deepcopy(records)
+    out[0]["Estado"] = "Cerrada"
+    out[3]["Nombre"] = "LEVANTAMIENTO TOPOGRÁFICO " + str(out[3].get("Nombre", ""))
+    out[7]["MontoEstimado"] = 9990000
+    del out[10]
+    out.append({"CodigoExterno": "NEW-1", "Nombre": "Ensayos de laboratorio", "Fechas": {"FechaCierre": "2026-01-22"}})
+    return out
+
+# ==========================================
+# 🧮 COLUMNAR DERIVE == THE OLD PER-RECORD LOOP
+# ==========================================
+def test_derive_frame_matches_legacy_loop():
+    data = fixture_records()
+    got = display_frame(derive_frame(raw_frame(flatten_records(data))), today=TODAY)
+    pd.testing.assert_frame_equal(plain(got), plain(legacy_rows(data, TODAY)))
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from processing import TenderDataset
+from test_processing import edit, fixture_records, plain, write
+
+# ==========================================
+# 🔄 INCREMENTAL RELOAD == A FRESH FULL DERIVE
+# ==========================================
+@pytest.mark.parametrize("lazy", [False, True])
+def test_refresh_matches_full_derive(tmp_path, lazy):
+    path = tmp_path / "tenders.json"
+    records = fixture_records()
+    write(path, records)
+    ds = TenderDataset(str(path), lazy=lazy)
+
+    removed = records[10]["CodigoExterno"]
+    records = edit(records)
+    write(path, records)
+    assert ds.refresh() == {"added": 1, "changed": 3, "removed": 1}
+    assert ds.derived == 4
+    fresh = TenderDataset(str(path), lazy=lazy)
+    pd.testing.assert_frame_equal(plain(ds.df), plain(fresh.df))
+    for item in (records[0], records[3], records[-1]):
+        assert ds.full_map[item["CodigoExterno"]] == item
+    assert removed not in ds.full_map
+    assert "NEW-1" in ds.full_map and len(ds.df) == len(records)
+
+def test_rewrite_without_changes_derives_nothing(tmp_path):
+    # A new file version with the same records: nothing to re-derive or sync
+    path = tmp_path / "tenders.json"
+    records = fixture_records()
+    write(path, records)
+    seen = []
+    ds = TenderDataset(str(path), on_change=lambda dataset, dirty: seen.append(dirty))
+    assert ds.refresh() is None
+    df, calls = ds.df, len(seen)
+    write(path, records)
+    assert ds.refresh() == {"added": 0, "changed": 0, "removed": 0}
+    assert ds.df is df and len(seen) == calls
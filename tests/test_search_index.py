@@ -0,0 +1,60 @@
+import re
+import unicodedata
+
+import pandas as pd
+import pytest
+
+from processing import search_document
+from search_index import SearchIndex, match_expression
+from test_processing import fixture_records
+
+# unicode61 tokens: runs of letters and digits, case and accents folded
+_WORD_RE = re.compile(r"[^\W_]+")
+
+def fold(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def pandas_matches(records, text):
+    # The FTS query done by hand: every word is a whole token of some column
+    # of the record, the last one only its prefix
+    docs = pd.DataFrame([search_document(item) for item in records],
+                        columns=["codigo", "nombre", "organismo", "descripcion", "items"])
+    docs = docs[docs["codigo"] != ""].drop_duplicates("codigo", keep="last")
+    tokens = docs.apply(lambda row: set(_WORD_RE.findall(fold(" ".join(row)))), axis=1)
+    words = _WORD_RE.findall(fold(text))
+    *whole, last = words
+    hit = tokens.map(lambda toks: all(w in toks for w in whole) and any(t.startswith(last) for t in toks))
+    return set(docs.loc[hit, "codigo"])
+
+# ==========================================
+# 🔎 FTS == A PANDAS FILTER
+# ==========================================
+@pytest.mark.parametrize("text", ["Geotécnico", "estudio geot", "asesoria inspeccion", "municipalidad de", "región", "1431841"])
+def test_search_matches_pandas_filter(tmp_path, text):
+    records = fixture_records()
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.sync("main", records)
+    expected = pandas_matches(records, text)
+    assert expected
+    hits = index.search(text, limit=len(records))
+    assert {code for code, _, _ in hits} == expected
+    assert len(hits) == len(expected)
+
+def test_sync_follows_edits_and_removals(tmp_path):
+    records = fixture_records()
+    index = SearchIndex(str(tmp_path / "search.db"))
+    assert index.sync("main", records, signature="v1") == len({search_document(r)[0] for r in records} - {""})
+    assert index.sync("main", records, signature="v1") == 0
+
+    gone, renamed = records[0]["CodigoExterno"], records[1]["CodigoExterno"]
+    records = records[1:]
+    records[0] = {**records[0], "Nombre": "Estudio de palafitos costeros"}
+    assert index.sync("main", records, dirty={gone, renamed}) == 2
+    assert [code for code, _, _ in index.search("palafitos")] == [renamed]
+    assert index.search(gone) == []
+    assert [code for code, _, _ in index.search("PALAFITOS cost")] == [renamed]
+
+def test_match_expression_quotes_words():
+    assert match_expression('suelo" OR nombre:*') == '"suelo" "OR" "nombre"*'
+    assert match_expression(" ¿? ") is None
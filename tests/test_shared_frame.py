@@ -0,0 +1,65 @@
+import copy
+
+import pandas as pd
+import pytest
+
+from processing import TenderDataset, audit_frame, audit_source, flatten_records
+from shared_frame import available
+from test_processing import edit, fixture_records, plain, write
+
+pytestmark = pytest.mark.skipif(not available(), reason="pyarrow no está instalado")
+
+# ==========================================
+# 🗺️ MAPPED DATASET == A HEAP ONE
+# ==========================================
+def test_mapped_dataset_matches_a_heap_one(tmp_path):
+    # A second process mapping the snapshot derives nothing and keeps no
+    # flattened records, yet serves the same frame, audit and records
+    path, snap = tmp_path / "tenders.json", str(tmp_path / "tenders.arrow")
+    records = fixture_records() + [{"Nombre": "sin código"}]  # NaN once mapped, still the same record
+    write(path, records)
+    TenderDataset(str(path), lazy=True, snapshot=snap)
+    mapped = TenderDataset(str(path), lazy=True, snapshot=snap)
+    heap = TenderDataset(str(path), lazy=True)
+    assert mapped.derived == 0
+    assert not hasattr(mapped, "rows") and not hasattr(mapped, "sources")
+    pd.testing.assert_frame_equal(plain(mapped.df), plain(heap.df))
+    pd.testing.assert_frame_equal(mapped.audit(), heap.audit())
+    assert list(mapped.full_map) == list(heap.full_map)
+    assert mapped.full_map[records[5]["CodigoExterno"]] == records[5]
+
+    records = edit(records)
+    write(path, records)
+    assert mapped.refresh() == {"added": 1, "changed": 3, "removed": 1}
+    assert mapped.derived == 4
+    pd.testing.assert_frame_equal(plain(mapped.df), plain(TenderDataset(str(path)).df))
+    pd.testing.assert_frame_equal(mapped.audit(), audit_frame(audit_source(flatten_records(records)), mapped.df))
+
+def test_record_index_follows_the_file(tmp_path):
+    # A repeated code is served from its last record, like the grid and the tenders table
+    path = tmp_path / "tenders.json"
+    records = fixture_records()[:20]
+    dup = copy.deepcopy(records[2])
+    dup["Nombre"] = "segunda versión"
+    write(path, records + [dup, {"Nombre": "sin código"}])
+    ds = TenderDataset(str(path), lazy=True)
+    assert len(ds.full_map) == 20
+    assert ds.full_map[dup["CodigoExterno"]]["Nombre"] == "segunda versión"
+    assert None not in ds.full_map and "NO-EXISTE" not in ds.full_map
+    with pytest.raises(KeyError):
+        ds.full_map["NO-EXISTE"]
+
+def test_snapshot_refresh_matches_full_derive(tmp_path):
+    # An eager dataset patching its snapshot on reload: the mapped frame and
+    # the records follow the file like a heap one
+    path, snap = tmp_path / "tenders.json", str(tmp_path / "tenders.arrow")
+    records = fixture_records()
+    write(path, records)
+    ds = TenderDataset(str(path), snapshot=snap)
+    records = edit(records)
+    write(path, records)
+    assert ds.refresh() == {"added": 1, "changed": 3, "removed": 1}
+    assert ds.derived == 4
+    pd.testing.assert_frame_equal(plain(ds.df), plain(TenderDataset(str(path)).df))
+    pd.testing.assert_frame_equal(plain(TenderDataset(str(path), snapshot=snap).df), plain(ds.df))
+    assert ds.full_map["NEW-1"] == records[-1]
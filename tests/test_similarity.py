@@ -0,0 +1,73 @@
+from similarity import SimilarityIndex, similar
+
+def tender(code, nombre, descripcion=""):
+    return {"CodigoExterno": code, "Nombre": nombre, "Descripcion": descripcion}
+
+CORPUS = [
+    tender("S-1", "Estudio de mecánica de suelos para puente Las Rosas", "sondajes y ensayos de laboratorio"),
+    tender("S-2", "Estudio mecánica de suelos puente Los Aromos", "sondajes, ensayos de laboratorio e informe"),
+    tender("P-1", "Reposición de pavimento calle Prat", "pavimento de hormigón y soleras"),
+    tender("P-2", "Reposición pavimento calle O'Higgins", "pavimento de hormigón, soleras y aceras"),
+    tender("T-1", "Levantamiento topográfico sector rural", "topografía y planimetría"),
+    tender("A-1", "Adquisición de mobiliario escolar", "sillas y mesas para salas"),
+] + [tender(f"X-{i}", f"Suministro de insumos varios lote {i}", f"artículos de oficina {i}") for i in range(30)]
+
+# ==========================================
+# 🔗 SIMILARITY INDEX
+# ==========================================
+def test_top_reads_one_state(tmp_path):
+    # Another session's sync swapping the state while top() runs: the
+    # scores, exclusions and codes still come from the state top() started with
+    index = SimilarityIndex()
+    index.sync(CORPUS)
+    other = SimilarityIndex()
+    other.sync(CORPUS[:3])
+    vector = index.vector(["S-1"])
+    expected = index.top(vector, k=5, exclude=["S-1"])
+
+    scores = index.scores
+    def swapped(vector, state=None):
+        index._state = other._state
+        return scores(vector, state)
+    index.scores = swapped
+    assert index.top(vector, k=5, exclude=["S-1"]) == expected
+
+def test_near_duplicates_rank_first():
+    index = SimilarityIndex()
+    index.sync(CORPUS)
+    for code, twin in [("S-1", "S-2"), ("S-2", "S-1"), ("P-1", "P-2"), ("P-2", "P-1")]:
+        top = index.top(index.vector([code]), k=3, exclude=[code])
+        assert top[0][0] == twin and top[0][1] > 0.5
+        assert all(other not in ("A-1", "T-1") for other, _ in top)
+    assert index.top(index.vector(["A-1"]), k=3, exclude=["A-1"]) == []
+
+def test_incremental_sync_matches_a_rebuild(tmp_path):
+    # Edits, removals and additions through sync(dirty=...), saved and loaded
+    # back: same rankings as an index built from the final records
+    path = str(tmp_path / "similar.npz")
+    index = SimilarityIndex(path)
+    index.sync(CORPUS, signature="v1")
+    records = [r for r in CORPUS if r["CodigoExterno"] != "P-2"]
+    records[0] = tender("S-1", "Reposición de pavimento calle Serrano", "pavimento de hormigón")
+    records.append(tender("P-3", "Reposición pavimento calle Prat norte", "pavimento de hormigón y soleras"))
+    dirty = {"S-1", "P-2", "P-3"}
+    assert index.sync([r for r in records if r["CodigoExterno"] in dirty], dirty=dirty) == 2
+    assert "P-2" not in index and len(index) == len(records)
+
+    rebuilt = SimilarityIndex()
+    rebuilt.sync(records)
+    loaded = SimilarityIndex(path)
+    for code in ("S-1", "P-1", "S-2"):
+        expected = [c for c, _ in rebuilt.top(rebuilt.vector([code]), k=3, exclude=[code])]
+        for other in (index, loaded):
+            assert [c for c, _ in other.top(other.vector([code]), k=3, exclude=[code])] == expected
+
+def test_similar_across_files():
+    main, obras = SimilarityIndex(), SimilarityIndex()
+    # Each file with enough other tenders that the shared words aren't too common
+    main.sync(CORPUS[:2] + CORPUS[4:])
+    obras.sync(CORPUS[2:4] + [tender(f"Y-{i}", f"Arriendo de equipos lote {i}") for i in range(30)])
+    assert [code for code, _ in similar([main, obras], ["P-1"], k=2)] == ["P-2"]
+    # The centroid of several codes, none of them offered back
+    got = [code for code, _ in similar([main, obras], ["S-1", "P-1"], k=3)]
+    assert "S-2" in got and "P-2" in got and not {"S-1", "P-1"} & set(got)
@@ -0,0 +1,59 @@
+import threading
+
+from state_store import StateStore
+
+# ==========================================
+# 🗄️ VERSIONED READS
+# ==========================================
+def test_lists_follow_writes_from_other_stores(tmp_path):
+    # Two stores on one file stand for two processes: each read sees every
+    # committed write, and only the tables whose version moved are re-read
+    path = str(tmp_path / "state.db")
+    a, b = StateStore(path), StateStore(path)
+    a.toggle_save("L-1", True)
+    assert a.lists() == (frozenset(), {"L-1"}, frozenset())
+    assert b.lists() == (frozenset(), {"L-1"}, frozenset())
+
+    hidden_before = b.lists()[0]
+    b.mark_seen(["L-1", "L-2"])
+    assert a.lists()[2] == {"L-1", "L-2"}
+    assert b.lists()[0] is hidden_before  # untouched table: same cached set
+
+    a.hide("L-1")
+    hidden, saved, _ = b.lists()
+    assert hidden == {"L-1"} and saved == frozenset()
+    assert b.versions() == {"hidden": 2, "saved": 2, "history": 1}
+
+def test_apply_is_one_transaction_in_order(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    store.apply([("save", "L-1"), ("hide", "L-1"), ("save", "L-2"), ("unsave", "L-2"), ("save", "L-3")])
+    hidden, saved, _ = store.lists()
+    assert hidden == {"L-1"} and saved == {"L-3"}
+
+# ==========================================
+# 🧵 CONCURRENT WRITERS
+# ==========================================
+def test_concurrent_writers_lose_no_update(tmp_path):
+    # Writers on several threads and stores: every event lands, every
+    # transaction bumps the version exactly once
+    path = str(tmp_path / "state.db")
+    stores = [StateStore(path) for _ in range(2)]
+    errors = []
+
+    def writer(n):
+        try:
+            store = stores[n % 2]
+            for i in range(25):
+                store.toggle_save(f"W{n}-{i}", True)
+                store.mark_seen([f"W{n}-{i}"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert not errors
+    _, saved, history = StateStore(path).lists()
+    assert len(saved) == len(history) == 150
+    assert stores[0].versions() == {"hidden": 150, "saved": 150, "history": 150}
+    assert stores[0].lists()[1] == stores[1].lists()[1] == saved
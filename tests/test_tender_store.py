@@ -0,0 +1,85 @@
+import pandas as pd
+
+import processing
+from loader import open_dataset
+from processing import write_records
+from tender_store import TenderStore
+
+RECORDS = [
+    {"CodigoExterno": "T-1", "Nombre": "estudio de mecánica de suelos", "MontoEstimado": 5000000,
+     "Comprador": {"NombreOrganismo": "MUNICIPALIDAD DE A"}, "Fechas": {"FechaCierre": "2026-02-01"}},
+    {"CodigoExterno": "T-2", "Nombre": "reposición de veredas", "Comprador": {"NombreOrganismo": "MUNICIPALIDAD DE B"},
+     "Fechas": {"FechaCierre": "2026-03-01"},
+     "ExtendedMetadata": {"Section_1_Características": {"Tipo de Licitación": "Licitación Pública entre 100 y 1.000 UTM (LE)"}}},
+]
+
+def open_main(path, store):
+    return open_dataset("main", str(path), tenders=store, frame_dir=None, lazy=False, log_file=None)
+
+def stored(store):
+    rows, _ = store.query("main")
+    return rows.set_index("Codigo")
+
+# ==========================================
+# 🔁 SYNC SIGNATURE
+# ==========================================
+def test_rule_and_utm_changes_reach_the_table(tmp_path, monkeypatch):
+    # Same file, new rules / UTM value: the rows are re-derived, so the
+    # table (and its cached filter options) must follow
+    path = tmp_path / "main.json"
+    write_records(str(path), RECORDS)
+    store = TenderStore(str(tmp_path / "state.db"))
+    open_main(path, store)
+    assert "OTRAS NUEVO" not in store.filter_options("main")["categorias"]
+    assert stored(store).loc["T-2", "Monto_Num"] == 100 * processing.UTM_VALUE
+
+    monkeypatch.setattr(processing, "categorize_series", lambda s: pd.Series("OTRAS NUEVO", index=s.index))
+    monkeypatch.setattr(processing, "rules_fingerprint", lambda: "otra tabla")
+    monkeypatch.setattr(processing, "UTM_VALUE", 70000)
+    ds = open_main(path, store)
+    assert set(ds.df["Categoria"]) == {"OTRAS NUEVO"}
+    assert store.filter_options("main")["categorias"] == ["OTRAS NUEVO"]
+    assert stored(store).loc["T-2", "Monto_Num"] == 100 * 70000
+
+def test_unchanged_file_and_rules_skip_the_rewrite(tmp_path):
+    path = tmp_path / "main.json"
+    write_records(str(path), RECORDS)
+    store = TenderStore(str(tmp_path / "state.db"))
+    open_main(path, store)
+    # A row the sync would overwrite if it didn't skip
+    with store._transaction(store._conn(), "BEGIN IMMEDIATE") as conn:
+        conn.execute("UPDATE tenders SET nombre = 'marca' WHERE codigo = 'T-1'")
+    open_main(path, store)
+    assert stored(store).loc["T-1", "Nombre"] == "marca"
+
+def test_stored_days_sort_as_text(tmp_path):
+    # Years below 1000 (typos in the portal data) keep 4 digits, so the text
+    # order and the BETWEEN filters of the date columns match date order
+    path = tmp_path / "main.json"
+    records = RECORDS + [{"CodigoExterno": "T-3", "Nombre": "x", "Fechas": {"FechaCierre": "0999-05-01"}}]
+    write_records(str(path), records)
+    store = TenderStore(str(tmp_path / "state.db"))
+    open_main(path, store)
+    days = [r[0] for r in store._conn().execute("SELECT fecha_cierre FROM tenders ORDER BY fecha_cierre")]
+    assert days == ["0999-05-01", "2026-02-01", "2026-03-01"]
+    rows, total = store.query("main", order="cierre")
+    assert rows["Codigo"].tolist() == ["T-3", "T-1", "T-2"] and total == 3
+
+def test_unparsed_dates_show_their_raw_text(tmp_path):
+    # Like the old loop: a date that doesn't parse (or isn't written as its
+    # day) shows str(x)[:10], with no urgency marker when it doesn't parse
+    path = tmp_path / "main.json"
+    records = RECORDS + [
+        {"CodigoExterno": "T-3", "Nombre": "x", "Fechas": {"FechaPublicacion": "no es fecha", "FechaCierre": "pendiente de fijar"}},
+        {"CodigoExterno": "T-4", "Nombre": "y", "Fechas": {"FechaPublicacion": "2026-1-5", "FechaCierre": "2020-01-05T10:00:00"}},
+    ]
+    write_records(str(path), records)
+    store = TenderStore(str(tmp_path / "state.db"))
+    ds = open_main(path, store)
+    for rows in (stored(store), processing.display_frame(ds.df).set_index("Codigo")):
+        assert rows.loc["T-3", "Fecha Pub"] == "no es fech"
+        assert rows.loc["T-3", "Fecha Cierre"] == "pendiente "
+        assert rows.loc["T-4", "Fecha Pub"] == "2026-1-5"
+        assert rows.loc["T-4", "Fecha Cierre"].endswith(" 2020-01-05") and rows.loc["T-4", "Fecha Cierre"] != "2020-01-05"
+        assert rows.loc["T-1", "Fecha Pub"] == ""
+    assert ds.df["FechaPubTexto"].notna().sum() == 2